@@ -9,3 +9,25 @@ from .order import (
 from .backtest_engine import (
     BacktestEngine
 )
+
+from .portfolio_engine import (
+    PortfolioBacktestEngine
+)
+
+from .streaming import (
+    StreamingBacktestEngine,
+    FrameSink,
+    ParquetSink,
+    SummarySink,
+)
+
+from .sweep import (
+    SweepData,
+    run_sweep,
+    run_sweep_batched,
+)
+
+from .walk_forward import (
+    run_walk_forward,
+    walk_forward_windows,
+)
@@ -1,7 +1,9 @@
+import json
 from enum import Enum, auto
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 
 from .order import (
     OrderSide,
@@ -11,8 +13,23 @@ from .order import (
     PositionAwareMarketOrder,
 )
 
+from .order_book import (
+    PendingOrders,
+    order_columns,
+)
 from .utils import (
     avg_price_calculation,
+    settlement_boundaries,
+)
+from .vectorized import market_order_backtest
+from .performance import (
+    RunningMetrics,
+    session_key,
+)
+from .kernel import (
+    NUMBA_AVAILABLE,
+    SETTLE_UNSET,
+    calculate_kernel,
 )
 
 
@@ -24,6 +41,23 @@ class BacktestEngine:
         given_price = auto()
         worst_case = auto()
 
+    # state columns added to timeseries, lots are int and money float
+    STATE_DTYPES : dict[str, type] = {
+        "exec" : np.int64,
+        "pos" : np.int64,
+        "pos_price" : np.float64,
+        "m2m" : np.float64,
+        "m2m_cont" : np.float64,
+        "cost" : np.float64,
+        "slippage" : np.float64,
+        "m2m_cNs_cont" : np.float64, # cNs = cost and slippage added
+    }
+
+    # calculate run compiled kernel only for spans of at least this many
+    # bars, encoding pending orders costs more than short steps (get_pos /
+    # get_m2m per bar) take in python loop
+    KERNEL_MIN_BARS : int = 64
+
     def __init__(
         self,
         timeseries : pd.DataFrame,
@@ -31,59 +65,85 @@ class BacktestEngine:
         trade_cost : float,
         slippage : float,
         limit_order_exec_mode : LimitOrderExecMode = LimitOrderExecMode.worst_case,
+        use_kernel : bool = True,
     ):
+        # use_kernel : run calculate with compiled kernel when numba is
+        #              installed, python loop otherwise
+        self.common_settlement_time : str = common_settlement_time
         self.settle_on : pd.Timestamp = pd.Timestamp("1970-01-01 " + common_settlement_time)
         self.trade_cost : float = trade_cost
         self.slippage : float = slippage
         self.limit_order_exec_mode = limit_order_exec_mode
         
         self.pointer : int = 1 # you can't place order on first data point 
-        self.pendding_limit_orders : list[LimitOrder] = []
-        self.pendding_market_orders : list[MarketOrder] = []
-        self.next_settle : pd.Timestamp = None
+        # global index of first row, set when timeseries continue an
+        # earlier run (streaming chunk, resumed snapshot)
+        self.bar_offset : int = 0
+        self.pending : PendingOrders = PendingOrders()
+        # epoch ns of next settlement, SETTLE_UNSET until first bar
+        self.next_settle_ns : int = SETTLE_UNSET
+
+        # inputs are kept as read-only column views of timeseries, state
+        # of engine is one typed array per column
+        self.Ninput : dict[str, np.ndarray] = {}
+        for col in timeseries.columns:
+            arr = timeseries[col].to_numpy()
+            arr.flags.writeable = False
+            self.Ninput[col] = arr
 
-        # pandas dataframe to numpy 
-        self.colToIdxItr : int = 0
-        self.colToIdx : dict = {}
+        self.Nclose : np.ndarray = np.ascontiguousarray(self.Ninput["close"], dtype=np.float64)
+        self.Nclose.flags.writeable = False
 
-        # data inform of numpy
-        self.Ntimestamp : np.ndarray = None
-        self.Ndata : np.ndarray = None
+        self.Nindex : pd.DatetimeIndex = pd.DatetimeIndex(timeseries.index).as_unit("ns")
+        self.Ntimestamp_ns : np.ndarray = self.Nindex.asi8
+        self.timezone = self.Nindex.tz
 
-        for col in timeseries.columns:
-            self.colToIdx[col] = self.colToIdxItr
-            self.colToIdxItr += 1
-
-        self.Ntimestamp = timeseries.index.to_numpy()
-        self.Ndata = timeseries.to_numpy()
-
-        # adding external col to maintain info
-        col_list_to_add : list = [
-            "exec",
-            "pos",
-            "pos_price",
-            "m2m",
-            "m2m_cont",
-            "cost",
-            "slippage",
-            "m2m_cNs_cont" # cNs = cost and slippage added
-        ]
+        # epoch ns settlement time on date of every bar and of next date
+        # (DST aware) and settlement session of every bar, so calculate,
+        # kernel and vectorized only compare int64
+        self.settle_same_ns, self.settle_next_ns = settlement_boundaries(self.Nindex, common_settlement_time)
+        self.Nsession : np.ndarray = session_key(self.Ntimestamp_ns, self.settle_same_ns, self.settle_next_ns)
 
-        tmp_narr = np.zeros((self.Ndata.shape[0], len(col_list_to_add)), dtype=self.Ndata.dtype)
-        self.Ndata = np.hstack((self.Ndata, tmp_narr))
+        n = len(self.Nindex)
+        self.Nstate : dict[str, np.ndarray] = {
+            col : np.zeros(n, dtype=dtype) for col, dtype in self.STATE_DTYPES.items()
+        }
 
-        for col in col_list_to_add:
-            self.colToIdx[f"{col}"] = self.colToIdxItr
-            self.colToIdxItr += 1
+        # column -> position in Ndata / get_pd_data
+        self.colToIdx : dict[str, int] = {
+            col : itr for itr, col in enumerate(list(self.Ninput.keys()) + list(self.Nstate.keys()))
+        }
+
+        self.use_kernel : bool = use_kernel and NUMBA_AVAILABLE
+
+        # performance accumulators, bars before metrics_pointer are folded
+        self.metrics : RunningMetrics = RunningMetrics()
+        self.metrics_pointer : int = 0
 
 
     def place_order(self, order: Order):
-        if isinstance(order, MarketOrder):
-            self.pendding_market_orders.append(order)
-        elif isinstance(order, LimitOrder):
-            self.pendding_limit_orders.append(order)
-        else:
-            raise Exception(f"[-] Invalid order")
+        self.pending.place(order)
+
+    @property
+    def pendding_market_orders(self) -> list[MarketOrder]:
+        return self.pending.market_orders()
+
+    @pendding_market_orders.setter
+    def pendding_market_orders(self, orders : list[MarketOrder]):
+        self.pending.market_queue.clear()
+        for order in orders:
+            self.place_order(order)
+
+    @property
+    def pendding_limit_orders(self) -> list[LimitOrder]:
+        return self.pending.limit_orders()
+
+    @pendding_limit_orders.setter
+    def pendding_limit_orders(self, orders : list[LimitOrder]):
+        self.pending.limit_queue.clear()
+        self.pending.limit_book.clear()
+        for order in orders:
+            self.place_order(order)
 
     def place_order_position_aware_wrapper(self, order: Order):
         if not isinstance(order, PositionAwareMarketOrder):
@@ -108,171 +168,478 @@ class BacktestEngine:
         ))
 
 
+    def place_orders(
+        self,
+        orders : pd.DataFrame | None = None,
+        timestamp = None,
+        lot = None,
+        side = None,
+        price = None,
+        position = None,
+    ):
+        # place many orders at once, columns as in order_book.order_columns
+        # target positions are resolved against position after already
+        # placed market orders due by target bar, latest target of a bar wins
+        timestamp, ts_ns, signed_lot, price, position = order_columns(
+            orders, timestamp, lot, side, price, position
+        )
+
+        if position is not None:
+            timestamp, ts_ns, signed_lot = self.position_to_lot(timestamp, ts_ns, position)
+            price = np.full(len(ts_ns), np.nan)
+
+        self.pending.place_many(timestamp, ts_ns, signed_lot, price)
+
+    def position_to_lot(
+        self,
+        timestamp : pd.DatetimeIndex,
+        ts_ns : np.ndarray,
+        position : np.ndarray,
+    ) -> tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+        # target positions to signed market lots, zero lots are dropped
+        if len(ts_ns) != len(position):
+            raise ValueError(f"[-] place_orders columns length mismatch")
+        if len(ts_ns) == 0:
+            return timestamp, ts_ns, position
+
+        order_seq = np.argsort(ts_ns, kind="stable")
+        timestamp = timestamp[order_seq]
+        ts_ns = ts_ns[order_seq]
+        position = position[order_seq]
+
+        # bar each target is due on, already passed ones are due on pointer
+        order_bar = np.searchsorted(self.Ntimestamp_ns, ts_ns, side="left")
+        order_bar = np.maximum(order_bar, self.pointer)
+        isLastOfBar = np.append(order_bar[1:] != order_bar[:-1], True)
+
+        # pending market lots due up to each target bar, they run before
+        # new orders of same bar (placement order)
+        pending_entries = self.pending.market_queue.entries()
+        pending_ns = np.array([ns for ns, _, _ in pending_entries], dtype=np.int64)
+        pending_lot = np.array([
+            -order.lot if order.side == OrderSide.sell else order.lot
+            for _, _, order in pending_entries
+        ], dtype=np.int64)
+        pending_bar = np.maximum(np.searchsorted(self.Ntimestamp_ns, pending_ns, side="left"), self.pointer)
+        bar_seq = np.argsort(pending_bar, kind="stable")
+        pending_cum = np.concatenate([[0], pending_lot[bar_seq].cumsum()])
+
+        order_bar = order_bar[isLastOfBar]
+        pending_due = pending_cum[np.searchsorted(pending_bar[bar_seq], order_bar, side="right")]
+
+        # position before each target is previous target plus pending
+        # lots due in between
+        position = position[isLastOfBar]
+        signed_lot = (
+            np.diff(position, prepend=np.int64(self.Nstate["pos"][self.pointer-1]))
+            - np.diff(pending_due, prepend=0)
+        )
+        isTrade = signed_lot != 0
+
+        return (
+            timestamp[isLastOfBar][isTrade],
+            ts_ns[isLastOfBar][isTrade],
+            signed_lot[isTrade],
+        )
+
+    def calculate_kernel(
+        self,
+        timestamp : pd.Timestamp,
+    ):
+        # same as calculate, orders due by last bar and active book are
+        # encoded into arrays and bars are run by compiled
+        # kernel.calculate_kernel, later orders stay in queues
+        stop = self.bar_stop(timestamp)
+        if stop <= self.pointer:
+            return
+
+        last_ns = int(self.Ntimestamp_ns[stop - 1])
+        market_entries = self.pending.market_queue.pop_due_entries(last_ns)
+        market_ts = np.array([ns for ns, _, _ in market_entries], dtype=np.int64)
+        market_lot = np.array([
+            -order.lot if order.side == OrderSide.sell else order.lot
+            for _, _, order in market_entries
+        ], dtype=np.int64)
+        # kernel wants timestamp order, placement order kept as seq
+        market_seq = np.argsort(market_ts, kind="stable")
+        market_done = np.zeros(len(market_entries), dtype=np.bool_)
+
+        # orders already in book are active, their timestamp is long passed
+        active_ns = np.iinfo(np.int64).min
+        limit_entries = sorted(
+            self.pending.limit_queue.pop_due_entries(last_ns) + [(active_ns, seq, order) for seq, order in self.pending.limit_book.items()],
+            key=lambda entry: entry[1],
+        )
+        limit_ts = np.array([ns for ns, _, _ in limit_entries], dtype=np.int64)
+        limit_is_buy = np.array([order.side == OrderSide.buy for _, _, order in limit_entries], dtype=np.bool_)
+        limit_lot = np.array([
+            -order.lot if order.side == OrderSide.sell else order.lot
+            for _, _, order in limit_entries
+        ], dtype=np.int64)
+        limit_price = np.array([order.price for _, _, order in limit_entries], dtype=np.float64)
+        limit_done = np.zeros(len(limit_entries), dtype=np.bool_)
+
+        self.next_settle_ns = calculate_kernel(
+            self.pointer,
+            stop,
+            self.bar_offset,
+            self.Nclose,
+            self.Ntimestamp_ns,
+            self.settle_same_ns,
+            self.settle_next_ns,
+            self.next_settle_ns,
+            market_ts[market_seq],
+            market_seq,
+            market_lot[market_seq],
+            market_done,
+            limit_ts,
+            limit_is_buy,
+            limit_lot,
+            limit_price,
+            limit_done,
+            self.limit_order_exec_mode == self.LimitOrderExecMode.worst_case,
+            self.trade_cost,
+            self.slippage,
+            self.Nstate["exec"],
+            self.Nstate["pos"],
+            self.Nstate["pos_price"],
+            self.Nstate["m2m"],
+            self.Nstate["m2m_cont"],
+            self.Nstate["cost"],
+            self.Nstate["slippage"],
+            self.Nstate["m2m_cNs_cont"],
+        )
+
+        # every due market order is executed, unfilled limit orders are
+        # past their timestamp so they go back to book
+        isMarketDone = np.zeros(len(market_entries), dtype=np.bool_)
+        isMarketDone[market_seq] = market_done
+        self.pending.market_queue.push_many([
+            entry for entry, isDone in zip(market_entries, isMarketDone) if not isDone
+        ])
+        self.pending.limit_book.clear()
+        for (_, seq, order), isDone in zip(limit_entries, limit_done):
+            if not isDone:
+                self.pending.limit_book.add(seq, order)
+
+        self.pointer = stop
+
+    def execute(
+        self,
+        order_lot : int,
+        curr_price : float,
+    ):
+        # fill signed lot at curr_price on current pointer
+        prev_pos : float = self.Nstate["pos"][self.pointer]
+        prev_price : float = self.Nstate["pos_price"][self.pointer]
+
+        avg_price, isSomePosSquareOff = avg_price_calculation(
+            prev_price = prev_price,
+            prev_pos = prev_pos,
+            curr_price = curr_price,
+            curr_pos = order_lot,
+        )
+
+        if isSomePosSquareOff:
+            sqr_pos_sign = 1 if order_lot >= 0 else -1 
+            sqr_pos = sqr_pos_sign * min(abs(prev_pos), abs(order_lot))
+
+            sqr_pnl = curr_price * sqr_pos + prev_price * (-sqr_pos)
+            self.Nstate["m2m"][self.pointer] -= sqr_pnl
+            self.Nstate["m2m_cont"][self.pointer] -= sqr_pnl
+            self.Nstate["m2m_cNs_cont"][self.pointer] -= sqr_pnl
+
+        self.Nstate["pos_price"][self.pointer] = avg_price
+        self.Nstate["pos"][self.pointer] += order_lot
+        self.Nstate["exec"][self.pointer] += order_lot
+        self.Nstate["cost"][self.pointer] += self.trade_cost * abs(order_lot)
+        self.Nstate["slippage"][self.pointer] += self.slippage * abs(order_lot)
+        self.Nstate["m2m_cNs_cont"][self.pointer] -= (
+            self.trade_cost * abs(order_lot) +
+            self.slippage * abs(order_lot)
+        )
+
     def calculate(
         self,
         timestamp : pd.Timestamp,
     ):
-        while self.pointer < len(self.Ntimestamp) and self.Ntimestamp[self.pointer] <= timestamp:
+        stop = self.bar_stop(timestamp)
+        if self.use_kernel and stop - self.pointer >= self.KERNEL_MIN_BARS:
+            return self.calculate_kernel(timestamp)
+
+        isWorstCase = self.limit_order_exec_mode == self.LimitOrderExecMode.worst_case
+
+        while self.pointer < stop:
             # step 1 : pre value copy
-            self.Ndata[self.pointer, self.colToIdx["pos"]] = self.Ndata[self.pointer-1, self.colToIdx["pos"]]
-            self.Ndata[self.pointer, self.colToIdx["pos_price"]] = self.Ndata[self.pointer-1, self.colToIdx["pos_price"]]
-
-            # step 2 : exec limit order 
-            tmp_pendding_limit_orders = []    
-            for pendding_order in self.pendding_limit_orders:
-                c1 = self.Ndata[self.pointer - 1, self.colToIdx["close"]]
-                c2 = self.Ndata[self.pointer, self.colToIdx["close"]]
-
-                isPriceSwap = False
-                if c1 > c2:
-                    tmp = c1
-                    c1 = c2
-                    c2 = tmp
-                    isPriceSwap = True
-
-                if(
-                    pendding_order.timestamp > self.Ntimestamp[self.pointer]  # pointer is in past timestamp
-                    or (pendding_order.side == OrderSide.buy and pendding_order.price < c1) # buy and wrong range
-                    or (pendding_order.side == OrderSide.sell and pendding_order.price > c2) # sell and wrong range
-                ):
-                    tmp_pendding_limit_orders.append(pendding_order)
-                    continue
-            
-                exec_price_flag = None
-                if pendding_order.side == OrderSide.buy:
-                    exec_price_flag = "c2" if not isPriceSwap else "c1"
-                elif pendding_order.side == OrderSide.sell:
-                    exec_price_flag = "c1" if not isPriceSwap else "c2"
+            self.Nstate["pos"][self.pointer] = self.Nstate["pos"][self.pointer-1]
+            self.Nstate["pos_price"][self.pointer] = self.Nstate["pos_price"][self.pointer-1]
+
+            ts_ns = self.Ntimestamp_ns[self.pointer]
+
+            # step 2 : exec limit order
+            # orders whose timestamp is reached join the book, book return
+            # buy with price >= c1 and sell with price <= c2
+            for seq, order in self.pending.limit_queue.pop_due(ts_ns):
+                self.pending.limit_book.add(seq, order)
 
+            c1 = self.Nclose[self.pointer - 1]
+            c2 = self.Nclose[self.pointer]
+
+            isPriceSwap = False
+            if c1 > c2:
+                c1, c2 = c2, c1
+                isPriceSwap = True
+
+            for _, pendding_order in self.pending.limit_book.fill(c1, c2):
                 order_lot : int = pendding_order.lot
                 if pendding_order.side == OrderSide.sell:
                     order_lot = -order_lot
-                
-                curr_price = None
-                if self.limit_order_exec_mode == self.LimitOrderExecMode.given_price:
-                    curr_price = pendding_order.price
-                elif self.limit_order_exec_mode == self.LimitOrderExecMode.worst_case:
-                    if exec_price_flag == "c1":                    
-                        curr_price = self.Ndata[self.pointer-1, self.colToIdx["close"]]
-                    elif exec_price_flag == "c2":
-                        curr_price = self.Ndata[self.pointer, self.colToIdx["close"]]
-                else:
-                    pass
-
-                prev_pos : int = self.Ndata[self.pointer, self.colToIdx["pos"]]
-                prev_price : float = self.Ndata[self.pointer, self.colToIdx["pos_price"]]
-
-                avg_price, isSomePosSquareOff = avg_price_calculation(
-                    prev_price = prev_price,
-                    prev_pos = prev_pos,
-                    curr_price = curr_price,
-                    curr_pos = order_lot,
-                )
-
-                if isSomePosSquareOff:
-                    sqr_pos_sign = 1 if order_lot >= 0 else -1 
-                    sqr_pos = sqr_pos_sign * min(abs(prev_pos), abs(order_lot))
-
-                    sqr_pnl = curr_price * sqr_pos + prev_price * (-sqr_pos)
-                    self.Ndata[self.pointer, self.colToIdx["m2m"]] -= sqr_pnl
-                    self.Ndata[self.pointer, self.colToIdx["m2m_cont"]] -= sqr_pnl
-                    self.Ndata[self.pointer, self.colToIdx["m2m_cNs_cont"]] -= sqr_pnl
-
-                self.Ndata[self.pointer, self.colToIdx["pos_price"]] = avg_price
-                self.Ndata[self.pointer, self.colToIdx["pos"]] += order_lot
-                self.Ndata[self.pointer, self.colToIdx["exec"]] += order_lot
-                self.Ndata[self.pointer, self.colToIdx["cost"]] += self.trade_cost * abs(order_lot)
-                self.Ndata[self.pointer, self.colToIdx["slippage"]] += self.slippage * abs(order_lot)
-                self.Ndata[self.pointer, self.colToIdx["m2m_cNs_cont"]] -= (
-                    self.trade_cost * abs(order_lot) +
-                    self.slippage * abs(order_lot)
-                )
-
-            self.pendding_limit_orders = tmp_pendding_limit_orders
-
-
-            # step 3 : exec market order 
-            tmp_pendding_market_orders = []
-            for pendding_order in self.pendding_market_orders:
-                
-                if pendding_order.timestamp > self.Ntimestamp[self.pointer]:
-                    tmp_pendding_market_orders.append(pendding_order)
-                    continue
 
+                curr_price = pendding_order.price
+                if isWorstCase:
+                    # buy at c2, sell at c1
+                    if (pendding_order.side == OrderSide.buy) != isPriceSwap:
+                        curr_price = self.Nclose[self.pointer]
+                    else:
+                        curr_price = self.Nclose[self.pointer-1]
+
+                self.execute(order_lot, curr_price)
+
+            # step 3 : exec market order
+            for _, pendding_order in self.pending.market_queue.pop_due(ts_ns):
                 order_lot = pendding_order.lot
                 if pendding_order.side == OrderSide.sell:
                     order_lot = -order_lot
-                prev_pos : float = self.Ndata[self.pointer, self.colToIdx["pos"]]
-                prev_price : float = self.Ndata[self.pointer, self.colToIdx["pos_price"]]
-                curr_price : float = self.Ndata[self.pointer, self.colToIdx["close"]]
-
-                avg_price, isSomePosSquareOff = avg_price_calculation(
-                    prev_price = prev_price,
-                    prev_pos = prev_pos,
-                    curr_price = curr_price,
-                    curr_pos = order_lot,
-                )
-
-                if isSomePosSquareOff:
-                    sqr_pos_sign = 1 if order_lot >= 0 else -1 
-                    sqr_pos = sqr_pos_sign * min(abs(prev_pos), abs(order_lot))
-
-                    sqr_pnl = curr_price * sqr_pos + prev_price * (-sqr_pos)
-                    self.Ndata[self.pointer, self.colToIdx["m2m"]] -= sqr_pnl
-                    self.Ndata[self.pointer, self.colToIdx["m2m_cont"]] -= sqr_pnl
-                    self.Ndata[self.pointer, self.colToIdx["m2m_cNs_cont"]] -= sqr_pnl
-
-                self.Ndata[self.pointer, self.colToIdx["pos_price"]] = avg_price
-                self.Ndata[self.pointer, self.colToIdx["pos"]] += order_lot
-                self.Ndata[self.pointer, self.colToIdx["exec"]] += order_lot
-                self.Ndata[self.pointer, self.colToIdx["cost"]] += self.trade_cost * abs(order_lot)
-                self.Ndata[self.pointer, self.colToIdx["slippage"]] += self.slippage * abs(order_lot)
-                self.Ndata[self.pointer, self.colToIdx["m2m_cNs_cont"]] -= (
-                    self.trade_cost * abs(order_lot) +
-                    self.slippage * abs(order_lot)
-                )
-
-
-            self.pendding_market_orders = tmp_pendding_market_orders
+
+                self.execute(order_lot, self.Nclose[self.pointer])
 
             # step 4 : settle
-            if self.next_settle == None:
-                self.next_settle = pd.Timestamp.combine(self.Ntimestamp[self.pointer].date(), self.settle_on.time())
-                self.next_settle = self.next_settle.tz_localize(self.Ntimestamp[self.pointer].tz)
+            # boundaries are precomputed, settlement time on bar date and
+            # on date of bar + 1 day
+            if self.next_settle_ns == SETTLE_UNSET:
+                self.next_settle_ns = int(self.settle_same_ns[self.pointer])
 
             # if there is some active position than only we required to 
             # settle the price 
-            if self.Ndata[self.pointer, self.colToIdx["pos"]] != 0.0:
-                if self.Ntimestamp[self.pointer] >= self.next_settle:
-                    tmp_ts = self.Ntimestamp[self.pointer] + pd.Timedelta(days=1)
-                    self.next_settle = pd.Timestamp.combine(tmp_ts.date(), self.settle_on.time())
-                    self.next_settle = self.next_settle.tz_localize(self.Ntimestamp[self.pointer].tz)
+            if self.Nstate["pos"][self.pointer] != 0.0:
+                if ts_ns >= self.next_settle_ns:
+                    self.next_settle_ns = int(self.settle_next_ns[self.pointer])
 
-                    settle_price = self.Ndata[self.pointer, self.colToIdx["close"]]
-                    pos = self.Ndata[self.pointer, self.colToIdx["pos"]]
-                    pos_price = self.Ndata[self.pointer, self.colToIdx["pos_price"]]
+                    settle_price = self.Nclose[self.pointer]
+                    pos = self.Nstate["pos"][self.pointer]
+                    pos_price = self.Nstate["pos_price"][self.pointer]
 
                     tmp_pnl =  settle_price * pos + pos_price * (-pos)
 
-                    self.Ndata[self.pointer, self.colToIdx["pos_price"]] = settle_price
-                    self.Ndata[self.pointer, self.colToIdx["m2m"]] += tmp_pnl
-                    self.Ndata[self.pointer, self.colToIdx["m2m_cont"]] += tmp_pnl
-                    self.Ndata[self.pointer, self.colToIdx["m2m_cNs_cont"]] += tmp_pnl
+                    self.Nstate["pos_price"][self.pointer] = settle_price
+                    self.Nstate["m2m"][self.pointer] += tmp_pnl
+                    self.Nstate["m2m_cont"][self.pointer] += tmp_pnl
+                    self.Nstate["m2m_cNs_cont"][self.pointer] += tmp_pnl
 
-                elif self.pointer > 1:
-                    self.Ndata[self.pointer, self.colToIdx["m2m_cont"]] += self.Ndata[self.pointer-1, self.colToIdx["m2m_cont"]]
-                    self.Ndata[self.pointer, self.colToIdx["m2m_cNs_cont"]] += self.Ndata[self.pointer-1, self.colToIdx["m2m_cNs_cont"]]
+                elif self.pointer + self.bar_offset > 1:
+                    self.Nstate["m2m_cont"][self.pointer] += self.Nstate["m2m_cont"][self.pointer-1]
+                    self.Nstate["m2m_cNs_cont"][self.pointer] += self.Nstate["m2m_cNs_cont"][self.pointer-1]
 
             # step 5 : increment itr
             self.pointer += 1
 
 
+    def bar_stop(self, timestamp : pd.Timestamp) -> int:
+        # one past last bar with timestamp <= given timestamp
+        return int(np.searchsorted(
+            self.Ntimestamp_ns,
+            pd.Timestamp(timestamp).as_unit("ns").value,
+            side="right",
+        ))
+
+    @property
+    def Ntimestamp(self) -> pd.DatetimeIndex:
+        return self.Nindex
+
+    def ns_to_timestamp(self, ns : int) -> pd.Timestamp:
+        if self.timezone is None:
+            return pd.Timestamp(ns)
+        return pd.Timestamp(ns, tz="UTC").tz_convert(self.timezone)
+
+    @property
+    def next_settle(self) -> pd.Timestamp | None:
+        if self.next_settle_ns == SETTLE_UNSET:
+            return None
+        return self.ns_to_timestamp(self.next_settle_ns)
+
+    @next_settle.setter
+    def next_settle(self, timestamp : pd.Timestamp | None):
+        if timestamp is None:
+            self.next_settle_ns = SETTLE_UNSET
+        else:
+            self.next_settle_ns = pd.Timestamp(timestamp).as_unit("ns").value
+
+    def settlement_boundaries(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.settle_same_ns, self.settle_next_ns
+
+    def session_key(self) -> np.ndarray:
+        # settlement session of every bar, see performance.session_key
+        return self.Nsession
+
+    def update_metrics(self):
+        # fold bars calculated since last call into metrics
+        start, stop = self.metrics_pointer, self.pointer
+        if stop <= start:
+            return
+
+        self.metrics.update(
+            {col : values[start:stop] for col, values in self.Nstate.items()},
+            self.session_key()[start:stop],
+        )
+        self.metrics_pointer = stop
+
+    def get_summary(self) -> dict:
+        # performance of bars calculated so far
+        self.update_metrics()
+        return self.metrics.summary()
+
+    def save_snapshot(self, path : str) -> str:
+        # compact state to continue this run later without replaying it,
+        # last calculated bar with its state, next settle, pending orders
+        # and metrics, one npz with json meta
+        # return path of written file
+        self.update_metrics()
+        tail = self.pointer - 1
+
+        meta = {
+            "common_settlement_time" : self.common_settlement_time,
+            "trade_cost" : self.trade_cost,
+            "slippage" : self.slippage,
+            "limit_order_exec_mode" : self.limit_order_exec_mode.name,
+            "bar" : self.bar_offset + tail,
+            "timestamp_ns" : int(self.Ntimestamp_ns[tail]),
+            "next_settle_ns" : None if self.next_settle_ns == SETTLE_UNSET else self.next_settle_ns,
+            "seq" : self.pending.seq,
+            "metrics" : self.metrics.to_dict(),
+        }
+
+        arrays = {"close" : self.Nclose[tail:tail+1]}
+        arrays |= {"state_" + col : values[tail:tail+1] for col, values in self.Nstate.items()}
+        arrays |= {"order_" + name : values for name, values in self.pending.to_arrays().items()}
+
+        if not path.endswith(".npz"):
+            path += ".npz"
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+        return path
+
+    @classmethod
+    def resume(
+        cls,
+        path : str,
+        timeseries : pd.DataFrame,
+        use_kernel : bool = True,
+    ) -> "BacktestEngine":
+        # engine of save_snapshot continued over extended timeseries
+        #   timeseries : must have snapshot bar, earlier bars are not used
+        # returned engine start at snapshot bar, get_pd_data row 0 is that
+        # bar and later rows are new bars only
+        with np.load(path, allow_pickle=False) as snapshot:
+            meta = json.loads(str(snapshot["meta"]))
+            arrays = {name : snapshot[name] for name in snapshot.files if name != "meta"}
+
+        ts_ns = pd.DatetimeIndex(timeseries.index).as_unit("ns").asi8
+        start = int(np.searchsorted(ts_ns, meta["timestamp_ns"], side="left"))
+        if start == len(ts_ns) or ts_ns[start] != meta["timestamp_ns"]:
+            raise ValueError(f"[-] snapshot bar {pd.Timestamp(meta['timestamp_ns'])} not in timeseries")
+        if timeseries["close"].iloc[start] != arrays["close"][0]:
+            raise ValueError(f"[-] close of snapshot bar changed, snapshot is not valid for this timeseries")
+
+        engine = cls(
+            timeseries = timeseries.iloc[start:],
+            common_settlement_time = meta["common_settlement_time"],
+            trade_cost = meta["trade_cost"],
+            slippage = meta["slippage"],
+            limit_order_exec_mode = cls.LimitOrderExecMode[meta["limit_order_exec_mode"]],
+            use_kernel = use_kernel,
+        )
+        engine.bar_offset = meta["bar"]
+        for col in engine.Nstate:
+            engine.Nstate[col][0] = arrays["state_" + col][0]
+
+        if meta["next_settle_ns"] is not None:
+            engine.next_settle_ns = meta["next_settle_ns"]
+        engine.pending = PendingOrders.from_arrays(
+            {name[len("order_"):] : values for name, values in arrays.items() if name.startswith("order_")},
+            meta["seq"],
+            engine.ns_to_timestamp,
+        )
+
+        # snapshot bar is already folded
+        engine.metrics = RunningMetrics.from_dict(meta["metrics"])
+        engine.metrics_pointer = 1
+        return engine
+
+    def calculate_vectorized(
+        self,
+        order_timestamp : np.ndarray | None = None,
+        order_lot : np.ndarray | None = None,
+    ):
+        # market orders only, run whole timeseries at once
+        #   order_timestamp, order_lot : extra orders (signed lot) placed
+        #                                after pending ones
+        # result is same as placing every order and calling complete()
+        if self.pointer != 1:
+            raise Exception(f"[-] calculate_vectorized only run on fresh engine")
+        if len(self.pendding_limit_orders) != 0:
+            raise Exception(f"[-] calculate_vectorized only support market orders")
+
+        ts_list = [pd.Timestamp(order.timestamp).as_unit("ns").value for order in self.pendding_market_orders]
+        lot_list = [
+            -order.lot if order.side == OrderSide.sell else order.lot
+            for order in self.pendding_market_orders
+        ]
+
+        all_ts = np.array(ts_list, dtype=np.int64)
+        all_lot = np.array(lot_list, dtype=np.int64)
+        if order_timestamp is not None:
+            order_timestamp = pd.DatetimeIndex(order_timestamp).as_unit("ns").asi8
+            all_ts = np.concatenate([all_ts, order_timestamp])
+            all_lot = np.concatenate([all_lot, np.asarray(order_lot, dtype=np.int64)])
+
+        n = len(self.Ntimestamp_ns)
+        if n < 2:
+            return
+
+        # due on first bar with timestamp >= order timestamp
+        order_bar = np.maximum(np.searchsorted(self.Ntimestamp_ns, all_ts, side="left"), 1)
+        isDue = order_bar < n
+
+        state, next_settle = market_order_backtest(
+            close = self.Nclose,
+            timestamp_ns = self.Ntimestamp_ns,
+            settle_same_ns = self.settle_same_ns,
+            settle_next_ns = self.settle_next_ns,
+            order_bar = order_bar[isDue],
+            order_lot = all_lot[isDue],
+            trade_cost = self.trade_cost,
+            slippage = self.slippage,
+        )
+
+        for col, values in state.items():
+            self.Nstate[col][:] = values
+
+        self.pendding_market_orders = [
+            MarketOrder(
+                timestamp = self.ns_to_timestamp(ts),
+                side = OrderSide.buy if lot > 0 else OrderSide.sell,
+                lot = abs(lot),
+            )
+            for ts, lot in zip(all_ts[~isDue].tolist(), all_lot[~isDue].tolist())
+        ]
+        self.next_settle_ns = next_settle
+        self.pointer = n
+
     def get_m2m(
         self,
         timestamp : pd.Timestamp,
     ): 
         self.calculate(timestamp)
-        return self.Ndata[self.pointer-1, self.colToIdx["m2m_cont"]]
+        return self.Nstate["m2m_cont"][self.pointer-1]
         # ASSUMPTION
         # to get row with given timestamp 
         # data source and order placing data should be same
@@ -282,25 +649,32 @@ class BacktestEngine:
         timestamp : pd.Timestamp,
     ):
         self.calculate(timestamp)
-        return self.Ndata[self.pointer-1, self.colToIdx["m2m_cNs_cont"]]
+        return self.Nstate["m2m_cNs_cont"][self.pointer-1]
 
     def get_pos(
         self,
         timestamp : pd.Timestamp,
     ):
         self.calculate(timestamp)
-        return self.Ndata[self.pointer-1, self.colToIdx["pos"]]
+        return self.Nstate["pos"][self.pointer-1]
 
     def complete(self):
         self.calculate(self.Ntimestamp[-1])
 
-    def get_pd_data(self):
-        df_timestamp = pd.DataFrame(self.Ntimestamp, columns=["timestamp"])
-        df_data = pd.DataFrame(self.Ndata, columns=list(self.colToIdx.keys()))
-
-        df = pd.concat([df_timestamp, df_data], axis=1)
-
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df.set_index(["timestamp"], inplace=True)
+    @property
+    def Ndata(self) -> np.ndarray:
+        # input and state columns as one 2d array, copy for old callers
+        # prefer Nstate / get_pd_data
+        return np.column_stack(list(self.Ninput.values()) + list(self.Nstate.values()))
 
+    def get_pd_data(self) -> pd.DataFrame:
+        # columns are views of engine arrays, not copies
+        df = pd.DataFrame(self.Ninput | self.Nstate, index=self.Nindex, copy=False)
+        df.index.name = "timestamp"
         return df
+
+    def to_arrow(self) -> pa.Table:
+        # timestamp, input and state columns, numeric columns zero copy
+        arrays = [pa.array(self.Ntimestamp_ns).view(pa.timestamp("ns", tz=None if self.timezone is None else str(self.timezone)))]
+        arrays += [pa.array(values) for values in (self.Ninput | self.Nstate).values()]
+        return pa.Table.from_arrays(arrays, names=["timestamp"] + list(self.Ninput.keys()) + list(self.Nstate.keys()))
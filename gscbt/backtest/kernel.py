@@ -0,0 +1,266 @@
+import numpy as np
+
+# numba is optional, without it kernel still runs as plain python
+# (slow, BacktestEngine then keeps its own python loop instead)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# next_settle not initialized yet
+SETTLE_UNSET = np.iinfo(np.int64).min
+
+
+@njit(cache=True)
+def avg_price_kernel(
+    prev_price : float,
+    prev_pos : float,
+    curr_price : float,
+    curr_pos : float,
+) -> tuple[float, bool]:
+    # same as utils.avg_price_calculation
+    if prev_pos == 0:
+        return curr_price, False
+    elif (prev_pos < 0 and curr_pos < 0) or (prev_pos >= 0 and curr_pos >= 0):
+        return ((prev_pos * prev_price) + (curr_pos * curr_price))/(prev_pos + curr_pos), False
+    else:
+        if prev_pos + curr_pos == 0:
+            return 0.0, True
+        elif abs(prev_pos) > abs(curr_pos):
+            return prev_price, True
+        else:
+            return curr_price, True
+
+
+@njit(cache=True)
+def execute_kernel(
+    p : int,
+    lot : int,
+    curr_price : float,
+    trade_cost : float,
+    slippage : float,
+    exec_ : np.ndarray,
+    pos : np.ndarray,
+    pos_price : np.ndarray,
+    m2m : np.ndarray,
+    m2m_cont : np.ndarray,
+    cost : np.ndarray,
+    slip : np.ndarray,
+    m2m_cNs_cont : np.ndarray,
+):
+    prev_pos = pos[p]
+    prev_price = pos_price[p]
+
+    avg_price, isSomePosSquareOff = avg_price_kernel(prev_price, prev_pos, curr_price, lot)
+
+    if isSomePosSquareOff:
+        sqr_pos_sign = 1 if lot >= 0 else -1
+        sqr_pos = sqr_pos_sign * min(abs(prev_pos), abs(lot))
+
+        sqr_pnl = curr_price * sqr_pos + prev_price * (-sqr_pos)
+        m2m[p] -= sqr_pnl
+        m2m_cont[p] -= sqr_pnl
+        m2m_cNs_cont[p] -= sqr_pnl
+
+    pos_price[p] = avg_price
+    pos[p] += lot
+    exec_[p] += lot
+    cost[p] += trade_cost * abs(lot)
+    slip[p] += slippage * abs(lot)
+    m2m_cNs_cont[p] -= (
+        trade_cost * abs(lot) +
+        slippage * abs(lot)
+    )
+
+
+@njit(cache=True)
+def heap_push(heap : np.ndarray, size : int, key : np.ndarray, itr : int) -> int:
+    # min-heap of order index by key[index], return new size
+    child = size
+    heap[child] = itr
+    while child > 0:
+        parent = (child - 1) // 2
+        if key[heap[parent]] <= key[heap[child]]:
+            break
+        heap[parent], heap[child] = heap[child], heap[parent]
+        child = parent
+    return size + 1
+
+
+@njit(cache=True)
+def heap_pop(heap : np.ndarray, size : int, key : np.ndarray) -> int:
+    # drop top of heap, return new size
+    size -= 1
+    heap[0] = heap[size]
+    parent = 0
+    while True:
+        child = 2 * parent + 1
+        if child >= size:
+            break
+        if child + 1 < size and key[heap[child + 1]] < key[heap[child]]:
+            child += 1
+        if key[heap[parent]] <= key[heap[child]]:
+            break
+        heap[parent], heap[child] = heap[child], heap[parent]
+        parent = child
+    return size
+
+
+@njit(cache=True)
+def calculate_kernel(
+    start : int,
+    stop : int,
+    bar_offset : int,
+    close : np.ndarray,
+    timestamp_ns : np.ndarray,
+    settle_same_ns : np.ndarray,
+    settle_next_ns : np.ndarray,
+    next_settle : int,
+    market_ts : np.ndarray,
+    market_seq : np.ndarray,
+    market_lot : np.ndarray,
+    market_done : np.ndarray,
+    limit_ts : np.ndarray,
+    limit_is_buy : np.ndarray,
+    limit_lot : np.ndarray,
+    limit_price : np.ndarray,
+    limit_done : np.ndarray,
+    worst_case : bool,
+    trade_cost : float,
+    slippage : float,
+    exec_ : np.ndarray,
+    pos : np.ndarray,
+    pos_price : np.ndarray,
+    m2m : np.ndarray,
+    m2m_cont : np.ndarray,
+    cost : np.ndarray,
+    slip : np.ndarray,
+    m2m_cNs_cont : np.ndarray,
+) -> int:
+    # BacktestEngine.calculate state machine for bars [start, stop)
+    #   market_* : pending market orders sorted by timestamp, market_seq
+    #              is placement order
+    #   limit_*  : pending limit orders in placement order, active ones
+    #              are kept in per-side price heaps so a bar only touches
+    #              marketable orders
+    #   lot is signed, sell < 0, *_done is set for executed orders
+    #   bar_offset : global index of bar 0, first bar never carries
+    # return next_settle (epoch ns) after stop
+    market_count = len(market_ts)
+    market_cursor = 0
+    while market_cursor < market_count and market_done[market_cursor]:
+        market_cursor += 1
+
+    # limit orders activate in timestamp order, buy heap top is highest
+    # price, sell heap top is lowest price
+    limit_count = len(limit_ts)
+    limit_activation = np.argsort(limit_ts, kind="mergesort")
+    limit_cursor = 0
+    buy_key = -limit_price
+    sell_key = limit_price.copy()
+    buy_heap = np.empty(limit_count, dtype=np.int64)
+    sell_heap = np.empty(limit_count, dtype=np.int64)
+    buy_size = 0
+    sell_size = 0
+    filled = np.empty(limit_count, dtype=np.int64)
+
+    for p in range(start, stop):
+        # step 1 : pre value copy
+        pos[p] = pos[p-1]
+        pos_price[p] = pos_price[p-1]
+
+        # step 2 : exec limit order
+        c1 = close[p-1]
+        c2 = close[p]
+        isPriceSwap = False
+        if c1 > c2:
+            c1, c2 = c2, c1
+            isPriceSwap = True
+
+        while limit_cursor < limit_count and limit_ts[limit_activation[limit_cursor]] <= timestamp_ns[p]:
+            itr = limit_activation[limit_cursor]
+            limit_cursor += 1
+            if limit_done[itr]:
+                continue
+            if limit_is_buy[itr]:
+                buy_size = heap_push(buy_heap, buy_size, buy_key, itr)
+            else:
+                sell_size = heap_push(sell_heap, sell_size, sell_key, itr)
+
+        # buy fills at price >= c1, sell at price <= c2
+        filled_count = 0
+        while buy_size > 0 and limit_price[buy_heap[0]] >= c1:
+            filled[filled_count] = buy_heap[0]
+            filled_count += 1
+            buy_size = heap_pop(buy_heap, buy_size, buy_key)
+        while sell_size > 0 and limit_price[sell_heap[0]] <= c2:
+            filled[filled_count] = sell_heap[0]
+            filled_count += 1
+            sell_size = heap_pop(sell_heap, sell_size, sell_key)
+
+        # executed in placement order
+        fill_order = np.sort(filled[:filled_count]) if filled_count > 1 else filled[:filled_count]
+        for fill_itr in range(filled_count):
+            itr = fill_order[fill_itr]
+            isBuy = limit_is_buy[itr]
+
+            curr_price = limit_price[itr]
+            if worst_case:
+                # buy at c2, sell at c1 of unswapped closes
+                if isBuy != isPriceSwap:
+                    curr_price = close[p]
+                else:
+                    curr_price = close[p-1]
+
+            execute_kernel(
+                p, limit_lot[itr], curr_price, trade_cost, slippage,
+                exec_, pos, pos_price, m2m, m2m_cont, cost, slip, m2m_cNs_cont,
+            )
+            limit_done[itr] = True
+
+        # step 3 : exec market order, due ones in placement order
+        due_end = market_cursor
+        while due_end < market_count and market_ts[due_end] <= timestamp_ns[p]:
+            due_end += 1
+
+        if due_end > market_cursor:
+            due_order = np.argsort(market_seq[market_cursor:due_end], kind="mergesort")
+            for due_itr in range(len(due_order)):
+                itr = market_cursor + due_order[due_itr]
+                if market_done[itr]:
+                    continue
+
+                execute_kernel(
+                    p, market_lot[itr], close[p], trade_cost, slippage,
+                    exec_, pos, pos_price, m2m, m2m_cont, cost, slip, m2m_cNs_cont,
+                )
+                market_done[itr] = True
+            market_cursor = due_end
+
+        # step 4 : settle
+        if next_settle == SETTLE_UNSET:
+            next_settle = settle_same_ns[p]
+
+        if pos[p] != 0.0:
+            if timestamp_ns[p] >= next_settle:
+                next_settle = settle_next_ns[p]
+
+                settle_price = close[p]
+                tmp_pnl = settle_price * pos[p] + pos_price[p] * (-pos[p])
+
+                pos_price[p] = settle_price
+                m2m[p] += tmp_pnl
+                m2m_cont[p] += tmp_pnl
+                m2m_cNs_cont[p] += tmp_pnl
+
+            elif p + bar_offset > 1:
+                m2m_cont[p] += m2m_cont[p-1]
+                m2m_cNs_cont[p] += m2m_cNs_cont[p-1]
+
+    return next_settle
@@ -0,0 +1,287 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+import pandas as pd
+
+from .order import (
+    OrderSide,
+    Order,
+    MarketOrder,
+    LimitOrder,
+)
+
+
+class OrderQueue:
+    # pending orders ordered by (timestamp ns, placement seq)
+    # only orders due at a bar are touched
+
+    def __init__(self):
+        self._heap : list[tuple[int, int, Order]] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, ts_ns : int, seq : int, order : Order):
+        heapq.heappush(self._heap, (ts_ns, seq, order))
+
+    def push_many(self, items : list[tuple[int, int, Order]]):
+        # (ts_ns, seq, order), one heapify instead of push per order
+        if len(items) == 0:
+            return
+        self._heap.extend(items)
+        heapq.heapify(self._heap)
+
+    def pop_due(self, ts_ns : int) -> list[tuple[int, Order]]:
+        # (seq, order) with timestamp <= ts_ns, in placement order
+        return [(seq, order) for _, seq, order in self.pop_due_entries(ts_ns)]
+
+    def pop_due_entries(self, ts_ns : int) -> list[tuple[int, int, Order]]:
+        # (ts_ns, seq, order) with timestamp <= ts_ns, in placement order
+        due = []
+        while len(self._heap) != 0 and self._heap[0][0] <= ts_ns:
+            due.append(heapq.heappop(self._heap))
+
+        due.sort(key=lambda entry: entry[1])
+        return due
+
+    def items(self) -> list[tuple[int, Order]]:
+        return [(seq, order) for _, seq, order in self._heap]
+
+    def entries(self) -> list[tuple[int, int, Order]]:
+        # (ts_ns, seq, order) in placement order
+        return sorted(self._heap, key=lambda entry: entry[1])
+
+    def clear(self):
+        self._heap.clear()
+
+
+class LimitOrderBook:
+    # active limit orders, per side sorted by (price, seq)
+    #   buy  fills when price >= lower close, a suffix of buy book
+    #   sell fills when price <= upper close, a prefix of sell book
+
+    def __init__(self):
+        self._buy_keys : list[tuple[float, int]] = []
+        self._buy_orders : dict[int, LimitOrder] = {}
+        self._sell_keys : list[tuple[float, int]] = []
+        self._sell_orders : dict[int, LimitOrder] = {}
+
+    def __len__(self) -> int:
+        return len(self._buy_keys) + len(self._sell_keys)
+
+    def add(self, seq : int, order : LimitOrder):
+        # NaN never compares, it would break sorted keys of book
+        if order.price != order.price:
+            raise ValueError(f"[-] limit order price is NaN")
+
+        if order.side == OrderSide.buy:
+            insort(self._buy_keys, (order.price, seq))
+            self._buy_orders[seq] = order
+        else:
+            insort(self._sell_keys, (order.price, seq))
+            self._sell_orders[seq] = order
+
+    def fill(self, low : float, high : float) -> list[tuple[int, LimitOrder]]:
+        # (seq, order) filled in [low, high] close range, in placement order
+        itr = bisect_left(self._buy_keys, (low, -1))
+        filled_buy = self._buy_keys[itr:]
+        del self._buy_keys[itr:]
+
+        itr = bisect_right(self._sell_keys, (high, float("inf")))
+        filled_sell = self._sell_keys[:itr]
+        del self._sell_keys[:itr]
+
+        filled = [(seq, self._buy_orders.pop(seq)) for _, seq in filled_buy]
+        filled += [(seq, self._sell_orders.pop(seq)) for _, seq in filled_sell]
+
+        filled.sort(key=lambda item: item[0])
+        return filled
+
+    def items(self) -> list[tuple[int, LimitOrder]]:
+        return list(self._buy_orders.items()) + list(self._sell_orders.items())
+
+    def clear(self):
+        self._buy_keys.clear()
+        self._buy_orders.clear()
+        self._sell_keys.clear()
+        self._sell_orders.clear()
+
+
+class PendingOrders:
+    # every pending order of an engine, keyed by (timestamp ns, placement seq)
+    #   limit orders move to per-side price sorted book once active
+
+    # kind of order in to_arrays
+    MARKET, LIMIT, ACTIVE_LIMIT = 0, 1, 2
+
+    def __init__(self):
+        self.seq : int = 0
+        self.market_queue : OrderQueue = OrderQueue()
+        self.limit_queue : OrderQueue = OrderQueue()
+        self.limit_book : LimitOrderBook = LimitOrderBook()
+
+    def __len__(self) -> int:
+        return len(self.market_queue) + len(self.limit_queue) + len(self.limit_book)
+
+    def place(self, order : Order):
+        if isinstance(order, MarketOrder):
+            queue = self.market_queue
+        elif isinstance(order, LimitOrder):
+            queue = self.limit_queue
+            if order.price != order.price:
+                raise ValueError(f"[-] limit order price is NaN")
+        else:
+            raise Exception(f"[-] Invalid order")
+
+        # positions are kept as int64
+        if order.lot != int(order.lot):
+            raise ValueError(f"[-] lot must be whole number, got {order.lot}")
+
+        queue.push(pd.Timestamp(order.timestamp).as_unit("ns").value, self.seq, order)
+        self.seq += 1
+
+    def place_many(
+        self,
+        timestamp : pd.DatetimeIndex,
+        ts_ns : np.ndarray,
+        signed_lot : np.ndarray,
+        price : np.ndarray,
+    ):
+        # price NaN for market order
+        market_items = []
+        limit_items = []
+        seq = self.seq
+        for order_ts, ns, order_lot, order_price in zip(
+            timestamp, ts_ns.tolist(), signed_lot.tolist(), price.tolist()
+        ):
+            order_side = OrderSide.sell if order_lot < 0 else OrderSide.buy
+            if order_price != order_price: # nan
+                market_items.append((ns, seq, MarketOrder(order_ts, order_side, abs(order_lot))))
+            else:
+                limit_items.append((ns, seq, LimitOrder(order_ts, order_side, abs(order_lot), order_price)))
+            seq += 1
+
+        self.market_queue.push_many(market_items)
+        self.limit_queue.push_many(limit_items)
+        self.seq = seq
+
+    def market_orders(self) -> list[MarketOrder]:
+        # in placement order
+        return [order for _, order in sorted(self.market_queue.items(), key=lambda item: item[0])]
+
+    def limit_orders(self) -> list[LimitOrder]:
+        # in placement order, inactive and active ones
+        items = self.limit_queue.items() + self.limit_book.items()
+        return [order for _, order in sorted(items, key=lambda item: item[0])]
+
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        # columnar copy of every pending order, for engine snapshot
+        #   kind     : MARKET, LIMIT waiting for timestamp, ACTIVE_LIMIT in book
+        #   queue_ns : heap key, order_ns : order timestamp
+        rows = [(self.MARKET, ns, seq, order) for ns, seq, order in self.market_queue.entries()]
+        rows += [(self.LIMIT, ns, seq, order) for ns, seq, order in self.limit_queue.entries()]
+        rows += [(self.ACTIVE_LIMIT, 0, seq, order) for seq, order in self.limit_book.items()]
+        rows.sort(key=lambda row: row[2])
+
+        return {
+            "kind" : np.array([row[0] for row in rows], dtype=np.int8),
+            "queue_ns" : np.array([row[1] for row in rows], dtype=np.int64),
+            "seq" : np.array([row[2] for row in rows], dtype=np.int64),
+            "order_ns" : np.array([pd.Timestamp(row[3].timestamp).as_unit("ns").value for row in rows], dtype=np.int64),
+            "lot" : np.array([-row[3].lot if row[3].side == OrderSide.sell else row[3].lot for row in rows], dtype=np.int64),
+            "price" : np.array([getattr(row[3], "price", np.nan) for row in rows], dtype=np.float64),
+        }
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays : dict[str, np.ndarray],
+        seq : int,
+        to_timestamp,
+    ) -> "PendingOrders":
+        # inverse of to_arrays, to_timestamp(ns) rebuild order timestamp
+        pending = cls()
+        pending.seq = seq
+
+        market_items = []
+        limit_items = []
+        for kind, queue_ns, order_seq, order_ns, lot, price in zip(
+            arrays["kind"].tolist(),
+            arrays["queue_ns"].tolist(),
+            arrays["seq"].tolist(),
+            arrays["order_ns"].tolist(),
+            arrays["lot"].tolist(),
+            arrays["price"].tolist(),
+        ):
+            order_side = OrderSide.sell if lot < 0 else OrderSide.buy
+            if kind == cls.MARKET:
+                market_items.append((queue_ns, order_seq, MarketOrder(to_timestamp(order_ns), order_side, abs(lot))))
+                continue
+
+            order = LimitOrder(to_timestamp(order_ns), order_side, abs(lot), price)
+            if kind == cls.LIMIT:
+                limit_items.append((queue_ns, order_seq, order))
+            else:
+                pending.limit_book.add(order_seq, order)
+
+        pending.market_queue.push_many(market_items)
+        pending.limit_queue.push_many(limit_items)
+        return pending
+
+
+def order_columns(
+    orders : pd.DataFrame | None = None,
+    timestamp = None,
+    lot = None,
+    side = None,
+    price = None,
+    position = None,
+) -> tuple[pd.DatetimeIndex, np.ndarray, np.ndarray | None, np.ndarray | None, np.ndarray | None]:
+    # columns of place_orders, DataFrame columns or arrays of
+    #   timestamp : order timestamp, DataFrame may keep it as index
+    #   lot       : signed lot (sell < 0), or unsigned lot with side
+    #   side      : OrderSide or "buy" / "sell"
+    #   price     : limit price, NaN for market order
+    #   position  : target position instead of lot, market orders only
+    # return timestamp, ts_ns, signed lot, price, position, only one of
+    # signed lot (with price) or position is set
+    if orders is not None:
+        timestamp = orders["timestamp"] if "timestamp" in orders.columns else orders.index
+        lot = orders["lot"] if "lot" in orders.columns else None
+        side = orders["side"] if "side" in orders.columns else None
+        price = orders["price"] if "price" in orders.columns else None
+        position = orders["position"] if "position" in orders.columns else None
+
+    if timestamp is None:
+        raise ValueError(f"[-] place_orders timestamp is missing")
+    if (lot is None) == (position is None):
+        raise ValueError(f"[-] place_orders need exactly one of lot or position")
+
+    timestamp = pd.DatetimeIndex(timestamp)
+    ts_ns = timestamp.as_unit("ns").asi8
+
+    if position is not None:
+        if price is not None:
+            raise ValueError(f"[-] place_orders position orders are market orders, price not allowed")
+        if np.any(np.asarray(position, dtype=np.float64) % 1 != 0):
+            raise ValueError(f"[-] place_orders position must be whole number")
+        return timestamp, ts_ns, None, None, np.asarray(position, dtype=np.int64)
+
+    if np.any(np.asarray(lot) % 1 != 0):
+        raise ValueError(f"[-] place_orders lot must be whole number")
+    signed_lot = np.asarray(lot, dtype=np.int64)
+    if side is not None:
+        side = np.asarray(side, dtype=object)
+        isSell = (side == OrderSide.sell) | (side == "sell")
+        signed_lot = np.where(isSell, -np.abs(signed_lot), np.abs(signed_lot))
+
+    if price is None:
+        price = np.full(len(ts_ns), np.nan)
+    price = np.asarray(price, dtype=np.float64)
+
+    if not (len(ts_ns) == len(signed_lot) == len(price)):
+        raise ValueError(f"[-] place_orders columns length mismatch")
+
+    return timestamp, ts_ns, signed_lot, price, None
@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+
+
+class RunningMetrics:
+    # performance accumulators folded over engine state, bar range by bar
+    # range, nothing per bar is kept
+    #   equity     : booked pnl (m2m) - cost - slippage, cumulative
+    #   session    : bars between two settlements, a bar belongs to the
+    #                session of previous bar so settlement bar close it
+    #   daily pnl  : net pnl per closed session, only session list is kept
+
+    def __init__(self):
+        self.bars : int = 0
+        self.pnl : float = 0.0
+        self.cost : float = 0.0
+        self.slippage : float = 0.0
+        self.trades : int = 0
+        self.turnover : int = 0
+        self.final_pos : int = 0
+
+        self.equity : float = 0.0
+        self.peak_equity : float = 0.0
+        self.max_drawdown : float = 0.0
+
+        self.session_key : int | None = None
+        self.session_pnl : float = 0.0
+        self.daily_pnl : list[float] = []
+
+    def update(
+        self,
+        state : dict[str, np.ndarray],
+        session_key : np.ndarray | None = None,
+    ):
+        # state : BacktestEngine state columns of new bars
+        # session_key : session of every new bar, None skip daily pnl
+        m2m = state["m2m"]
+        if len(m2m) == 0:
+            return
+
+        exec_ = state["exec"]
+        net = m2m - state["cost"] - state["slippage"]
+
+        self.bars += len(m2m)
+        self.pnl += float(m2m.sum())
+        self.cost += float(state["cost"].sum())
+        self.slippage += float(state["slippage"].sum())
+        self.trades += int(np.count_nonzero(exec_))
+        self.turnover += int(np.abs(exec_).sum())
+        self.final_pos = int(state["pos"][-1])
+
+        equity = self.equity + np.cumsum(net)
+        peak = np.maximum(np.maximum.accumulate(equity), self.peak_equity)
+        self.max_drawdown = max(self.max_drawdown, float((peak - equity).max()))
+        self.peak_equity = float(peak[-1])
+        self.equity = float(equity[-1])
+
+        if session_key is None:
+            return
+
+        # net pnl of every run of same session
+        isNewRun = np.ones(len(session_key), dtype=bool)
+        isNewRun[1:] = session_key[1:] != session_key[:-1]
+        run_start = np.flatnonzero(isNewRun)
+        run_pnl = np.add.reduceat(net, run_start)
+        run_key = session_key[run_start]
+
+        for key, pnl in zip(run_key.tolist(), run_pnl.tolist()):
+            if key != self.session_key:
+                if self.session_key is not None:
+                    self.daily_pnl.append(self.session_pnl)
+                self.session_key = key
+                self.session_pnl = 0.0
+            self.session_pnl += pnl
+
+    def to_dict(self) -> dict:
+        # json-able accumulators, for engine snapshot
+        return dict(vars(self), daily_pnl=list(self.daily_pnl))
+
+    @classmethod
+    def from_dict(cls, values : dict) -> "RunningMetrics":
+        metrics = cls()
+        for name, value in values.items():
+            setattr(metrics, name, value)
+        metrics.daily_pnl = list(metrics.daily_pnl)
+        return metrics
+
+    def summary(self) -> dict:
+        daily = np.array(self.daily_pnl, dtype=np.float64)
+        isActive = daily != 0.0
+
+        sharpe = math.nan
+        if len(daily) > 1 and daily.std(ddof=1) != 0.0:
+            sharpe = float(daily.mean() / daily.std(ddof=1) * math.sqrt(252))
+
+        gross = self.pnl
+        return {
+            "bars" : self.bars,
+            "pnl" : gross,
+            "cost" : self.cost,
+            "slippage" : self.slippage,
+            "net" : gross - self.cost - self.slippage,
+            "cost_ratio" : (self.cost + self.slippage) / abs(gross) if gross != 0.0 else math.nan,
+            "trades" : self.trades,
+            "turnover" : self.turnover,
+            "final_pos" : self.final_pos,
+            "peak_equity" : self.peak_equity,
+            "max_drawdown" : self.max_drawdown,
+            "sessions" : len(daily),
+            "daily_mean" : float(daily.mean()) if len(daily) != 0 else math.nan,
+            "sharpe" : sharpe,
+            "hit_rate" : float((daily[isActive] > 0.0).mean()) if isActive.any() else math.nan,
+        }
+
+
+def session_key(
+    timestamp_ns : np.ndarray,
+    settle_same_ns : np.ndarray,
+    settle_next_ns : np.ndarray,
+) -> np.ndarray:
+    # session of every bar as epoch ns of settlement closing it, bar
+    # belongs to session of previous bar so first bar at or after a
+    # settlement time (where engine settles) close that session
+    session_end = np.where(timestamp_ns < settle_same_ns, settle_same_ns, settle_next_ns)
+    # settle_next_ns is bar + 24h, on eve of DST change late bars skip a
+    # day, first boundary of any later bar is the right one
+    session_end = np.minimum.accumulate(session_end[::-1])[::-1]
+    key = np.empty_like(session_end)
+    key[1:] = session_end[:-1]
+    key[:1] = session_end[:1]
+    return key
+
+
+def summarize_state(
+    state : dict[str, np.ndarray],
+    timestamp_ns : np.ndarray,
+    settle_same_ns : np.ndarray,
+    settle_next_ns : np.ndarray,
+) -> dict:
+    # RunningMetrics of whole state in one NumPy pass, for state columns
+    # of vectorized.market_order_backtest without building a DataFrame
+    metrics = RunningMetrics()
+    metrics.update(state, session_key(timestamp_ns, settle_same_ns, settle_next_ns))
+    return metrics.summary()
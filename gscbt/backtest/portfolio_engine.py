@@ -0,0 +1,280 @@
+import numpy as np
+import pandas as pd
+
+from gscbt.synthetic_utils import get_cost, get_slippage
+
+from .order import (
+    OrderSide,
+    MarketOrder,
+)
+from .utils import settlement_boundaries
+from .vectorized import portfolio_market_order_backtest
+
+
+class PortfolioBacktestEngine:
+    # market orders on many instruments sharing one timeline
+    # pre-req
+    #   close - (time x instrument) close, aligned and without NaN
+    #         - index timezone same as BacktestEngine timeseries
+    #
+    # every instrument follows BacktestEngine rules with its own trade
+    # cost, slippage and settlement time, portfolio columns are sum over
+    # instruments
+
+    STATE_COLUMNS = [
+        "exec",
+        "pos",
+        "pos_price",
+        "m2m",
+        "m2m_cont",
+        "cost",
+        "slippage",
+        "m2m_cNs_cont" # cNs = cost and slippage added
+    ]
+
+    def __init__(
+        self,
+        close : pd.DataFrame,
+        settlement_time : str | dict[str, str],
+        trade_cost : float | dict[str, float],
+        slippage : float | dict[str, float],
+    ):
+        # settlement_time, trade_cost, slippage : one value for every
+        #                                         instrument or per column
+        if close.isna().to_numpy().any():
+            raise ValueError(f"[-] close matrix has NaN, align and fill it first")
+
+        self.instruments : list[str] = list(close.columns)
+        self.instToIdx : dict[str, int] = {inst : itr for itr, inst in enumerate(self.instruments)}
+
+        self.Nindex : pd.DatetimeIndex = pd.DatetimeIndex(close.index).as_unit("ns")
+        self.Ntimestamp_ns : np.ndarray = self.Nindex.asi8
+        self.Nclose : np.ndarray = close.to_numpy(dtype=np.float64)
+
+        self.settlement_time : list[str] = self.per_instrument(settlement_time, "settlement_time")
+        self.trade_cost : np.ndarray = np.array(self.per_instrument(trade_cost, "trade_cost"), dtype=np.float64)
+        self.slippage : np.ndarray = np.array(self.per_instrument(slippage, "slippage"), dtype=np.float64)
+
+        # one boundary column per distinct settlement time
+        settle_times = sorted(set(self.settlement_time))
+        self.settle_group : np.ndarray = np.array(
+            [settle_times.index(settle_time) for settle_time in self.settlement_time],
+            dtype=np.int64,
+        )
+        boundaries = [settlement_boundaries(self.Nindex, settle_time) for settle_time in settle_times]
+        self.settle_same_ns : np.ndarray = np.column_stack([same for same, _ in boundaries])
+        self.settle_next_ns : np.ndarray = np.column_stack([nxt for _, nxt in boundaries])
+
+        # placed orders, columnar chunks of (timestamp ns, instrument, signed lot)
+        self.orders : list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+        self.state : dict[str, np.ndarray] | None = None
+        self.next_settle : np.ndarray | None = None
+        self.pendding_order_count : int = 0
+
+    @classmethod
+    def from_expressions(
+        cls,
+        close : pd.DataFrame,
+        settlement_time : str | dict[str, str],
+    ) -> "PortfolioBacktestEngine":
+        # columns are synthetic expressions, cost and slippage from tickers
+        return cls(
+            close = close,
+            settlement_time = settlement_time,
+            trade_cost = {expression : get_cost(expression) for expression in close.columns},
+            slippage = {expression : get_slippage(expression) for expression in close.columns},
+        )
+
+    def per_instrument(self, value, name : str) -> list:
+        if not isinstance(value, dict):
+            return [value] * len(self.instruments)
+
+        missing = [inst for inst in self.instruments if inst not in value]
+        if len(missing) != 0:
+            raise ValueError(f"[-] {name} missing for {missing}")
+        return [value[inst] for inst in self.instruments]
+
+    def inst_idx(self, instrument) -> np.ndarray:
+        instrument = np.atleast_1d(np.asarray(instrument, dtype=object))
+        try:
+            return np.array([self.instToIdx[inst] for inst in instrument], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"[-] unknown instrument {e}")
+
+    def place_order(self, instrument : str, order : MarketOrder):
+        if not isinstance(order, MarketOrder):
+            raise Exception(f"only order type allowed is [MarketOrder]")
+
+        # positions are kept as int64
+        if order.lot != int(order.lot):
+            raise ValueError(f"[-] lot must be whole number, got {order.lot}")
+
+        lot = -order.lot if order.side == OrderSide.sell else order.lot
+        self.add_orders((
+            np.array([pd.Timestamp(order.timestamp).as_unit("ns").value], dtype=np.int64),
+            self.inst_idx(instrument),
+            np.array([lot], dtype=np.int64),
+        ))
+
+    def place_orders(
+        self,
+        orders : pd.DataFrame | None = None,
+        timestamp = None,
+        instrument = None,
+        lot = None,
+        side = None,
+    ):
+        # columnar market orders, DataFrame columns or arrays of
+        #   timestamp  : order timestamp, DataFrame may keep it as index
+        #   instrument : column of close
+        #   lot        : signed lot (sell < 0), or unsigned lot with side
+        if orders is not None:
+            timestamp = orders["timestamp"] if "timestamp" in orders.columns else orders.index
+            instrument = orders["instrument"]
+            lot = orders["lot"]
+            side = orders["side"] if "side" in orders.columns else None
+
+        ts_ns = pd.DatetimeIndex(timestamp).as_unit("ns").asi8
+        if np.any(np.asarray(lot) % 1 != 0):
+            raise ValueError(f"[-] place_orders lot must be whole number")
+        signed_lot = np.asarray(lot, dtype=np.int64)
+        if side is not None:
+            side = np.asarray(side, dtype=object)
+            isSell = (side == OrderSide.sell) | (side == "sell")
+            signed_lot = np.where(isSell, -np.abs(signed_lot), np.abs(signed_lot))
+
+        inst = self.inst_idx(instrument)
+        if not (len(ts_ns) == len(inst) == len(signed_lot)):
+            raise ValueError(f"[-] place_orders columns length mismatch")
+
+        self.add_orders((ts_ns, inst, signed_lot))
+
+    def add_orders(self, chunk : tuple[np.ndarray, np.ndarray, np.ndarray]):
+        # (ts_ns, inst, signed lot) chunk, result of earlier complete() is
+        # stale once new orders are placed
+        self.orders.append(chunk)
+        self.state = None
+        self.next_settle = None
+
+    def order_bar(self, ts_ns : np.ndarray) -> np.ndarray:
+        # due on first bar with timestamp >= order timestamp
+        return np.maximum(np.searchsorted(self.Ntimestamp_ns, ts_ns, side="left"), 1)
+
+    def placed_lot(self, bar : np.ndarray | None = None) -> np.ndarray:
+        # sum of signed lot placed so far per instrument, with bar only
+        # orders due up to each bar, (bar x instrument)
+        ts_ns = np.concatenate([chunk[0] for chunk in self.orders] + [np.zeros(0, dtype=np.int64)])
+        inst = np.concatenate([chunk[1] for chunk in self.orders] + [np.zeros(0, dtype=np.int64)])
+        lot = np.concatenate([chunk[2] for chunk in self.orders] + [np.zeros(0, dtype=np.int64)])
+
+        if bar is None:
+            total = np.zeros(len(self.instruments), dtype=np.int64)
+            np.add.at(total, inst, lot)
+            return total
+
+        order_bar = self.order_bar(ts_ns)
+        total = np.zeros((len(bar), len(self.instruments)), dtype=np.int64)
+        for itr in np.unique(inst):
+            isInst = inst == itr
+            bar_seq = np.argsort(order_bar[isInst], kind="stable")
+            cum = np.concatenate([[0], lot[isInst][bar_seq].cumsum()])
+            total[:, itr] = cum[np.searchsorted(order_bar[isInst][bar_seq], bar, side="right")]
+        return total
+
+    def place_positions(self, position : pd.DataFrame):
+        # target position per instrument, (timestamp x instrument) frame
+        # NaN keeps previous target, latest target of a bar wins, resolved
+        # against position after already placed orders due by target bar
+        position = position.sort_index()
+        inst = self.inst_idx(list(position.columns))
+
+        values = position.to_numpy(dtype=np.float64)
+        if np.any(values[~np.isnan(values)] % 1 != 0):
+            raise ValueError(f"[-] place_positions position must be whole number")
+
+        ts_ns = pd.DatetimeIndex(position.index).as_unit("ns").asi8
+        order_bar = self.order_bar(ts_ns)
+        isLastOfBar = np.append(order_bar[1:] != order_bar[:-1], True)
+
+        # placed lots run before new orders of same bar (placement order),
+        # position before each target is previous target plus placed lots
+        # due in between
+        placed_due = self.placed_lot(order_bar[isLastOfBar])[:, inst].astype(np.float64)
+        target = position.ffill().to_numpy(dtype=np.float64)[isLastOfBar]
+        target = np.where(np.isnan(target), placed_due, target)
+
+        signed_lot = np.diff(target, axis=0, prepend=0.0) - np.diff(placed_due, axis=0, prepend=0.0)
+        row, col = np.nonzero(signed_lot)
+
+        self.add_orders((
+            ts_ns[isLastOfBar][row],
+            inst[col],
+            signed_lot[row, col].astype(np.int64),
+        ))
+
+    def complete(self):
+        # run every placed order over whole timeline
+        n = len(self.Ntimestamp_ns)
+        m = len(self.instruments)
+
+        ts_ns = np.concatenate([chunk[0] for chunk in self.orders] + [np.zeros(0, dtype=np.int64)])
+        inst = np.concatenate([chunk[1] for chunk in self.orders] + [np.zeros(0, dtype=np.int64)])
+        lot = np.concatenate([chunk[2] for chunk in self.orders] + [np.zeros(0, dtype=np.int64)])
+
+        order_bar = self.order_bar(ts_ns)
+        isDue = order_bar < n
+        self.pendding_order_count = int((~isDue).sum())
+
+        if n < 2:
+            self.state = {
+                col : np.zeros((n, m), dtype=np.int64 if col in ["exec", "pos"] else np.float64)
+                for col in self.STATE_COLUMNS
+            }
+            self.next_settle = np.zeros(m, dtype=np.int64)
+            return
+
+        self.state, self.next_settle = portfolio_market_order_backtest(
+            close = self.Nclose,
+            timestamp_ns = self.Ntimestamp_ns,
+            settle_same_ns = self.settle_same_ns,
+            settle_next_ns = self.settle_next_ns,
+            settle_group = self.settle_group,
+            order_bar = order_bar[isDue],
+            order_inst = inst[isDue],
+            order_lot = lot[isDue],
+            trade_cost = self.trade_cost,
+            slippage = self.slippage,
+        )
+
+    def get_pd_data(self, instrument : str) -> pd.DataFrame:
+        # same columns as BacktestEngine.get_pd_data of that instrument
+        if self.state is None:
+            self.complete()
+
+        itr = self.inst_idx(instrument)[0]
+        df = pd.DataFrame(
+            {"close" : self.Nclose[:, itr]} | {col : self.state[col][:, itr] for col in self.STATE_COLUMNS},
+            index = self.Nindex,
+        )
+        df.index.name = "timestamp"
+        return df
+
+    def get_portfolio_data(self) -> pd.DataFrame:
+        # money columns summed over instruments
+        if self.state is None:
+            self.complete()
+
+        df = pd.DataFrame(
+            {col : self.state[col].sum(axis=1) for col in ["m2m", "m2m_cont", "cost", "slippage", "m2m_cNs_cont"]},
+            index = self.Nindex,
+        )
+        df.index.name = "timestamp"
+        return df
+
+    def get_state(self, col : str) -> pd.DataFrame:
+        # (time x instrument) frame of one state column
+        if self.state is None:
+            self.complete()
+
+        return pd.DataFrame(self.state[col], index=self.Nindex, columns=self.instruments)
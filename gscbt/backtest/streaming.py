@@ -0,0 +1,189 @@
+from typing import Callable, Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .order import Order
+from .order_book import (
+    PendingOrders,
+    order_columns,
+)
+from .backtest_engine import BacktestEngine
+from .performance import RunningMetrics
+from .kernel import SETTLE_UNSET
+
+
+class FrameSink:
+    # keep every chunk, result is same frame as BacktestEngine.get_pd_data
+    # only for runs that fit in memory
+
+    def __init__(self):
+        self.frames : list[pd.DataFrame] = []
+
+    def write(self, df : pd.DataFrame):
+        self.frames.append(df.copy())
+
+    def close(self) -> pd.DataFrame:
+        return pd.concat(self.frames)
+
+
+class ParquetSink:
+    # append every chunk as row group of one parquet file
+
+    def __init__(self, path : str):
+        self.path = path
+        self._writer : pq.ParquetWriter | None = None
+
+    def write(self, df : pd.DataFrame):
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> str:
+        if self._writer is not None:
+            self._writer.close()
+        return self.path
+
+
+class SummarySink:
+    # running totals over every bar, nothing per bar is kept
+    # session metrics need settlement time, see StreamingBacktestEngine.get_summary
+    KEYS = ("bars", "pnl", "cost", "slippage", "net", "trades", "turnover", "final_pos", "peak_equity", "max_drawdown")
+
+    def __init__(self):
+        self.metrics : RunningMetrics = RunningMetrics()
+
+    def write(self, df : pd.DataFrame):
+        self.metrics.update({col : df[col].to_numpy() for col in BacktestEngine.STATE_DTYPES})
+
+    def close(self) -> dict:
+        summary = self.metrics.summary()
+        return {key : summary[key] for key in self.KEYS}
+
+
+class StreamingBacktestEngine:
+    # BacktestEngine over timeseries coming in chunks
+    #
+    # every chunk is run by a BacktestEngine over [carry row] + chunk,
+    # carry row is last bar of previous chunk with its state, so pointer
+    # starting at 1 continues right after it. Only carry row, next settle
+    # and pending orders are kept between chunks, bar state goes to sink
+    #   sink : object with write(df) and close(), SummarySink by default
+
+    def __init__(
+        self,
+        common_settlement_time : str,
+        trade_cost : float,
+        slippage : float,
+        limit_order_exec_mode : BacktestEngine.LimitOrderExecMode = BacktestEngine.LimitOrderExecMode.worst_case,
+        use_kernel : bool = True,
+        sink = None,
+    ):
+        self.common_settlement_time : str = common_settlement_time
+        self.trade_cost : float = trade_cost
+        self.slippage : float = slippage
+        self.limit_order_exec_mode = limit_order_exec_mode
+        self.use_kernel : bool = use_kernel
+        self.sink = sink if sink is not None else SummarySink()
+
+        # shared with engine of every chunk
+        self.pending : PendingOrders = PendingOrders()
+        self.next_settle_ns : int = SETTLE_UNSET
+        self.timezone = None
+
+        self.bars : int = 0
+        self.carry_input : pd.DataFrame | None = None
+        self.carry_state : dict[str, int | float] = {}
+        self.metrics : RunningMetrics = RunningMetrics()
+
+    def chunk_engine(self, timeseries : pd.DataFrame) -> BacktestEngine:
+        engine = BacktestEngine(
+            timeseries = timeseries,
+            common_settlement_time = self.common_settlement_time,
+            trade_cost = self.trade_cost,
+            slippage = self.slippage,
+            limit_order_exec_mode = self.limit_order_exec_mode,
+            use_kernel = self.use_kernel,
+        )
+        engine.pending = self.pending
+        engine.next_settle_ns = self.next_settle_ns
+        engine.metrics = self.metrics
+        return engine
+
+    @property
+    def next_settle(self) -> pd.Timestamp | None:
+        if self.next_settle_ns == SETTLE_UNSET:
+            return None
+        if self.timezone is None:
+            return pd.Timestamp(self.next_settle_ns)
+        return pd.Timestamp(self.next_settle_ns, tz="UTC").tz_convert(self.timezone)
+
+    def place_order(self, order : Order):
+        self.pending.place(order)
+
+    def place_orders(
+        self,
+        orders : pd.DataFrame | None = None,
+        timestamp = None,
+        lot = None,
+        side = None,
+        price = None,
+    ):
+        # BacktestEngine.place_orders without target position, bars of
+        # future chunks are not known yet
+        timestamp, ts_ns, signed_lot, price, _ = order_columns(orders, timestamp, lot, side, price)
+        self.pending.place_many(timestamp, ts_ns, signed_lot, price)
+
+    def process(self, chunk : pd.DataFrame):
+        # run one chunk, its bars are written to sink
+        if len(chunk) == 0:
+            return
+
+        isCarried = self.carry_input is not None
+        if isCarried:
+            timeseries = pd.concat([self.carry_input, chunk])
+        else:
+            timeseries = chunk
+
+        engine = self.chunk_engine(timeseries)
+        if isCarried:
+            engine.bar_offset = self.bars - 1
+            engine.metrics_pointer = 1 # carry row is already folded
+            for col, value in self.carry_state.items():
+                engine.Nstate[col][0] = value
+
+        engine.complete()
+        engine.update_metrics()
+
+        self.next_settle_ns = engine.next_settle_ns
+        self.timezone = engine.timezone
+        self.carry_input = timeseries.iloc[-1:].copy()
+        self.carry_state = {col : values[-1] for col, values in engine.Nstate.items()}
+
+        df = engine.get_pd_data()
+        if isCarried:
+            df = df.iloc[1:]
+        self.bars += len(chunk)
+
+        self.sink.write(df)
+
+    def get_summary(self) -> dict:
+        # performance of every bar processed so far
+        return self.metrics.summary()
+
+    def run(
+        self,
+        chunks : Iterable[pd.DataFrame],
+        on_chunk : Callable | None = None,
+    ):
+        # on_chunk(engine, chunk) is called before chunk is run, to place
+        # orders of that chunk
+        # return sink.close()
+        for chunk in chunks:
+            if on_chunk is not None:
+                on_chunk(self, chunk)
+            self.process(chunk)
+
+        return self.sink.close()
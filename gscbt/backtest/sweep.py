@@ -0,0 +1,357 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from .utils import settlement_boundaries
+from .vectorized import market_order_backtest
+from .performance import session_key
+
+
+class SweepData:
+    # bar arrays shared by every parameter set of a sweep
+    #   close, timestamp_ns, settle_same_ns, settle_next_ns
+    # to_shared() copies them once into shared memory, pool workers
+    # attach() by name instead of getting a copy per task
+    NAMES = ("close", "timestamp_ns", "settle_same_ns", "settle_next_ns")
+
+    def __init__(
+        self,
+        arrays : dict[str, np.ndarray],
+        timezone : str | None = None,
+        shms : list[shared_memory.SharedMemory] | None = None,
+    ):
+        self.arrays = arrays
+        self.timezone = timezone
+        self._shms = list(shms or [])
+
+        for name in self.NAMES:
+            setattr(self, name, arrays[name])
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @classmethod
+    def from_timeseries(
+        cls,
+        timeseries : pd.DataFrame,
+        common_settlement_time : str,
+    ) -> "SweepData":
+        index = pd.DatetimeIndex(timeseries.index).as_unit("ns")
+        settle_same_ns, settle_next_ns = settlement_boundaries(index, common_settlement_time)
+
+        return cls({
+            "close" : timeseries["close"].to_numpy(dtype=np.float64),
+            "timestamp_ns" : index.asi8,
+            "settle_same_ns" : settle_same_ns,
+            "settle_next_ns" : settle_next_ns,
+        }, None if index.tz is None else str(index.tz))
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(pd.to_datetime(self.timestamp_ns, unit="ns", utc=True))
+        if self.timezone is None:
+            return index.tz_localize(None)
+        return index.tz_convert(self.timezone)
+
+    def slice(self, start : int, stop : int) -> "SweepData":
+        # bars [start, stop) as views, nothing is copied
+        return SweepData({name : self.arrays[name][start:stop] for name in self.NAMES}, self.timezone)
+
+    def session_key(self) -> np.ndarray:
+        return session_key(self.timestamp_ns, self.settle_same_ns, self.settle_next_ns)
+
+    def to_shared(self) -> "SweepData":
+        arrays = {}
+        shms = []
+        for name in self.NAMES:
+            src = np.ascontiguousarray(self.arrays[name])
+            shm = shared_memory.SharedMemory(create=True, size=max(src.nbytes, 1))
+            dst = np.ndarray(src.shape, dtype=src.dtype, buffer=shm.buf)
+            dst[:] = src
+            arrays[name] = dst
+            shms.append(shm)
+
+        return SweepData(arrays, self.timezone, shms)
+
+    def spec(self) -> dict:
+        # picklable handle of shared arrays, for attach() in other process
+        if len(self._shms) == 0:
+            raise ValueError(f"[-] SweepData is not in shared memory, call to_shared()")
+
+        return {
+            "timezone" : self.timezone,
+            "arrays" : {
+                name : (shm.name, len(self.arrays[name]), self.arrays[name].dtype.str)
+                for name, shm in zip(self.NAMES, self._shms)
+            },
+        }
+
+    @classmethod
+    def attach(cls, spec : dict) -> "SweepData":
+        arrays = {}
+        shms = []
+        for name, (shm_name, length, dtype) in spec["arrays"].items():
+            shm = shared_memory.SharedMemory(name=shm_name)
+            arr = np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf)
+            arr.flags.writeable = False
+            arrays[name] = arr
+            shms.append(shm)
+
+        return cls(arrays, spec["timezone"], shms)
+
+    def release(self):
+        self.arrays = {}
+        for name in self.NAMES:
+            setattr(self, name, None)
+        for shm in self._shms:
+            shm.close()
+
+    def unlink(self):
+        shms = self._shms
+        self.release()
+        for shm in shms:
+            shm.unlink()
+        self._shms = []
+
+
+def summarize_positions(
+    close : np.ndarray,
+    position : np.ndarray,
+    trade_cost : float,
+    slippage : float,
+    session : np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    # compact summary of (strategy x time) target positions
+    #   position[k, t] : position held after bar t, traded at close of bar t
+    #                    position[:, 0] is ignored, no order on first bar
+    #   session        : SweepData.session_key(), adds daily pnl metrics
+    #                    over marked to close net pnl of closed sessions
+    # every pnl is marked to close on every bar (*_m2c), it includes open
+    # position pnl after last settlement. engine books pnl at settlement,
+    # so session split (daily_mean, sharpe, hit_rate) and equity can differ
+    # from engine RunningMetrics, totals agree once position is flat
+    position = np.array(np.atleast_2d(position), dtype=np.float64)
+    position[:, 0] = 0.0
+
+    # matrix can be large, two (strategy x time) buffers are reused
+    # for bar pnl -> net equity and turnover -> drawdown
+    turnover = np.diff(position, axis=1, prepend=0.0)
+    trades = np.count_nonzero(turnover, axis=1)
+    np.abs(turnover, out=turnover)
+    lots = turnover.sum(axis=1)
+
+    equity = np.empty_like(position)
+    equity[:, 0] = 0.0
+    np.multiply(position[:, :-1], np.diff(close), out=equity[:, 1:])
+    pnl = equity.sum(axis=1)
+
+    turnover *= trade_cost + slippage
+    equity -= turnover
+
+    # net pnl per session, last session is still open
+    daily = None
+    if session is not None:
+        isNewRun = np.ones(len(session), dtype=bool)
+        isNewRun[1:] = session[1:] != session[:-1]
+        daily = np.add.reduceat(equity, np.flatnonzero(isNewRun), axis=1)[:, :-1]
+
+    np.cumsum(equity, axis=1, out=equity)
+
+    drawdown = np.maximum.accumulate(equity, axis=1, out=turnover)
+    peak_equity = drawdown[:, -1].copy()
+    drawdown -= equity
+
+    cost = trade_cost * lots
+    slip = slippage * lots
+    summary = {
+        "pnl_m2c" : pnl,
+        "cost" : cost,
+        "slippage" : slip,
+        "net_m2c" : pnl - cost - slip,
+        "peak_equity_m2c" : peak_equity,
+        "max_drawdown_m2c" : drawdown.max(axis=1),
+        "trades" : trades,
+        "turnover" : lots,
+        "final_pos" : position[:, -1],
+    }
+
+    if daily is not None:
+        summary |= daily_summary(daily)
+    return summary
+
+
+def daily_summary(daily : np.ndarray) -> dict[str, np.ndarray]:
+    # (strategy x session) net pnl -> session metrics as RunningMetrics
+    sessions = daily.shape[1]
+    isActive = daily != 0.0
+    active = isActive.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = daily.mean(axis=1) if sessions != 0 else np.full(len(daily), np.nan)
+        std = daily.std(axis=1, ddof=1) if sessions > 1 else np.zeros(len(daily))
+        sharpe = np.where(std != 0.0, mean / std * np.sqrt(252), np.nan)
+        hit_rate = np.where(active != 0, ((daily > 0.0).sum(axis=1)) / active, np.nan)
+
+    return {
+        "sessions" : np.full(len(daily), sessions),
+        "daily_mean" : mean,
+        "sharpe" : sharpe,
+        "hit_rate" : hit_rate,
+    }
+
+
+def position_backtest(
+    data : SweepData,
+    position : np.ndarray,
+    trade_cost : float,
+    slippage : float,
+) -> pd.DataFrame:
+    # full BacktestEngine columns of one target position series
+    # position[0] is ignored as in summarize_positions
+    position = np.array(position, dtype=np.float64)
+    position[:1] = 0.0
+    exec_ = np.diff(position, prepend=0.0)
+    order_bar = np.flatnonzero(exec_)
+
+    state, _ = market_order_backtest(
+        close = data.close,
+        timestamp_ns = data.timestamp_ns,
+        settle_same_ns = data.settle_same_ns,
+        settle_next_ns = data.settle_next_ns,
+        order_bar = order_bar,
+        order_lot = exec_[order_bar],
+        trade_cost = trade_cost,
+        slippage = slippage,
+    )
+
+    df = pd.DataFrame(state, index=data.index)
+    df.insert(0, "close", data.close)
+    df.index.name = "timestamp"
+    return df
+
+
+def evaluate(
+    data : SweepData,
+    strategy : Callable,
+    params : dict,
+    trade_cost : float,
+    slippage : float,
+    full_series : bool = False,
+) -> tuple[dict, pd.DataFrame | None]:
+    position = np.asarray(strategy(data, params), dtype=np.float64)
+    if position.shape != (len(data),):
+        raise ValueError(f"[-] strategy returned shape {position.shape}, expected ({len(data)},)")
+
+    summary = {
+        key : value[0].item()
+        for key, value in summarize_positions(data.close, position, trade_cost, slippage, data.session_key()).items()
+    }
+
+    series = None
+    if full_series:
+        series = position_backtest(data, position, trade_cost, slippage)
+    return summary, series
+
+
+# SweepData of pool worker, attached once by initializer
+_worker_data : SweepData | None = None
+
+def _init_worker(spec : dict):
+    global _worker_data
+    _worker_data = SweepData.attach(spec)
+
+def _run_chunk(
+    strategy : Callable,
+    params_list : list[dict],
+    trade_cost : float,
+    slippage : float,
+    full_series : bool,
+) -> list[tuple[dict, pd.DataFrame | None]]:
+    return [
+        evaluate(_worker_data, strategy, params, trade_cost, slippage, full_series)
+        for params in params_list
+    ]
+
+
+def summary_frame(params_list : list[dict], summaries : list[dict]) -> pd.DataFrame:
+    df = pd.concat([pd.DataFrame(params_list), pd.DataFrame(summaries)], axis=1)
+    df.index.name = "run"
+    return df
+
+
+def run_sweep(
+    data : SweepData,
+    strategy : Callable,
+    params_list : list[dict],
+    trade_cost : float,
+    slippage : float,
+    processes : int | None = None,
+    chunksize : int | None = None,
+    full_series : bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, list[pd.DataFrame]]:
+    # strategy(data, params) -> target position per bar, must be picklable
+    # (module level) when run on process pool
+    #   processes : None for every core, 1 run in current process
+    # return one summary row per params, with full_series also
+    # BacktestEngine columns per params
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1 or len(params_list) <= 1:
+        results = [
+            evaluate(data, strategy, params, trade_cost, slippage, full_series)
+            for params in params_list
+        ]
+    else:
+        if chunksize is None:
+            chunksize = max(1, -(-len(params_list) // (processes * 4)))
+        chunks = [params_list[itr:itr+chunksize] for itr in range(0, len(params_list), chunksize)]
+
+        shared = data.to_shared()
+        try:
+            with ProcessPoolExecutor(
+                max_workers = processes,
+                initializer = _init_worker,
+                initargs = (shared.spec(),),
+            ) as pool:
+                futures = [
+                    pool.submit(_run_chunk, strategy, chunk, trade_cost, slippage, full_series)
+                    for chunk in chunks
+                ]
+                results = [result for future in futures for result in future.result()]
+        finally:
+            shared.unlink()
+
+    df = summary_frame(params_list, [summary for summary, _ in results])
+    if full_series:
+        return df, [series for _, series in results]
+    return df
+
+
+def run_sweep_batched(
+    data : SweepData,
+    strategy : Callable,
+    params_list : list[dict],
+    trade_cost : float,
+    slippage : float,
+    batch_size : int = 256,
+) -> pd.DataFrame:
+    # strategy(data, params_batch) -> (len(params_batch) x bars) target
+    # positions, whole batch is summarized as one state matrix
+    session = data.session_key()
+    summaries = {}
+    for itr in range(0, len(params_list), batch_size):
+        batch = params_list[itr:itr+batch_size]
+        position = np.asarray(strategy(data, batch), dtype=np.float64)
+        if position.shape != (len(batch), len(data)):
+            raise ValueError(f"[-] strategy returned shape {position.shape}, expected ({len(batch)}, {len(data)})")
+
+        for key, value in summarize_positions(data.close, position, trade_cost, slippage, session).items():
+            summaries.setdefault(key, []).append(value)
+
+    summaries = {key : np.concatenate(value) for key, value in summaries.items()}
+    return summary_frame(params_list, pd.DataFrame(summaries).to_dict("records"))
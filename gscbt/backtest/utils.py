@@ -1,5 +1,6 @@
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 from gscbt.utils import Dotdict
@@ -42,4 +43,31 @@ def avg_price_calculation(
         elif abs(prev_pos) > abs(curr_pos):
             return prev_price, True
         else:
-            return curr_price, True
\ No newline at end of file
+            return curr_price, True
+
+DAY_NS = 86_400 * 1_000_000_000
+
+def settlement_boundaries(
+    index : pd.DatetimeIndex,
+    common_settlement_time : str,
+) -> tuple[np.ndarray, np.ndarray]:
+    # epoch ns of settlement time on date of every bar and on date of
+    # bar + 1 day, in timezone of index (DST aware), same values
+    # BacktestEngine.calculate builds with pd.Timestamp.combine
+    index = pd.DatetimeIndex(index).as_unit("ns")
+    settle_offset = pd.Timestamp("1970-01-01 " + common_settlement_time) - pd.Timestamp("1970-01-01")
+
+    def boundary(idx : pd.DatetimeIndex) -> np.ndarray:
+        # wall clock day of every bar, one boundary per run of same day
+        days = idx.tz_localize(None).asi8 // DAY_NS
+        isNewDay = np.ones(len(days), dtype=bool)
+        isNewDay[1:] = days[1:] != days[:-1]
+        uniq_days = days[isNewDay]
+        inverse = np.cumsum(isNewDay) - 1
+
+        settle = pd.DatetimeIndex(uniq_days * DAY_NS).as_unit("ns") + settle_offset
+        if idx.tz is not None:
+            settle = settle.tz_localize(idx.tz)
+        return settle.asi8[inverse]
+
+    return boundary(index), boundary(index + pd.Timedelta(days=1))
@@ -0,0 +1,367 @@
+import numpy as np
+
+from .utils import avg_price_calculation
+
+
+def market_order_backtest(
+    close : np.ndarray,
+    timestamp_ns : np.ndarray,
+    settle_same_ns : np.ndarray,
+    settle_next_ns : np.ndarray,
+    order_bar : np.ndarray,
+    order_lot : np.ndarray,
+    trade_cost : float,
+    slippage : float,
+) -> tuple[dict[str, np.ndarray], int]:
+    # state columns of BacktestEngine for market orders known up front
+    #   order_bar : bar each order is executed on (>= 1), orders of one
+    #               bar in placement order
+    #   order_lot : signed lot, sell < 0
+    #
+    # the path dependent part (avg price, square off pnl, settlement) is
+    # walked only on bars with an order or a settlement, every other bar
+    # is filled with cumulative / forward fill operations
+    # return state columns and next settle (epoch ns) after last bar
+    n = len(close)
+
+    order_bar = np.asarray(order_bar, dtype=np.int64)
+    order_lot = np.asarray(order_lot, dtype=np.int64)
+    order_seq = np.argsort(order_bar, kind="stable")
+    order_bar = order_bar[order_seq]
+    order_lot = order_lot[order_seq]
+
+    abs_lot = np.abs(order_lot)
+
+    exec_ = np.zeros(n, dtype=np.int64)
+    cost = np.zeros(n)
+    slip = np.zeros(n)
+    np.add.at(exec_, order_bar, order_lot)
+    np.add.at(cost, order_bar, trade_cost * abs_lot)
+    np.add.at(slip, order_bar, slippage * abs_lot)
+
+    pos_arr = np.cumsum(exec_)
+
+    event_bar = []
+    event_pos_price = []
+    event_m2m = []
+    event_cont = []
+    event_cNs = []
+
+    order_count = len(order_bar)
+    order_bar_list = order_bar.tolist()
+    order_lot_list = order_lot.tolist()
+
+    next_settle = int(settle_same_ns[1]) if n > 1 else 0
+    pos = 0.0
+    pos_price = 0.0
+    cont = 0.0
+    cNs = 0.0
+    last_bar = 0
+    itr = 0
+    # first bar at or after next_settle, searched once per next_settle
+    settle_bar = n
+    settle_bar_of = None
+
+    while True:
+        order_p = order_bar_list[itr] if itr < order_count else n
+
+        settle_p = n
+        if pos != 0.0:
+            if settle_bar_of != next_settle:
+                settle_bar = int(np.searchsorted(timestamp_ns, next_settle, side="left"))
+                settle_bar_of = next_settle
+            settle_p = max(last_bar + 1, settle_bar)
+
+        p = min(order_p, settle_p)
+        if p >= n:
+            break
+
+        # m2m_cont of bar p-1, carried from last event only while in position
+        prev_cont, prev_cNs = 0.0, 0.0
+        if last_bar == p - 1 or pos != 0.0:
+            prev_cont, prev_cNs = cont, cNs
+
+        curr_price = float(close[p])
+        m2m_p = 0.0
+        cont_p = 0.0
+        cNs_p = 0.0
+
+        while itr < order_count and order_bar_list[itr] == p:
+            lot = order_lot_list[itr]
+
+            avg_price, isSomePosSquareOff = avg_price_calculation(
+                prev_price = pos_price,
+                prev_pos = pos,
+                curr_price = curr_price,
+                curr_pos = lot,
+            )
+
+            if isSomePosSquareOff:
+                sqr_pos_sign = 1 if lot >= 0 else -1
+                sqr_pos = sqr_pos_sign * min(abs(pos), abs(lot))
+
+                sqr_pnl = curr_price * sqr_pos + pos_price * (-sqr_pos)
+                m2m_p -= sqr_pnl
+                cont_p -= sqr_pnl
+                cNs_p -= sqr_pnl
+
+            pos_price = avg_price
+            pos += lot
+            cNs_p -= (
+                trade_cost * abs(lot) +
+                slippage * abs(lot)
+            )
+            itr += 1
+
+        if pos != 0.0:
+            if timestamp_ns[p] >= next_settle:
+                next_settle = int(settle_next_ns[p])
+
+                tmp_pnl = curr_price * pos + pos_price * (-pos)
+
+                pos_price = curr_price
+                m2m_p += tmp_pnl
+                cont_p += tmp_pnl
+                cNs_p += tmp_pnl
+
+            elif p > 1:
+                cont_p += prev_cont
+                cNs_p += prev_cNs
+
+        event_bar.append(p)
+        event_pos_price.append(pos_price)
+        event_m2m.append(m2m_p)
+        event_cont.append(cont_p)
+        event_cNs.append(cNs_p)
+
+        cont, cNs = cont_p, cNs_p
+        last_bar = p
+
+    event_bar = np.array(event_bar, dtype=np.int64)
+
+    # last event at or before every bar, -1 before first event
+    last_event = np.searchsorted(event_bar, np.arange(n), side="right") - 1
+    has_event = last_event >= 0
+    last_event = np.maximum(last_event, 0)
+
+    pos_price_arr = np.zeros(n)
+    m2m = np.zeros(n)
+    m2m_cont = np.zeros(n)
+    m2m_cNs_cont = np.zeros(n)
+
+    if len(event_bar) != 0:
+        event_pos_price = np.array(event_pos_price)
+        event_cont = np.array(event_cont)
+        event_cNs = np.array(event_cNs)
+
+        pos_price_arr = np.where(has_event, event_pos_price[last_event], 0.0)
+
+        # bars without event only carry while in position
+        in_pos = has_event & (pos_arr != 0.0)
+        m2m_cont = np.where(in_pos, event_cont[last_event], 0.0)
+        m2m_cNs_cont = np.where(in_pos, event_cNs[last_event], 0.0)
+
+        m2m[event_bar] = event_m2m
+        m2m_cont[event_bar] = event_cont
+        m2m_cNs_cont[event_bar] = event_cNs
+
+    state = {
+        "exec" : exec_,
+        "pos" : pos_arr,
+        "pos_price" : pos_price_arr,
+        "m2m" : m2m,
+        "m2m_cont" : m2m_cont,
+        "cost" : cost,
+        "slippage" : slip,
+        "m2m_cNs_cont" : m2m_cNs_cont,
+    }
+    return state, next_settle
+
+
+def portfolio_market_order_backtest(
+    close : np.ndarray,
+    timestamp_ns : np.ndarray,
+    settle_same_ns : np.ndarray,
+    settle_next_ns : np.ndarray,
+    settle_group : np.ndarray,
+    order_bar : np.ndarray,
+    order_inst : np.ndarray,
+    order_lot : np.ndarray,
+    trade_cost : np.ndarray,
+    slippage : np.ndarray,
+) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    # market_order_backtest for (time x instrument) close on one timeline
+    #   settle_*_ns  : (time x settlement time) boundaries, settle_group
+    #                  is column of every instrument
+    #   order_*      : bar (>= 1), instrument column and signed lot, orders
+    #                  of one bar in placement order
+    #   trade_cost, slippage : per instrument
+    #
+    # every instrument is stepped on every event bar (order or settlement
+    # of any instrument), settlement and carry are done for all at once
+    # return (time x instrument) state columns and next settle per instrument
+    n, m = close.shape
+
+    order_bar = np.asarray(order_bar, dtype=np.int64)
+    order_inst = np.asarray(order_inst, dtype=np.int64)
+    order_lot = np.asarray(order_lot, dtype=np.int64)
+    order_seq = np.argsort(order_bar, kind="stable")
+    order_bar = order_bar[order_seq]
+    order_inst = order_inst[order_seq]
+    order_lot = order_lot[order_seq]
+
+    abs_lot = np.abs(order_lot)
+
+    exec_ = np.zeros((n, m), dtype=np.int64)
+    cost = np.zeros((n, m))
+    slip = np.zeros((n, m))
+    np.add.at(exec_, (order_bar, order_inst), order_lot)
+    np.add.at(cost, (order_bar, order_inst), trade_cost[order_inst] * abs_lot)
+    np.add.at(slip, (order_bar, order_inst), slippage[order_inst] * abs_lot)
+
+    pos_arr = np.cumsum(exec_, axis=0)
+
+    event_bar = []
+    event_pos_price = []
+    event_m2m = []
+    event_cont = []
+    event_cNs = []
+
+    order_count = len(order_bar)
+    order_bar_list = order_bar.tolist()
+    order_inst_list = order_inst.tolist()
+    order_lot_list = order_lot.tolist()
+    trade_cost_list = trade_cost.tolist()
+    slippage_list = slippage.tolist()
+
+    next_settle = settle_same_ns[1, settle_group].copy() if n > 1 else np.zeros(m, dtype=np.int64)
+    pos = np.zeros(m)
+    pos_price = np.zeros(m)
+    cont = np.zeros(m)
+    cNs = np.zeros(m)
+    last_bar = 0
+    itr = 0
+    # first bar at or after next_settle, searched once per next_settle
+    settle_bar = np.full(m, n, dtype=np.int64)
+    settle_bar_of = np.full(m, np.iinfo(np.int64).min, dtype=np.int64)
+
+    while True:
+        order_p = order_bar_list[itr] if itr < order_count else n
+
+        settle_p = n
+        isInPos = pos != 0.0
+        if isInPos.any():
+            isStale = isInPos & (settle_bar_of != next_settle)
+            if isStale.any():
+                settle_bar[isStale] = np.searchsorted(timestamp_ns, next_settle[isStale], side="left")
+                settle_bar_of[isStale] = next_settle[isStale]
+            settle_p = max(last_bar + 1, int(settle_bar[isInPos].min()))
+
+        p = min(order_p, settle_p)
+        if p >= n:
+            break
+
+        # m2m_cont of bar p-1, carried from last event only while in position
+        isCarried = isInPos | (last_bar == p - 1)
+        prev_cont = np.where(isCarried, cont, 0.0)
+        prev_cNs = np.where(isCarried, cNs, 0.0)
+
+        curr_price = close[p]
+        m2m_p = np.zeros(m)
+        cont_p = np.zeros(m)
+        cNs_p = np.zeros(m)
+
+        while itr < order_count and order_bar_list[itr] == p:
+            inst = order_inst_list[itr]
+            lot = order_lot_list[itr]
+            price = float(curr_price[inst])
+
+            avg_price, isSomePosSquareOff = avg_price_calculation(
+                prev_price = pos_price[inst],
+                prev_pos = pos[inst],
+                curr_price = price,
+                curr_pos = lot,
+            )
+
+            if isSomePosSquareOff:
+                sqr_pos_sign = 1 if lot >= 0 else -1
+                sqr_pos = sqr_pos_sign * min(abs(pos[inst]), abs(lot))
+
+                sqr_pnl = price * sqr_pos + pos_price[inst] * (-sqr_pos)
+                m2m_p[inst] -= sqr_pnl
+                cont_p[inst] -= sqr_pnl
+                cNs_p[inst] -= sqr_pnl
+
+            pos_price[inst] = avg_price
+            pos[inst] += lot
+            cNs_p[inst] -= (
+                trade_cost_list[inst] * abs(lot) +
+                slippage_list[inst] * abs(lot)
+            )
+            itr += 1
+
+        isInPos = pos != 0.0
+        isSettle = isInPos & (timestamp_ns[p] >= next_settle)
+        if isSettle.any():
+            next_settle[isSettle] = settle_next_ns[p, settle_group[isSettle]]
+
+            tmp_pnl = curr_price[isSettle] * pos[isSettle] + pos_price[isSettle] * (-pos[isSettle])
+
+            pos_price[isSettle] = curr_price[isSettle]
+            m2m_p[isSettle] += tmp_pnl
+            cont_p[isSettle] += tmp_pnl
+            cNs_p[isSettle] += tmp_pnl
+
+        if p > 1:
+            isCarry = isInPos & ~isSettle
+            cont_p[isCarry] += prev_cont[isCarry]
+            cNs_p[isCarry] += prev_cNs[isCarry]
+
+        event_bar.append(p)
+        event_pos_price.append(pos_price.copy())
+        event_m2m.append(m2m_p)
+        event_cont.append(cont_p)
+        event_cNs.append(cNs_p)
+
+        cont, cNs = cont_p, cNs_p
+        last_bar = p
+
+    event_bar = np.array(event_bar, dtype=np.int64)
+
+    # last event at or before every bar, -1 before first event
+    last_event = np.searchsorted(event_bar, np.arange(n), side="right") - 1
+    has_event = (last_event >= 0)[:, None]
+    last_event = np.maximum(last_event, 0)
+
+    pos_price_arr = np.zeros((n, m))
+    m2m = np.zeros((n, m))
+    m2m_cont = np.zeros((n, m))
+    m2m_cNs_cont = np.zeros((n, m))
+
+    if len(event_bar) != 0:
+        event_pos_price = np.array(event_pos_price)
+        event_cont = np.array(event_cont)
+        event_cNs = np.array(event_cNs)
+
+        pos_price_arr = np.where(has_event, event_pos_price[last_event], 0.0)
+
+        # bars without event only carry while in position
+        in_pos = has_event & (pos_arr != 0.0)
+        m2m_cont = np.where(in_pos, event_cont[last_event], 0.0)
+        m2m_cNs_cont = np.where(in_pos, event_cNs[last_event], 0.0)
+
+        m2m[event_bar] = np.array(event_m2m)
+        m2m_cont[event_bar] = event_cont
+        m2m_cNs_cont[event_bar] = event_cNs
+
+    state = {
+        "exec" : exec_,
+        "pos" : pos_arr,
+        "pos_price" : pos_price_arr,
+        "m2m" : m2m,
+        "m2m_cont" : m2m_cont,
+        "cost" : cost,
+        "slippage" : slip,
+        "m2m_cNs_cont" : m2m_cNs_cont,
+    }
+    return state, next_settle
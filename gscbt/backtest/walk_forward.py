@@ -0,0 +1,231 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+# peak RSS is only reported where resource module exists (unix)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from . import sweep
+from .sweep import (
+    SweepData,
+    run_sweep,
+    position_backtest,
+)
+from .performance import RunningMetrics
+
+
+# run_sweep summary columns where lower is better
+MINIMIZE_COLUMNS = {"cost", "slippage", "max_drawdown_m2c", "trades", "turnover"}
+
+
+def walk_forward_windows(
+    n : int,
+    train : int,
+    test : int,
+    step : int | None = None,
+    anchored : bool = False,
+) -> list[tuple[int, int, int, int]]:
+    # (is_start, is_stop, oos_start, oos_stop) bar ranges over n bars
+    #   train    : in-sample bars, first window
+    #   test     : out-of-sample bars after every in-sample range
+    #   step     : bars between windows, test by default
+    #   anchored : in-sample always start at bar 0
+    # last out-of-sample range is cut at n
+    if step is None:
+        step = test
+    if train < 2 or test < 1:
+        raise ValueError(f"[-] walk forward needs train >= 2 and test >= 1, got {train=} {test=}")
+    if step < test:
+        raise ValueError(f"[-] walk forward {step=} < {test=}, out-of-sample ranges would overlap")
+
+    windows = []
+    is_stop = train
+    while is_stop < n:
+        is_start = 0 if anchored else is_stop - train
+        windows.append((is_start, is_stop, is_stop, min(is_stop + test, n)))
+        is_stop += step
+    return windows
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return np.nan
+    # ru_maxrss is KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_window(
+    data : SweepData,
+    strategy : Callable,
+    params_list : list[dict],
+    trade_cost : float,
+    slippage : float,
+    window : tuple[int, int, int, int],
+    select : str,
+    minimize : bool,
+) -> tuple[dict, pd.DataFrame]:
+    # in-sample sweep, best params by select, then out-of-sample run
+    # return report row and BacktestEngine columns of out-of-sample bars
+    is_start, is_stop, oos_start, oos_stop = window
+
+    st = time.perf_counter()
+    summary = run_sweep(data.slice(is_start, is_stop), strategy, params_list, trade_cost, slippage, processes=1)
+    score = summary[select].to_numpy()
+    best = int(score.argmin() if minimize else score.argmax())
+    params = params_list[best]
+    is_time = time.perf_counter() - st
+
+    # strategy see in-sample bars for warm up, only out-of-sample
+    # positions are traded, range start one bar early (its position is
+    # ignored) and position is closed on last bar
+    st = time.perf_counter()
+    position = np.asarray(strategy(data.slice(is_start, oos_stop), params), dtype=np.float64)
+    if position.shape != (oos_stop - is_start,):
+        raise ValueError(f"[-] strategy returned shape {position.shape}, expected ({oos_stop - is_start},)")
+
+    position = position[oos_start - 1 - is_start:].copy()
+    position[-1] = 0.0
+    oos = position_backtest(data.slice(oos_start - 1, oos_stop), position, trade_cost, slippage).iloc[1:]
+    oos_time = time.perf_counter() - st
+
+    row = {
+        "is_start" : is_start,
+        "is_stop" : is_stop,
+        "oos_start" : oos_start,
+        "oos_stop" : oos_stop,
+        **params,
+        "is_" + select : summary[select].iloc[best],
+        "is_s" : is_time,
+        "oos_s" : oos_time,
+        # high-water mark of worker process so far, not of this window
+        "worker_peak_rss_mb" : peak_rss_mb(),
+    }
+    return row, oos
+
+
+def _run_windows(
+    strategy : Callable,
+    params_list : list[dict],
+    trade_cost : float,
+    slippage : float,
+    windows : list[tuple[int, int, int, int]],
+    select : str,
+    minimize : bool,
+) -> list[tuple[dict, pd.DataFrame]]:
+    # pool task, data is SweepData attached by sweep._init_worker
+    return [
+        run_window(sweep._worker_data, strategy, params_list, trade_cost, slippage, window, select, minimize)
+        for window in windows
+    ]
+
+
+def run_walk_forward(
+    data : SweepData,
+    strategy : Callable,
+    params_list : list[dict],
+    trade_cost : float,
+    slippage : float,
+    train : int,
+    test : int,
+    step : int | None = None,
+    anchored : bool = False,
+    select : str = "net_m2c",
+    minimize : bool | None = None,
+    processes : int | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # walk forward over full history loaded once (SweepData.from_timeseries
+    # of synthetic), windows are views of it, workers attach one shared copy
+    #   strategy  : same as run_sweep, must only look back, it is also run
+    #               over in-sample + out-of-sample bars of a window
+    #   train, test, step, anchored : see walk_forward_windows
+    #   select    : run_sweep summary column optimized in-sample
+    #   minimize  : lower select is better, None for select in MINIMIZE_COLUMNS
+    #   processes : None for every core, 1 run in current process
+    # return
+    #   report : one row per window, bar ranges, selected params, timing
+    #            and peak RSS so far of process that ran it, out-of-sample
+    #            summary
+    #   oos    : stitched out-of-sample BacktestEngine columns with window
+    #            and net equity, attrs["summary"] is its RunningMetrics
+    st = time.perf_counter()
+    if minimize is None:
+        minimize = select in MINIMIZE_COLUMNS
+    windows = walk_forward_windows(len(data), train, test, step, anchored)
+    if len(windows) == 0:
+        raise ValueError(f"[-] walk forward has no window, {len(data)} bars for {train=}")
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(windows))
+
+    if processes == 1:
+        results = [
+            run_window(data, strategy, params_list, trade_cost, slippage, window, select, minimize)
+            for window in windows
+        ]
+    else:
+        # contiguous windows per task, one task per worker turn
+        chunksize = max(1, -(-len(windows) // (processes * 2)))
+        chunks = [windows[itr:itr+chunksize] for itr in range(0, len(windows), chunksize)]
+
+        shared = data.to_shared()
+        try:
+            with ProcessPoolExecutor(
+                max_workers = processes,
+                initializer = sweep._init_worker,
+                initargs = (shared.spec(),),
+            ) as pool:
+                futures = [
+                    pool.submit(_run_windows, strategy, params_list, trade_cost, slippage, chunk, select, minimize)
+                    for chunk in chunks
+                ]
+                results = [result for future in futures for result in future.result()]
+        finally:
+            shared.unlink()
+
+    session = data.session_key()
+    index = data.index
+    metrics = RunningMetrics()
+    rows = []
+    frames = []
+    for itr, (row, oos) in enumerate(results):
+        oos_start, oos_stop = row["oos_start"], row["oos_stop"]
+
+        window_metrics = RunningMetrics()
+        state = {col : oos[col].to_numpy() for col in ["exec", "pos", "m2m", "cost", "slippage"]}
+        window_metrics.update(state, session[oos_start:oos_stop])
+        metrics.update(state, session[oos_start:oos_stop])
+
+        summary = window_metrics.summary()
+        row = {
+            "window" : itr,
+            "is_from" : index[row["is_start"]],
+            "oos_from" : index[oos_start],
+            "oos_to" : index[oos_stop - 1],
+            **row,
+            **{"oos_" + key : summary[key] for key in ["net", "max_drawdown", "trades", "sharpe"]},
+        }
+        rows.append(row)
+
+        oos = oos.copy()
+        oos["window"] = itr
+        frames.append(oos)
+
+    report = pd.DataFrame(rows).set_index("window")
+    oos = pd.concat(frames)
+    oos["equity"] = (oos["m2m"] - oos["cost"] - oos["slippage"]).cumsum()
+    oos.attrs["summary"] = metrics.summary()
+
+    report.attrs["bars"] = len(data)
+    report.attrs["data_mb"] = sum(data.arrays[name].nbytes for name in data.NAMES) / 2**20
+    report.attrs["processes"] = processes
+    report.attrs["peak_rss_mb"] = peak_rss_mb()
+    report.attrs["total_s"] = time.perf_counter() - st
+    return report, oos
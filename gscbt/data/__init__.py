@@ -8,9 +8,13 @@ from .synthetic_builder_wrappers import(
     sbw_synthetic_from_toml_stream_common_spec,
     sbw_create_toml_skeleton_common_spec,
 )
+from .synthetic_batch import synthetic_batch_from_toml
 
-from .live_data import get_live_data
+from .live_data import get_live_data, get_live_cache_stats
+from .live_config import get_live_config
+from .live_tick import start_tick_subscriber, stop_tick_subscriber
 from .live_synthetic import (
     get_live_synthetic,
     get_live_synthetic_stack
-)
\ No newline at end of file
+)
+from .live_stack import get_live_seasonal_stack, get_live_seasonal_stacks
\ No newline at end of file
@@ -0,0 +1,160 @@
+import json
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from gscbt.utils import (
+    API,
+    PATH,
+    req_wrapper,
+)
+
+# keys in which contract_dates_bulk may echo the requested symbol
+_SYMBOL_KEYS = ["symbol", "sym", "contract", "contractCode"]
+
+
+class ContractExpiryTable:
+    # local contract -> last trade date table backed by a parquet file
+    #   expired contracts are final and never re-fetched
+    #   active contracts are re-fetched at most once per day
+
+    def __init__(self, path : Path | None = None):
+        self.path = path if path is not None else PATH.CONTRACT_EXPIRY
+        self.expiry : dict[str, pd.Timestamp] = {}
+        self.fetched_on : dict[str, pd.Timestamp] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+
+        try:
+            df = pd.read_parquet(self.path)
+        except Exception:
+            return
+
+        with self._lock:
+            for row in df.itertuples(index=False):
+                self.expiry[row.contract] = pd.Timestamp(row.last_date)
+                self.fetched_on[row.contract] = pd.Timestamp(row.fetched_on)
+
+    def save(self):
+        with self._lock:
+            df = pd.DataFrame({
+                "contract" : list(self.expiry.keys()),
+                "last_date" : list(self.expiry.values()),
+                "fetched_on" : [self.fetched_on[c] for c in self.expiry.keys()],
+            })
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(self.path)
+
+    def lookup(self, contract : str) -> pd.Timestamp | None:
+        # local only, never hits the network
+        return self.expiry.get(contract)
+
+    def is_fresh(self, contract : str, today : pd.Timestamp) -> bool:
+        if contract not in self.expiry:
+            return False
+        if self.expiry[contract] < today:
+            return True
+        return self.fetched_on[contract] >= today
+
+    def resolve(self, contracts : list[str]) -> dict[str, pd.Timestamp]:
+        today = pd.Timestamp.today().normalize()
+
+        missing = []
+        for contract in contracts:
+            if not self.is_fresh(contract, today) and contract not in missing:
+                missing.append(contract)
+
+        if len(missing) != 0:
+            fetched = fetch_contract_expiries(missing)
+            if len(fetched) != 0:
+                with self._lock:
+                    for contract, expiry in fetched.items():
+                        self.expiry[contract] = expiry
+                        self.fetched_on[contract] = today
+                self.save()
+
+        result = {}
+        for contract in contracts:
+            if contract in self.expiry:
+                result[contract] = self.expiry[contract]
+        return result
+
+
+_expiry_table : ContractExpiryTable | None = None
+_expiry_table_lock = threading.Lock()
+
+def get_expiry_table() -> ContractExpiryTable:
+    global _expiry_table
+
+    with _expiry_table_lock:
+        if _expiry_table is None:
+            _expiry_table = ContractExpiryTable()
+
+    return _expiry_table
+
+
+def fetch_contract_expiries(contracts : list[str]) -> dict[str, pd.Timestamp]:
+    # one request to contract_dates_bulk for all contracts
+    status_code, content = req_wrapper(
+        API.GET_CONTRACT_DATES_BULK,
+        params={
+            "symbols" : ",".join(contracts),
+        },
+    )
+
+    if status_code != 200:
+        return {}
+
+    result = {}
+    res = json.loads(content)
+    echoed = [
+        next((item[key] for key in _SYMBOL_KEYS if item.get(key) in contracts), None)
+        for item in res
+    ]
+
+    # server without symbol echo answers one row per requested symbol in
+    # request order, only then position is trusted
+    if all(contract is None for contract in echoed) and len(res) == len(contracts):
+        echoed = list(contracts)
+
+    for item, contract in zip(res, echoed):
+        # row without symbol echo in a partial or echoing response is
+        # skipped, stored expiry is never fetched again
+        if contract is None:
+            continue
+
+        date_str = item.get("last_date", "")
+        if date_str == "" or date_str is None:
+            continue
+
+        try:
+            expiry = pd.to_datetime(date_str)
+        except:
+            continue
+
+        if expiry.tzinfo is not None:
+            expiry = expiry.tz_convert(None)
+        result[contract] = expiry
+
+    return result
+
+
+def get_contract_expiries(contracts : list[str]) -> dict[str, pd.Timestamp]:
+    result = get_expiry_table().resolve(contracts)
+
+    for contract in contracts:
+        if contract not in result:
+            raise ValueError(f"contract {contract} can't find expiry for it")
+
+    return result
+
+def get_contract_expiry(contract : str) -> pd.Timestamp:
+    return get_contract_expiries([contract])[contract]
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from gscbt.utils import API, PATH
+from gscbt.http_client import get_http_client
+
+CONFIG_TTL_SECONDS = 300
+
+
+class LiveConfigStore:
+    # product/contract config of live config service
+    #   kept for ttl seconds, then refreshed with If-None-Match /
+    #   If-Modified-Since so unchanged config costs a 304
+    #   last copy persisted on disk and reused on cold start
+    #   typed indexes are built once per change, not on every lookup
+
+    def __init__(
+        self,
+        url : str | None = None,
+        ttl : float = CONFIG_TTL_SECONDS,
+        path : Path | None = None,
+    ):
+        self.url = url if url is not None else API.GET_LIVE_CONFIG
+        self.ttl = ttl
+        self.path = path if path is not None else PATH.LIVE_CONFIG
+
+        self.etag : str | None = None
+        self.last_modified : str | None = None
+        self.checked_at : float | None = None
+
+        # symbol -> product json
+        self.products : dict[str, dict] = {}
+        # contract (symbol + contractCode) -> contract json
+        self.contracts : dict[str, dict] = {}
+        # contract -> expiry
+        self.expiry : dict[str, pd.Timestamp] = {}
+        # symbol -> contractMonths
+        self.contract_months : dict[str, str] = {}
+        # symbol -> currencyMultiplier
+        self.currency_multiplier : dict[str, float] = {}
+        # symbol and contract keyed dict as returned by get_config
+        self.legacy : dict = {}
+
+        self._lock = threading.Lock()
+
+    def _index(self, json_data : dict):
+        products = {}
+        contracts = {}
+        expiry = {}
+        contract_months = {}
+        currency_multiplier = {}
+
+        for product in json_data["productContract"]:
+            symbol = product["symbol"]
+
+            products[symbol] = product
+            contract_months[symbol] = product.get("contractMonths")
+            currency_multiplier[symbol] = product.get("currencyMultiplier")
+
+            for contract in product["contracts"]:
+                contract_code = f"{symbol}{contract['contractCode']}"
+                contracts[contract_code] = contract
+                if contract.get("expiry"):
+                    expiry[contract_code] = pd.to_datetime(contract["expiry"])
+
+        self.products = products
+        self.contracts = contracts
+        self.expiry = expiry
+        self.contract_months = contract_months
+        self.currency_multiplier = currency_multiplier
+        self.legacy = {**products, **contracts}
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+            self._index(saved["data"])
+        except Exception:
+            return False
+
+        self.etag = saved.get("etag")
+        self.last_modified = saved.get("last_modified")
+        return True
+
+    def save(self, json_data : dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "etag" : self.etag,
+                "last_modified" : self.last_modified,
+                "data" : json_data,
+            }, f)
+        tmp_path.replace(self.path)
+
+    def refresh(self, force : bool = False):
+        headers = {}
+        if not force and len(self.products) != 0:
+            if self.etag is not None:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified is not None:
+                headers["If-Modified-Since"] = self.last_modified
+
+        try:
+            res = get_http_client().get(self.url, headers=headers)
+        except Exception:
+            # config service down, keep serving last copy if any
+            if len(self.products) == 0:
+                raise
+            self.checked_at = time.monotonic()
+            return
+
+        if res.status_code == 200:
+            json_data = json.loads(res.content)
+            self._index(json_data)
+            self.etag = res.headers.get("ETag")
+            self.last_modified = res.headers.get("Last-Modified")
+            self.save(json_data)
+        elif res.status_code != 304 and len(self.products) == 0:
+            raise ValueError(f"[-] LiveConfigStore fail to get config status code {res.status_code}")
+
+        self.checked_at = time.monotonic()
+
+    def get(self) -> "LiveConfigStore":
+        with self._lock:
+            if self.checked_at is None and len(self.products) == 0:
+                self.load()
+
+            if self.checked_at is None or time.monotonic() - self.checked_at >= self.ttl:
+                self.refresh()
+
+        return self
+
+
+config_store = LiveConfigStore()
+
+def get_live_config() -> LiveConfigStore:
+    return config_store.get()
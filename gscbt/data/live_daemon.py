@@ -0,0 +1,192 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pandas as pd
+import pyarrow as pa
+
+from gscbt.utils import API
+from gscbt.metrics import METRICS, get_metrics
+from gscbt.http_client import get_http_client
+
+from .live_data import LiveDataCache, get_live_data
+from .live_synthetic import get_live_synthetic
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def df_to_arrow_ipc(df : pd.DataFrame) -> bytes:
+    # index is kept in pandas metadata and restored by arrow_ipc_to_df
+    table = pa.Table.from_pandas(df, preserve_index=True)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def arrow_ipc_to_df(content : bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(content).read_all().to_pandas()
+
+
+class LiveDaemon:
+    # one process owning live cache, config and built synthetics for
+    # every local worker, results are served as arrow ipc stream
+    #
+    #   POST /live_synthetic  json kwargs of get_live_synthetic
+    #   POST /live_data       json {"symbol", "ohlcv"}
+    #   GET  /stats           json counters of gscbt.metrics
+    #
+    # built synthetics are kept till next market expiry, concurrent
+    # requests of same synthetic are coalesced into one build
+
+    def __init__(
+        self,
+        host : str = "127.0.0.1",
+        port : int | None = None,
+    ):
+        if port is None:
+            port = urlsplit(API.LIVE_DAEMON).port
+
+        self.results = LiveDataCache(metrics_prefix="live_daemon_cache")
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status : int, body : bytes, content_type : str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_error(self, status : int, error : str):
+                self._send(status, json.dumps({"error" : error}).encode(), "application/json")
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    self._send(200, json.dumps(get_metrics()).encode(), "application/json")
+                else:
+                    self._send_error(404, f"unknown path {self.path}")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    kwargs = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError as e:
+                    self._send_error(400, f"invalid json body {e}")
+                    return
+
+                try:
+                    if self.path == "/live_synthetic":
+                        df = daemon.live_synthetic(kwargs)
+                    elif self.path == "/live_data":
+                        df = daemon.live_data(kwargs)
+                    else:
+                        self._send_error(404, f"unknown path {self.path}")
+                        return
+                except (TypeError, ValueError) as e:
+                    self._send_error(400, f"{type(e).__name__}: {e}")
+                    return
+                except Exception as e:
+                    self._send_error(500, f"{type(e).__name__}: {e}")
+                    return
+
+                self._send(200, df_to_arrow_ipc(df), ARROW_STREAM)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread : threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def live_synthetic(self, kwargs : dict) -> pd.DataFrame:
+        key = json.dumps(kwargs, sort_keys=True)
+
+        def build(_):
+            METRICS.incr("live_daemon.builds")
+            return True, get_live_synthetic(**kwargs)
+
+        METRICS.incr("live_daemon.requests")
+
+        # tick moves every build, only its eod part is cached
+        if kwargs.get("isTickNEod"):
+            return build(key)[1]
+
+        ok, df = self.results.get_or_fetch(key, build)
+        return df
+
+    def live_data(self, kwargs : dict) -> pd.DataFrame:
+        METRICS.incr("live_daemon.requests")
+        ok, df = get_live_data(kwargs["symbol"], kwargs.get("ohlcv", "ohlcv"))
+        if not ok:
+            raise ValueError(f"data for {kwargs['symbol']} not available")
+        return df
+
+    def start(self) -> "LiveDaemon":
+        # serve in background thread of current process
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class LiveDaemonClient:
+    # worker side of LiveDaemon, same arguments as local functions
+
+    def __init__(self, url : str | None = None, timeout : float = 300):
+        self.url = (url if url is not None else API.LIVE_DAEMON).rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, path : str, kwargs : dict) -> pd.DataFrame:
+        res = get_http_client().post(
+            f"{self.url}{path}",
+            data = json.dumps(kwargs).encode(),
+            headers = {"Content-Type" : "application/json", "Accept" : ARROW_STREAM},
+            timeout = self.timeout,
+        )
+        if res.status_code != 200:
+            try:
+                error = json.loads(res.content)["error"]
+            except Exception:
+                error = res.content[:200]
+            raise ValueError(f"[-] LiveDaemon {path} failed status code {res.status_code} : {error}")
+
+        return arrow_ipc_to_df(res.content)
+
+    def get_live_synthetic(self, **kwargs) -> pd.DataFrame:
+        return self._post("/live_synthetic", kwargs)
+
+    def get_live_data(self, symbol : str, ohlcv : str) -> tuple[bool, pd.DataFrame]:
+        try:
+            return True, self._post("/live_data", {"symbol" : symbol, "ohlcv" : ohlcv})
+        except ValueError:
+            return False, pd.DataFrame()
+
+    def stats(self) -> dict[str, float]:
+        res = get_http_client().get(f"{self.url}/stats")
+        return json.loads(res.content)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="gscbt live data daemon")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    daemon = LiveDaemon(args.host, args.port)
+    print(f"[+] gscbt live daemon at {daemon.url}")
+    daemon.serve_forever()
@@ -1,17 +1,24 @@
-from readerwriterlock import rwlock
+from collections import OrderedDict
 from datetime import date, datetime, timedelta
+import threading
+import time
 import pytz
 import pandas as pd 
 import json
 
+import polars as pl
+
 from gscbt.utils import (
     req_wrapper,
+    req_wrapper_typed,
     bytes_to_df,
     API,
+    DEFAULT,
 )
+from gscbt.metrics import METRICS
 
-cache = {}
-rw_lock = rwlock.RWLockFair()
+from .live_history import history
+from .live_tick import tick_store, tick_max_age
 
 def get_next_market_expiry() -> datetime:
     ist = pytz.timezone("Asia/Kolkata")
@@ -24,92 +31,483 @@ def get_next_market_expiry() -> datetime:
         expiry += timedelta(days=1)
     return expiry
 
-def get_live_data(
-    symbol : str,
-    ohlcv : str,
-) -> tuple[bool, pd.DataFrame]:
 
-    today = date.today()
-    end_date = today.strftime('%Y-%m-%d')
+def mark_stale(df : pd.DataFrame) -> pd.DataFrame:
+    # stored history served because market data request failed, flagged
+    # in attrs so callers can tell it from fresh data, never cached
+    df = df.copy(deep=False)
+    df.attrs["stale"] = True
+    METRICS.incr("live_history.stale")
+    return df
 
-    ist = pytz.timezone("Asia/Kolkata")
-    now = datetime.now(ist)
-    r_lock = rw_lock.gen_rlock()
-    with r_lock:
-        if symbol in cache and now < cache["expiry"]:
-            return True, cache[symbol]
+def is_stale(df : pd.DataFrame) -> bool:
+    return bool(df.attrs.get("stale", False))
 
-    params = {
-        "symbols" : symbol,
-        "from" : "1950-01-01",
-        "to" : end_date
-    }
 
-    status_code, content = req_wrapper(API.GET_MARKET_DATA, params)
+class _Flight:
+    # one in-flight fetch shared by every caller missing on same symbol
+    def __init__(self):
+        self.event = threading.Event()
+        self.result : tuple[bool, pd.DataFrame] = (False, pd.DataFrame())
+        self.error : Exception | None = None
 
-    if status_code != 200:
-        return False, pd.DataFrame()
+class LiveDataCache:
+    # symbol -> full ohlcv frame
+    #   every entry expire at next market expiry (9:15 IST) after its write
+    #   bounded to max_size symbols, least recently used evicted first
+    #   concurrent misses on one symbol are coalesced into one fetch
+    #   failed fetches are remembered for miss_ttl seconds
+
+    def __init__(
+        self,
+        max_size : int = 1024,
+        metrics_prefix : str = "live_cache",
+        miss_ttl : float = 0.0,
+    ):
+        # metrics_prefix : namespace of hit / miss / eviction counters, one
+        #                  per cache so other caches don't skew live data ones
+        # miss_ttl       : symbol of failed fetch answers (False, empty)
+        #                  without fetch for this long, 0 disables
+        self.max_size = max_size
+        self.metrics_prefix = metrics_prefix
+        self.miss_ttl = miss_ttl
+        self._data : OrderedDict[str, tuple[datetime, pd.DataFrame]] = OrderedDict()
+        # symbol -> time.monotonic() deadline of negative entry
+        self._failed : dict[str, float] = {}
+        self._inflight : dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, symbol : str) -> bool:
+        return self.get(symbol, count = False) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get_locked(self, symbol : str, now : datetime) -> pd.DataFrame | None:
+        entry = self._data.get(symbol)
+        if entry is None:
+            return None
+
+        expiry, df = entry
+        if now >= expiry:
+            del self._data[symbol]
+            METRICS.incr(f"{self.metrics_prefix}.expired")
+            return None
+
+        self._data.move_to_end(symbol)
+        return df
+
+    def _is_failed_locked(self, symbol : str) -> bool:
+        deadline = self._failed.get(symbol)
+        if deadline is None:
+            return False
+        if time.monotonic() >= deadline:
+            del self._failed[symbol]
+            return False
+        return True
+
+    def _store_result(self, symbol : str, result : tuple[bool, pd.DataFrame]):
+        if result[0]:
+            if not is_stale(result[1]):
+                self.put(symbol, result[1])
+            return
+        if self.miss_ttl <= 0:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failed) >= self.max_size:
+                self._failed = {key : value for key, value in self._failed.items() if value > now}
+            self._failed[symbol] = now + self.miss_ttl
+
+    def get(self, symbol : str, count : bool = True) -> pd.DataFrame | None:
+        now = datetime.now(pytz.timezone("Asia/Kolkata"))
+        with self._lock:
+            df = self._get_locked(symbol, now)
+
+        if count:
+            METRICS.incr(f"{self.metrics_prefix}.hits" if df is not None else f"{self.metrics_prefix}.misses")
+        return df
+
+    def put(self, symbol : str, df : pd.DataFrame, expiry : datetime | None = None):
+        if expiry is None:
+            expiry = get_next_market_expiry()
+
+        with self._lock:
+            self._data[symbol] = (expiry, df)
+            self._data.move_to_end(symbol)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                METRICS.incr(f"{self.metrics_prefix}.evictions")
+
+    def invalidate(self, symbol : str | None = None):
+        with self._lock:
+            if symbol is None:
+                self._data.clear()
+                self._failed.clear()
+            else:
+                self._data.pop(symbol, None)
+                self._failed.pop(symbol, None)
+
+    def get_or_fetch(
+        self,
+        symbol : str,
+        fetch,
+    ) -> tuple[bool, pd.DataFrame]:
+        # fetch(symbol) -> (ok, df), only called by first caller of a miss
+        now = datetime.now(pytz.timezone("Asia/Kolkata"))
+
+        with self._lock:
+            df = self._get_locked(symbol, now)
+            if df is not None:
+                METRICS.incr(f"{self.metrics_prefix}.hits")
+                return True, df
+
+            if self._is_failed_locked(symbol):
+                METRICS.incr(f"{self.metrics_prefix}.failed_hits")
+                return False, pd.DataFrame()
+
+            flight = self._inflight.get(symbol)
+            isOwner = flight is None
+            if isOwner:
+                flight = _Flight()
+                self._inflight[symbol] = flight
+
+        if not isOwner:
+            METRICS.incr(f"{self.metrics_prefix}.coalesced")
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        METRICS.incr(f"{self.metrics_prefix}.misses")
+        try:
+            flight.result = fetch(symbol)
+            self._store_result(symbol, flight.result)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[symbol]
+            flight.event.set()
+
+        return flight.result
+
+    def get_or_fetch_many(
+        self,
+        symbols : list[str],
+        fetch_many,
+    ) -> dict[str, tuple[bool, pd.DataFrame]]:
+        # fetch_many(symbols) -> {symbol : (ok, df)}, called once with every
+        # missing symbol which is not already being fetched by other caller
+        now = datetime.now(pytz.timezone("Asia/Kolkata"))
+
+        result = {}
+        failed = {}
+        owned = {}
+        waiting = {}
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                df = self._get_locked(symbol, now)
+                if df is not None:
+                    result[symbol] = (True, df)
+                    continue
+
+                if self._is_failed_locked(symbol):
+                    failed[symbol] = (False, pd.DataFrame())
+                    continue
+
+                flight = self._inflight.get(symbol)
+                if flight is None:
+                    flight = _Flight()
+                    self._inflight[symbol] = flight
+                    owned[symbol] = flight
+                else:
+                    waiting[symbol] = flight
+
+        METRICS.incr(f"{self.metrics_prefix}.hits", len(result))
+        METRICS.incr(f"{self.metrics_prefix}.failed_hits", len(failed))
+        METRICS.incr(f"{self.metrics_prefix}.misses", len(owned))
+        METRICS.incr(f"{self.metrics_prefix}.coalesced", len(waiting))
+        result |= failed
+
+        if len(owned) != 0:
+            try:
+                fetched = fetch_many(list(owned.keys()))
+                for symbol, flight in owned.items():
+                    flight.result = fetched.get(symbol, (False, pd.DataFrame()))
+                    self._store_result(symbol, flight.result)
+                    result[symbol] = flight.result
+            except Exception as e:
+                for flight in owned.values():
+                    flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    for symbol in owned:
+                        del self._inflight[symbol]
+                for flight in owned.values():
+                    flight.event.set()
+
+        for symbol, flight in waiting.items():
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            result[symbol] = flight.result
+
+        return result
+
+    def stats(self) -> dict:
+        res = {
+            "size" : len(self._data),
+            "max_size" : self.max_size,
+            "inflight" : len(self._inflight),
+            "failed" : len(self._failed),
+        }
+        for name, value in METRICS.snapshot(f"{self.metrics_prefix}.").items():
+            res[name.removeprefix(f"{self.metrics_prefix}.")] = value
+        return res
+
+
+# contracts missing on market data api (older years of a chain) are not
+# re-requested by every build
+LIVE_MISS_TTL = 300.0
+cache = LiveDataCache(miss_ttl = LIVE_MISS_TTL)
+
+def get_live_cache_stats() -> dict:
+    return cache.stats()
+
+def project_ohlcv(df : pd.DataFrame, ohlcv : str) -> pd.DataFrame:
+    columns = []
+    for flag, col in zip("ohlcv", ["open", "high", "low", "close", "volume"]):
+        if flag in ohlcv and col in df.columns:
+            columns.append(col)
+
+    return df[columns]
+
+MARKET_DATA_SCHEMA = {
+    "sym" : pl.Utf8,
+    "timestamp" : None, # parsed to datetime by bytes_to_df, string or epoch ms
+    "open" : pl.Float64,
+    "high" : pl.Float64,
+    "low" : pl.Float64,
+    "close" : pl.Float64,
+    "volume" : pl.Float64,
+}
+
+def decode_market_df(
+    content : bytes,
+    content_type : str | None = None,
+) -> pd.DataFrame:
+    # market data api response to timestamp indexed frame, sym column kept
+    # only MARKET_DATA_SCHEMA columns are materialized
+    df = bytes_to_df(
+        content,
+        content_type = content_type,
+        columns = list(MARKET_DATA_SCHEMA.keys()),
+        schema = MARKET_DATA_SCHEMA,
+    )
+    if df.empty:
+        return pd.DataFrame()
 
-    df = bytes_to_df(content)
     df.columns = df.columns.str.lower()
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-
-    column_drop_list = ["sym", "open_int"]
-    if "o" not in ohlcv:
-        column_drop_list.append("open")
-    if "h" not in ohlcv: 
-        column_drop_list.append("high")
-    if "l" not in ohlcv:
-        column_drop_list.append("low")
-    if "c" not in ohlcv:
-        column_drop_list.append("close")
-    if "v" not in ohlcv:
-        column_drop_list.append("volume")
-
-    df.drop(column_drop_list, axis=1, inplace=True)
+    if pd.api.types.is_numeric_dtype(df["timestamp"]):
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+    else:
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
     df.set_index(["timestamp"], inplace=True)
 
-    w_lock = rw_lock.gen_wlock()
-    with w_lock:
-        if len(cache) == 0 or symbol in cache:
-            cache.clear()
-            cache["expiry"] = get_next_market_expiry()
+    return df
 
-        cache[symbol] = df
+def normalize_market_df(
+    content : bytes,
+    content_type : str | None = None,
+) -> pd.DataFrame:
+    df = decode_market_df(content, content_type)
+    if df.empty:
+        return df
 
-    return True, df
+    df.drop(["sym"], axis=1, inplace=True)
+    return df
 
-def get_tick_n_eod_combine_data(
+def fetch_live_data(
     symbol : str,
 ) -> tuple[bool, pd.DataFrame]:
+    # ohlcv history of symbol, only bars after the last locally stored
+    # bar (minus overlap) are requested from market data api
 
     today = date.today()
     end_date = today.strftime('%Y-%m-%d')
 
-    params = {
-        "symbols" : symbol,
-        "from" : "1950-01-01",
-        "to" : end_date
-    }
+    with history.lock(symbol):
+        stored = history.load(symbol)
+
+        params = {
+            "symbols" : symbol,
+            "from" : history.fetch_start(stored),
+            "to" : end_date
+        }
+
+        status_code, content, content_type = req_wrapper_typed(API.GET_MARKET_DATA, params)
+
+        if status_code != 200:
+            if stored is not None and not stored.empty:
+                return True, mark_stale(stored)
+            return False, pd.DataFrame()
+
+        df = normalize_market_df(content, content_type)
+        if df.empty and stored is None:
+            return False, pd.DataFrame()
+
+        METRICS.incr("live_history.rows_fetched", len(df))
+        df = history.merge(symbol, stored, df)
+
+    return True, df
+
+def fetch_live_data_bulk(
+    symbols : list[str],
+    chunk_size : int = DEFAULT.LIVE_BULK_CHUNK_SIZE,
+) -> dict[str, tuple[bool, pd.DataFrame]]:
+    # many symbols per market data request, symbols with same incremental
+    # start date share requests of at most chunk_size symbols
+
+    today = date.today()
+    end_date = today.strftime('%Y-%m-%d')
+
+    # stored history only picks start date of request here
+    groups = {}
+    for symbol in dict.fromkeys(symbols):
+        groups.setdefault(history.fetch_start(history.load(symbol)), []).append(symbol)
+
+    result = {}
+    for from_date, group in groups.items():
+        for itr in range(0, len(group), chunk_size):
+            chunk = group[itr:itr+chunk_size]
+
+            params = {
+                "symbols" : ",".join(chunk),
+                "from" : from_date,
+                "to" : end_date
+            }
+
+            status_code, content, content_type = req_wrapper_typed(API.GET_MARKET_DATA, params)
+
+            frames = {}
+            if status_code == 200:
+                df = decode_market_df(content, content_type)
+                if not df.empty:
+                    METRICS.incr("live_history.rows_fetched", len(df))
+                    for symbol, sym_df in df.groupby("sym", sort=False):
+                        frames[symbol] = sym_df.drop(columns=["sym"])
+
+            for symbol in chunk:
+                # history is re-read under lock, a concurrent fetch_live_data
+                # may have written it after the grouping load above
+                with history.lock(symbol):
+                    symbol_stored = history.load(symbol)
+                    isStored = symbol_stored is not None and not symbol_stored.empty
+
+                    if symbol in frames:
+                        result[symbol] = (True, history.merge(symbol, symbol_stored, frames[symbol]))
+                    elif status_code != 200 and isStored:
+                        result[symbol] = (True, mark_stale(symbol_stored))
+                    elif isStored:
+                        # request went fine, no new bar for symbol
+                        result[symbol] = (True, symbol_stored)
+                    else:
+                        result[symbol] = (False, pd.DataFrame())
+
+    return result
+
+def get_live_data_bulk(
+    symbols : list[str],
+    ohlcv : str,
+    chunk_size : int = DEFAULT.LIVE_BULK_CHUNK_SIZE,
+) -> dict[str, tuple[bool, pd.DataFrame]]:
+
+    fetched = cache.get_or_fetch_many(
+        symbols,
+        lambda missing: fetch_live_data_bulk(missing, chunk_size),
+    )
+
+    result = {}
+    for symbol, (ok, df) in fetched.items():
+        if ok:
+            result[symbol] = (True, project_ohlcv(df, ohlcv))
+        else:
+            result[symbol] = (False, pd.DataFrame())
 
-    status_code, content = req_wrapper(API.GET_MARKET_DATA, params)
+    return result
+
+def get_live_data(
+    symbol : str,
+    ohlcv : str,
+) -> tuple[bool, pd.DataFrame]:
 
-    if status_code != 200:
+    ok, df = cache.get_or_fetch(symbol, fetch_live_data)
+    if not ok:
         return False, pd.DataFrame()
 
-    df = bytes_to_df(content)
-    df.columns = df.columns.str.lower()
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return True, project_ohlcv(df, ohlcv)
 
-    column_drop_list = ["sym", "open_int", "open", "high", "low", "volume"]
+def combine_tick(
+    df : pd.DataFrame,
+    ts : pd.Timestamp,
+    price : float,
+) -> pd.DataFrame:
+    # close of tick day replaced or appended with tick price
+    day = ts.normalize()
+    if df.index.tz is None:
+        day = day.tz_localize(None)
 
-    df.drop(column_drop_list, axis=1, inplace=True)
-    df.set_index(["timestamp"], inplace=True)
+    if len(df) != 0 and df.index[-1] == day:
+        close = df["close"].to_numpy(copy=True)
+        close[-1] = price
+        return pd.DataFrame({"close" : close}, index=df.index)
+
+    if len(df) == 0 or df.index[-1] < day:
+        tick_df = pd.DataFrame({"close" : [price]}, index=pd.DatetimeIndex([day], name=df.index.name))
+        return pd.concat([df, tick_df])
+
+    df = df.copy()
+    df.loc[day, "close"] = price
+    return df
 
-    status_code, tick_data = req_wrapper("http://192.168.0.155:24503/latest", {"symbol":symbol})
+def get_tick_n_eod_combine_data(
+    symbol : str,
+) -> tuple[bool, pd.DataFrame]:
+
+    # with running tick subscriber eod comes from cache and tick from
+    # tick_store, no request on the build path
+    max_age = tick_max_age()
+    tick = None if max_age is None else tick_store.get(symbol, max_age = max_age)
+    if tick is not None:
+        ok, df = cache.get_or_fetch(symbol, fetch_live_data)
+        if not ok:
+            return False, pd.DataFrame()
+
+        ts, price = tick
+        return True, combine_tick(project_ohlcv(df, "c"), ts, price)
+
+    # subscriber missed symbol for a few intervals (dead or failing
+    # symbol), stored tick is not served
+    if max_age is not None:
+        METRICS.incr("live_tick.stale_fallback")
+
+    # always refreshed, incremental fetch keep it cheap
+    ok, df = fetch_live_data(symbol)
+    if not ok:
+        return False, pd.DataFrame()
+
+    cache.put(symbol, df)
+    df = project_ohlcv(df, "c")
+
+    status_code, tick_data = req_wrapper(API.GET_LATEST_TICK, {"symbol":symbol})
     if status_code == 200:
         res = json.loads(tick_data)
         dt_utc = pd.to_datetime(res["timestamp"], utc=True)
-        df.loc[dt_utc.normalize()] = res["price"]
+        df = combine_tick(df, dt_utc, res["price"])
 
-    return True, df
\ No newline at end of file
+    return True, df
@@ -0,0 +1,129 @@
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from gscbt.utils import DEFAULT, PATH
+
+# days re-requested before last stored bar to pick up late corrections
+OVERLAP_DAYS = 5
+# appended part files kept per symbol before they are compacted into one
+MAX_PARTS = 32
+
+
+class LiveHistoryStore:
+    # per symbol live market data history kept as parquet so live fetches
+    # only request bars after the last stored timestamp
+    #   <root>/<symbol>/part-NNNNNN.parquet, every fetch append one part
+
+    def __init__(self, root : Path | None = None):
+        self.root = root if root is not None else PATH.LIVE_HISTORY
+        self._locks : dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def lock(self, symbol : str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def path(self, symbol : str) -> Path:
+        # single file of older stores, still read and folded on compaction
+        return self.root / f"{symbol}.parquet"
+
+    def parts_dir(self, symbol : str) -> Path:
+        return self.root / symbol
+
+    def parts(self, symbol : str) -> list[Path]:
+        parts_dir = self.parts_dir(symbol)
+        if not parts_dir.exists():
+            return []
+        return sorted(parts_dir.glob("part-*.parquet"))
+
+    def load(self, symbol : str) -> pd.DataFrame | None:
+        # base file and appended parts, later parts override same timestamp
+        paths = self.parts(symbol)
+        if self.path(symbol).exists():
+            paths = [self.path(symbol)] + paths
+        if len(paths) == 0:
+            return None
+
+        try:
+            frames = [pd.read_parquet(path) for path in paths]
+        except Exception:
+            # broken file, full history is fetched again
+            return None
+
+        if len(frames) == 1:
+            return frames[0]
+
+        df = pd.concat(frames)
+        df = df[~df.index.duplicated(keep="last")]
+        return df.sort_index()
+
+    def _write(self, path : Path, df : pd.DataFrame):
+        tmp_path = path.with_suffix(".tmp")
+        df.to_parquet(tmp_path)
+        tmp_path.replace(path)
+
+    def append(self, symbol : str, df : pd.DataFrame):
+        # new rows as next part file, stored parts are not rewritten
+        parts_dir = self.parts_dir(symbol)
+        parts_dir.mkdir(parents=True, exist_ok=True)
+
+        parts = self.parts(symbol)
+        itr = int(parts[-1].stem.removeprefix("part-")) + 1 if len(parts) != 0 else 0
+        self._write(parts_dir / f"part-{itr:06d}.parquet", df)
+
+    def save(self, symbol : str, df : pd.DataFrame):
+        # whole history as one part, replace base file and every part
+        old_parts = self.parts(symbol)
+        self.append(symbol, df)
+
+        for path in old_parts:
+            path.unlink()
+        self.path(symbol).unlink(missing_ok=True)
+
+    def fetch_start(self, stored : pd.DataFrame | None) -> str:
+        if stored is None or stored.empty:
+            return DEFAULT.START_DATE
+
+        start = stored.index[-1] - pd.Timedelta(days=OVERLAP_DAYS)
+        return start.strftime("%Y-%m-%d")
+
+    def merge(
+        self,
+        symbol : str,
+        stored : pd.DataFrame | None,
+        new_df : pd.DataFrame,
+    ) -> pd.DataFrame:
+        # bars of new_df override stored bars with same timestamp, only new
+        # or changed bars are appended, parts are compacted once there are
+        # more than MAX_PARTS of them
+        if stored is None or stored.empty:
+            df = new_df.sort_index()
+            self.save(symbol, df)
+            return df
+        if new_df.empty:
+            return stored
+
+        isOverlap = new_df.index.isin(stored.index)
+        overlap = new_df[isOverlap]
+        prev = stored.reindex(index=overlap.index, columns=overlap.columns)
+        isChanged = ((overlap != prev) & ~(overlap.isna() & prev.isna())).any(axis=1).to_numpy()
+
+        isAppend = ~isOverlap
+        isAppend[isOverlap] = isChanged
+        if not isAppend.any():
+            return stored
+
+        df = pd.concat([stored, new_df[isAppend]])
+        df = df[~df.index.duplicated(keep="last")]
+        df = df.sort_index()
+
+        if len(self.parts(symbol)) >= MAX_PARTS:
+            self.save(symbol, df)
+        else:
+            self.append(symbol, new_df[isAppend].sort_index())
+        return df
+
+
+history = LiveHistoryStore()
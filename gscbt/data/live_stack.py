@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .live_config import get_live_config
+from .live_data import LiveDataCache
+from .live_synthetic import (
+    plan_live_stack_chain,
+    prefetch_live_chains,
+    build_live_stack,
+)
+
+ALIGNS = ["calendar_day", "trading_day", "days_to_expiry"]
+
+
+@dataclass
+class SeasonalStack:
+    # dense year x day matrix of one live synthetic stack
+    #   years  : label (expiry year) of every row, oldest first
+    #   days   : aligned day of every column, ascending
+    #   values : close, nan where a year has no bar on that day
+    #
+    # align
+    #   calendar_day   : calendar days since 1 Jan of label year
+    #   trading_day    : bars since first bar on or after 1 Jan of label year
+    #   days_to_expiry : calendar days from expiry, <= 0 before expiry
+    expression : str
+    align : str
+    years : np.ndarray
+    days : np.ndarray
+    values : np.ndarray
+
+    def row(self, year : int) -> np.ndarray:
+        itr = np.searchsorted(self.years, year)
+        if itr == len(self.years) or self.years[itr] != year:
+            raise KeyError(f"[-] year {year} not in stack {self.expression}")
+        return self.values[itr]
+
+    def window(self, first_day : int, last_day : int) -> np.ndarray:
+        # values of days in [first_day, last_day], a view of values
+        lo = np.searchsorted(self.days, first_day, side="left")
+        hi = np.searchsorted(self.days, last_day, side="right")
+        return self.values[:, lo:hi]
+
+    def to_df(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.values.T,
+            index = pd.Index(self.days, name=self.align),
+            columns = [str(year) for year in self.years],
+        )
+
+    def to_arrow(self) -> pa.Table:
+        return pa.Table.from_pandas(self.to_df().reset_index(), preserve_index=False)
+
+
+def align_days(
+    index : pd.DatetimeIndex,
+    expiry : pd.Timestamp,
+    align : str,
+) -> np.ndarray:
+    # aligned day of every bar of index, see SeasonalStack
+    days = index.values.astype("datetime64[D]")
+    year_start = np.datetime64(f"{expiry.year}-01-01", "D")
+
+    if align == "calendar_day":
+        return (days - year_start).astype(np.int64)
+    elif align == "trading_day":
+        first = np.searchsorted(days, year_start, side="left")
+        return np.arange(len(days), dtype=np.int64) - first
+    elif align == "days_to_expiry":
+        expiry_day = np.datetime64(pd.Timestamp(expiry).strftime("%Y-%m-%d"), "D")
+        return (days - expiry_day).astype(np.int64)
+
+    raise ValueError(f"[-] Invalid align {align} choose from {ALIGNS}")
+
+def create_seasonal_stack(
+    expression : str,
+    stack : list[tuple[pd.Timestamp, pd.DataFrame]],
+    align : str,
+) -> SeasonalStack:
+    # stack : (expiry, close frame) per year oldest first, see build_live_stack
+    years = np.array([expiry.year for expiry, _ in stack], dtype=np.int64)
+
+    row_days = []
+    row_values = []
+    for expiry, df in stack:
+        df = df.sort_index()
+        row_days.append(align_days(df.index, expiry, align))
+        row_values.append(df["close"].to_numpy(dtype=np.float64))
+
+    days = np.unique(np.concatenate(row_days)) if len(stack) != 0 else np.array([], dtype=np.int64)
+
+    values = np.full((len(years), len(days)), np.nan)
+    for itr in range(len(stack)):
+        values[itr, np.searchsorted(days, row_days[itr])] = row_values[itr]
+
+    return SeasonalStack(expression, align, years, days, values)
+
+
+# (expression, start_year, align) -> SeasonalStack, valid till next market expiry
+stack_cache = LiveDataCache(metrics_prefix="live_stack_cache")
+
+def get_live_seasonal_stacks(
+    expressions : list[str],
+    start_year : int,
+    align : str = "calendar_day",
+) -> dict[str, SeasonalStack]:
+    # stacks of many expressions, every contract missing from cache
+    # is fetched in one bulk request
+    if align not in ALIGNS:
+        raise ValueError(f"[-] Invalid align {align} choose from {ALIGNS}")
+
+    expressions = [expression.replace(" ", "") for expression in expressions]
+
+    result = {}
+    missing = []
+    for expression in expressions:
+        stack = stack_cache.get(f"{expression}|{start_year}|{align}", count=False)
+        if stack is not None:
+            result[expression] = stack
+        elif expression not in missing:
+            missing.append(expression)
+
+    if len(missing) == 0:
+        return result
+
+    config = get_live_config()
+
+    prefetched = prefetch_live_chains(
+        [plan_live_stack_chain(expression, start_year) for expression in missing],
+        "c",
+        config,
+    )
+
+    for expression in missing:
+        stack = create_seasonal_stack(
+            expression,
+            build_live_stack(expression, start_year, prefetched, config),
+            align,
+        )
+        stack_cache.put(f"{expression}|{start_year}|{align}", stack)
+        result[expression] = stack
+
+    return result
+
+def get_live_seasonal_stack(
+    expression : str,
+    start_year : int,
+    align : str = "calendar_day",
+) -> SeasonalStack:
+    return get_live_seasonal_stacks([expression], start_year, align)[expression.replace(" ", "")]
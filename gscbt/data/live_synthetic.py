@@ -1,17 +1,18 @@
 from datetime import datetime
-import json
 
 import pandas as pd
 
 from .live_data import (
     get_live_data,
+    get_live_data_bulk,
     get_tick_n_eod_combine_data
 )
 from .spread import (
     offset_roll
 )
-from gscbt.utils import (
-    req_wrapper,
+from .live_config import (
+    LiveConfigStore,
+    get_live_config,
 )
 
 from gscbt.expression_utils import (
@@ -25,26 +26,102 @@ from gscbt.expression_utils import (
     
 
 
-def get_config():
-    # getting json data
-    CONFIG_DATA_API = "http://192.168.0.155:24502"
+def get_config() -> dict:
+    # symbol and contract keyed config, served from LiveConfigStore
+    return get_live_config().legacy
+        
+def plan_contractwise_chain(
+    contracts : list[str],
+    start_year : int,
+    end_year : int,
+) -> list[list[str]]:
+    # contracts of every year visited by get_live_synthetic_contractwise
+    chain = []
+    itr_contracts = contracts
+    for _ in range(end_year, start_year-1, -1):
+        chain.append(itr_contracts)
+        itr_contracts = move_contracts_to_prev_year(itr_contracts)
 
-    status_code, content = req_wrapper(
-        CONFIG_DATA_API,
-    )
-    json_data = json.loads(content)
+    return chain
 
-    result = {}
-    for product in json_data["productContract"]:
-        symbol = product["symbol"]
+def plan_custom_chain(
+    contracts : list[str],
+    start_year : int,
+    month_map : dict,
+) -> list[list[str]]:
+    # contracts of every step visited by get_live_synthetic_custom
+    chain = []
+    itr_contracts = contracts
+    while extract_full_min_year_from_contracts(itr_contracts) >= start_year:
+        chain.append(itr_contracts)
+        itr_contracts = move_contracts_to_given_prev_month(itr_contracts, month_map)
+
+    return chain
+
+def plan_leg_columns(contracts : list[str]) -> dict[int, str]:
+    # leg position -> verbose column, first occurrence of each contract
+    leg_columns = {}
+    for itr, contract in enumerate(contracts):
+        if contract not in leg_columns.values():
+            leg_columns[itr] = contract
+
+    return leg_columns
+
+def attach_leg_columns(
+    itr_synthetic_df : pd.DataFrame,
+    leg_list : list[tuple[str, pd.Series]],
+) -> pd.DataFrame:
+    # leg series are masked where the combined synthetic is missing,
+    # same bars a one-hot multiplier expression would have produced
+    mask = itr_synthetic_df["close"].isna()
+
+    legs = {}
+    for column, series in leg_list:
+        legs[column] = series.reindex(itr_synthetic_df.index).mask(mask)
+
+    return pd.concat([pd.DataFrame(legs, index=itr_synthetic_df.index), itr_synthetic_df], axis=1)
+
+# steps of a planned chain fetched per bulk request, open ended start
+# (1950) plans decades of contracts which mostly don't exist
+PREFETCH_STEPS = 8
+
+def prefetch_live_chain(
+    chain : list[list[str]],
+    ohlcv : str,
+    config : LiveConfigStore,
+    isTickNEod : bool = False,
+) -> dict[str, tuple[bool, pd.DataFrame]]:
+    # bulk fetch of planned chain, see prefetch_live_chains
+    return prefetch_live_chains([chain], ohlcv, config, isTickNEod)
+
+def prefetch_live_chains(
+    chains : list[list[list[str]]],
+    ohlcv : str,
+    config : LiveConfigStore,
+    isTickNEod : bool = False,
+) -> dict[str, tuple[bool, pd.DataFrame]]:
+    # bulk fetch of planned chains, PREFETCH_STEPS steps of every chain per
+    # request, a chain stops at first batch with a missing contract as its
+    # build stops there too, active contracts in TickNEod mode still go
+    # through get_tick_n_eod_combine_data
+    prefetched = {}
+    for itr in range(0, max([len(chain) for chain in chains], default=0), PREFETCH_STEPS):
+        batches = [chain[itr:itr+PREFETCH_STEPS] for chain in chains]
+        symbols = [
+            contract
+            for batch in batches for itr_contracts in batch for contract in itr_contracts
+            if not (isTickNEod and contract in config.contracts) and contract not in prefetched
+        ]
+        if len(symbols) != 0:
+            prefetched |= get_live_data_bulk(list(dict.fromkeys(symbols)), ohlcv)
+
+        chains = [
+            chain for chain, batch in zip(chains, batches)
+            if all(prefetched.get(contract, (True,))[0] for itr_contracts in batch for contract in itr_contracts)
+        ]
+
+    return prefetched
 
-        result[symbol] = product
-        for contract in product["contracts"]:
-            contract_code = contract["contractCode"]
-            result[f"{symbol}{contract_code}"] = contract
-            
-    return result
-        
 def get_live_synthetic_contractwise(
     expression : str,
     ohlcv : str,
@@ -55,16 +132,21 @@ def get_live_synthetic_contractwise(
     max_lookahead : int,
     mode : str = "normal",
     isTickNEod : bool = False,
+    leg_columns : dict[int, str] = {},
 ) -> pd.DataFrame:
+    # leg_columns : leg position -> column, per leg series returned
+    #   next to close in the same pass, see plan_leg_columns
     
     cache = {}
 
     if isTickNEod and ohlcv != 'c':
         raise ValueError(f"[-] In TickNEod mode value of ohlcv must be 'c'.")
+    if len(leg_columns) != 0 and ohlcv != 'c':
+        raise ValueError(f"[-] In verbose mode value of ohlcv must be 'c'.")
 
     contracts, multipliers = extract_contracts_multipliers(expression)
     contract_count = len(contracts)
-    META = get_config()
+    config = get_live_config()
 
     synthetic_df_list = []
     synthetic_roll_list = []
@@ -72,10 +154,18 @@ def get_live_synthetic_contractwise(
     end_year = datetime.today().year
     itr_contracts = contracts
 
+    prefetched = prefetch_live_chain(
+        plan_contractwise_chain(contracts, start_year, end_year),
+        ohlcv,
+        config,
+        isTickNEod,
+    )
+
     for itr_year in range(end_year, start_year-1, -1):
         itr_synthetic_df = pd.DataFrame()
         roll_date = None
         isAllLegFound = True
+        leg_list = []
 
         for itr in range(contract_count):
             itr_contract = itr_contracts[itr]
@@ -83,8 +173,10 @@ def get_live_synthetic_contractwise(
             if itr_contract in cache:
                 ok = True
                 df = cache[itr_contract]
+            elif itr_contract in prefetched:
+                ok, df = prefetched[itr_contract]
             else:
-                if isTickNEod and itr_contract in META:
+                if isTickNEod and itr_contract in config.contracts:
                     ok, df = get_tick_n_eod_combine_data(itr_contract)
                 else:
                     ok, df = get_live_data(
@@ -99,13 +191,18 @@ def get_live_synthetic_contractwise(
                 print(f"Data for contract {itr_contract} not available so stop at year {itr_year}")
                 break
             
+            if itr in leg_columns:
+                leg_list.append((
+                    leg_columns[itr],
+                    df["close"] * config.currency_multiplier[itr_contract[:-3]],
+                ))
+
             df = df * multipliers[itr]
-            df = df * META[itr_contract[:-3]]["currencyMultiplier"]
+            df = df * config.currency_multiplier[itr_contract[:-3]]
 
             itr_expiry_date = None
-            if itr_contract in META:
-                itr_expiry_date = META[itr_contract]["expiry"]
-                itr_expiry_date = pd.to_datetime(itr_expiry_date)
+            if itr_contract in config.expiry:
+                itr_expiry_date = config.expiry[itr_contract]
             else:                
                 itr_expiry_date = df.index[-1]
 
@@ -119,6 +216,9 @@ def get_live_synthetic_contractwise(
         if not isAllLegFound:
             break
 
+        if len(leg_list) != 0:
+            itr_synthetic_df = attach_leg_columns(itr_synthetic_df, leg_list)
+
         synthetic_df_list.append(itr_synthetic_df)
 
         roll_date -= pd.DateOffset(days=offset)
@@ -136,6 +236,7 @@ def get_live_synthetic_contractwise(
         isBackAdjusted = isBackAdjusted,
         max_lookahead = max_lookahead,
         mode=mode,
+        leg_columns = list(leg_columns.values()),
     )
 
     return res_df
@@ -152,13 +253,18 @@ def get_live_synthetic_custom(
     month_map : dict,
     mode : str = "normal",
     isTickNEod : bool = False,
+    leg_columns : dict[int, str] = {},
 ) -> pd.DataFrame:
+    # leg_columns : leg position -> column, per leg series returned
+    #   next to close in the same pass, see plan_leg_columns
 
     if isTickNEod and ohlcv != 'c':
         raise ValueError(f"[-] In TickNEod mode value of ohlcv must be 'c'.")
+    if len(leg_columns) != 0 and ohlcv != 'c':
+        raise ValueError(f"[-] In verbose mode value of ohlcv must be 'c'.")
 
     contracts, multipliers = extract_contracts_multipliers(expression)
-    META = get_config()
+    config = get_live_config()
 
     synthetic_df_list = []
     synthetic_roll_list = []
@@ -166,6 +272,13 @@ def get_live_synthetic_custom(
     contract_count = len(contracts)
     itr_contracts = contracts
 
+    prefetched = prefetch_live_chain(
+        plan_custom_chain(contracts, start_year, month_map),
+        ohlcv,
+        config,
+        isTickNEod,
+    )
+
     while True:
         itr_min_year = extract_full_min_year_from_contracts(itr_contracts)
         if itr_min_year < start_year:
@@ -174,11 +287,14 @@ def get_live_synthetic_custom(
         itr_synthetic_df = pd.DataFrame()
         roll_date = None
         isAllLegFound = True
+        leg_list = []
 
         for itr in range(contract_count):
             itr_contract = itr_contracts[itr]
 
-            if isTickNEod and itr_contract in META:
+            if itr_contract in prefetched:
+                ok, df = prefetched[itr_contract]
+            elif isTickNEod and itr_contract in config.contracts:
                 ok, df = get_tick_n_eod_combine_data(itr_contract)
             else:
                 ok, df = get_live_data(
@@ -191,13 +307,18 @@ def get_live_synthetic_custom(
                 print(f"Data for contract {itr_contract} not available so stop at {itr_contracts}")
                 break
 
+            if itr in leg_columns:
+                leg_list.append((
+                    leg_columns[itr],
+                    df["close"] * config.currency_multiplier[itr_contract[:-3]],
+                ))
+
             df = df * multipliers[itr]
-            df = df * META[itr_contract[:-3]]["currencyMultiplier"]
+            df = df * config.currency_multiplier[itr_contract[:-3]]
 
             itr_expiry_date = None
-            if itr_contract in META:
-                itr_expiry_date = META[itr_contract]["expiry"]
-                itr_expiry_date = pd.to_datetime(itr_expiry_date)
+            if itr_contract in config.expiry:
+                itr_expiry_date = config.expiry[itr_contract]
             else:
                 itr_expiry_date = df.index[-1]
 
@@ -212,6 +333,9 @@ def get_live_synthetic_custom(
         if not isAllLegFound:
             break
 
+        if len(leg_list) != 0:
+            itr_synthetic_df = attach_leg_columns(itr_synthetic_df, leg_list)
+
         synthetic_df_list.append(itr_synthetic_df)
 
         roll_date -= pd.DateOffset(days=offset)
@@ -231,6 +355,7 @@ def get_live_synthetic_custom(
         isBackAdjusted = isBackAdjusted,
         max_lookahead = max_lookahead,
         mode=mode,
+        leg_columns = list(leg_columns.values()),
     )
 
     return res_df
@@ -245,17 +370,18 @@ def get_live_synthetic_spreadwise(
     offset : int,
     max_lookahead : int,
     mode : str = "normal",
-    isTickNEod : bool = False
+    isTickNEod : bool = False,
+    leg_columns : dict[int, str] = {},
 ) -> pd.DataFrame:
 
     contracts, multipliers = extract_contracts_multipliers(expression)
-    META = get_config()
+    config = get_live_config()
 
     month_map = {}
 
     for contract in contracts:
         sym = contract[:-3]
-        month_map[sym] = META[sym]["contractMonths"]
+        month_map[sym] = config.contract_months[sym]
 
     res_df = get_live_synthetic_custom(
         expression = expression,
@@ -268,6 +394,7 @@ def get_live_synthetic_spreadwise(
         month_map = month_map,
         mode = mode,
         isTickNEod = isTickNEod,
+        leg_columns = leg_columns,
     )
 
     return res_df
@@ -283,11 +410,12 @@ def get_live_synthetic_generic(
     max_lookahead : int,
     mode : str = "normal",
     itr_months : str | None = None,
-    isTickNEod : bool = False
+    isTickNEod : bool = False,
+    leg_columns : dict[int, str] = {},
 ) -> pd.DataFrame:
 
     # get config
-    META = get_config()
+    config = get_live_config()
 
     # step : 0 : check expression validness
     contracts, multipliers = extract_contracts_multipliers(expression)
@@ -299,14 +427,14 @@ def get_live_synthetic_generic(
     for contract in contracts:
         if instrument != contract[:-3]:
             raise ValueError(f"[-] Invalid expression contain multilple instruments || ERROR : {contract}")
-        if contract not in META:
+        if contract not in config.contracts:
             raise ValueError(f"[-] Invalid expression should contain only active contracts || ERROR : {contract}")
 
     if itr_months == None:
-        itr_months = META[instrument]["contractMonths"]
+        itr_months = config.contract_months[instrument]
 
     for month in itr_months:
-        if month not in META[instrument]["contractMonths"]:
+        if month not in config.contract_months[instrument]:
             raise ValueError(f"[-] Invalid expression invalid {month=} found for {instrument=} found")
 
     for contract in contracts:
@@ -316,7 +444,7 @@ def get_live_synthetic_generic(
 
     # step : 1 : add rolling trigger in expression if not exist
     smallest_contract_suffix = None
-    for active_contract_suffix_dict in META[instrument]["contracts"]:
+    for active_contract_suffix_dict in config.products[instrument]["contracts"]:
         active_contract_suffix = active_contract_suffix_dict["contractCode"]
 
         current_month = active_contract_suffix[0]
@@ -370,7 +498,8 @@ def get_live_synthetic_generic(
         max_lookahead = max_lookahead,
         month_map = month_map,
         mode = mode,
-        isTickNEod = isTickNEod
+        isTickNEod = isTickNEod,
+        leg_columns = leg_columns,
     )
 
     return res_df
@@ -388,11 +517,19 @@ def get_live_synthetic(
     mode : str = "normal",
     isTickNEod : bool = False,
     itr_months : str | None = None,
+    verbose : bool = False,
 ) -> pd.DataFrame:
+    # verbose : also return one back-adjusted column per distinct contract
+    #   of expression, built in the same pass as close
 
     expression = expression.replace(" ", "")
     interval = "1d"
 
+    leg_columns = {}
+    if verbose:
+        contracts, _ = extract_contracts_multipliers(expression)
+        leg_columns = plan_leg_columns(contracts)
+
     if isBackAdjusted and max_lookahead == None:
         raise ValueError(f"[-] In backadjust mode max_lookahead can't be None value")
 
@@ -413,6 +550,7 @@ def get_live_synthetic(
             max_lookahead = max_lookahead,
             mode = mode,
             isTickNEod = isTickNEod,
+            leg_columns = leg_columns,
         )
 
         res_df["days_to_roll"] = res_df.roll_date - res_df.index
@@ -429,6 +567,7 @@ def get_live_synthetic(
             max_lookahead = max_lookahead,
             mode = mode,
             isTickNEod = isTickNEod,
+            leg_columns = leg_columns,
         )
 
         res_df["days_to_roll"] = res_df.roll_date - res_df.index
@@ -445,7 +584,8 @@ def get_live_synthetic(
             max_lookahead = max_lookahead,
             mode = mode,
             itr_months = itr_months,
-            isTickNEod = isTickNEod
+            isTickNEod = isTickNEod,
+            leg_columns = leg_columns,
         )
 
         res_df["days_to_roll"] = res_df.roll_date - res_df.index
@@ -458,16 +598,27 @@ def get_live_synthetic(
 
 
 
-def get_live_synthetic_stack(
+def plan_live_stack_chain(
     expression : str,
     start_year : int,
-    interval : str = "1d",
-) -> list[pd.DataFrame]:
+) -> list[list[str]]:
+    # contracts of every year visited by build_live_stack
+    contracts, multipliers = extract_contracts_multipliers(expression)
+    end_year = datetime.today().year
+
+    return plan_contractwise_chain(contracts, start_year, end_year)
+
+def build_live_stack(
+    expression : str,
+    start_year : int,
+    prefetched : dict[str, tuple[bool, pd.DataFrame]],
+    config : LiveConfigStore,
+) -> list[tuple[pd.Timestamp, pd.DataFrame]]:
+    # (expiry, close frame) per year oldest first, from prefetched live data
     contracts, multipliers = extract_contracts_multipliers(expression)
     contract_count = len(contracts)
-    META = get_config()
 
-    synthetic_df_list = []
+    synthetic_list = []
 
     end_year = datetime.today().year
     itr_contracts = contracts
@@ -480,22 +631,18 @@ def get_live_synthetic_stack(
         for itr in range(contract_count):
             itr_contract = itr_contracts[itr]
 
-            ok, df = get_live_data(
-                    symbol = itr_contract,
-                   ohlcv = "c",
-            )
+            ok, df = prefetched[itr_contract]
             if not ok:
                 isAllLegFound = False
                 print(f"Data for contract {itr_contract} not available so stop at year {itr_year}")
                 break
 
             df = df * multipliers[itr]
-            df = df * META[itr_contract[:-3]]["currencyMultiplier"]
+            df = df * config.currency_multiplier[itr_contract[:-3]]
 
             itr_expiry_date = None
-            if itr_contract in META:
-                itr_expiry_date = META[itr_contract]["expiry"]
-                itr_expiry_date = pd.to_datetime(itr_expiry_date)
+            if itr_contract in config.expiry:
+                itr_expiry_date = config.expiry[itr_contract]
             else:
                 itr_expiry_date = df.index[-1]
 
@@ -509,11 +656,29 @@ def get_live_synthetic_stack(
         if not isAllLegFound:
             break
 
-        itr_synthetic_df.rename(columns={"close": str(roll_date.year)}, inplace=True)
-        synthetic_df_list.append(itr_synthetic_df)
+        synthetic_list.append((roll_date, itr_synthetic_df))
 
         itr_contracts = move_contracts_to_prev_year(itr_contracts)
 
-    synthetic_df_list = synthetic_df_list[::-1]
+    return synthetic_list[::-1]
+
+
+def get_live_synthetic_stack(
+    expression : str,
+    start_year : int,
+    interval : str = "1d",
+) -> list[pd.DataFrame]:
+    config = get_live_config()
+
+    prefetched = prefetch_live_chain(
+        plan_live_stack_chain(expression, start_year),
+        "c",
+        config,
+    )
+
+    synthetic_df_list = []
+    for roll_date, itr_synthetic_df in build_live_stack(expression, start_year, prefetched, config):
+        itr_synthetic_df.rename(columns={"close": str(roll_date.year)}, inplace=True)
+        synthetic_df_list.append(itr_synthetic_df)
 
-    return synthetic_df_list
\ No newline at end of file
+    return synthetic_df_list
@@ -3,10 +3,9 @@ from .live_synthetic import get_live_synthetic
 
 from gscbt.expression_utils import (
     extract_contracts_multipliers,
-    create_expression_from_contracts_multipliers,
 )
 
-    
+
 def get_live_synthetic_verbose(
     expression : str,
     start : str,
@@ -17,12 +16,12 @@ def get_live_synthetic_verbose(
     mode : str = "normal",
     month_map : dict = {}
 ) -> pd.DataFrame:
-    
+    # one column per distinct contract next to close, roll_date and
+    # days_to_roll, all legs built in one pass over the contract chain
+
     if isBackAdjusted and max_lookahead == None:
         raise ValueError(f"[-] In backadjust mode max_lookahead can't be None value")
 
-    processed_contracts = set()
-
     contracts, multipliers = extract_contracts_multipliers(expression)
 
     itr_months = None
@@ -30,33 +29,7 @@ def get_live_synthetic_verbose(
     if instrument in month_map:
         itr_months = month_map[instrument]
 
-    df_list = []
-    for i in range(len(contracts)):
-        if contracts[i] in processed_contracts:
-            continue
-
-        processed_contracts.add(contracts[i])
-
-        new_multipliers = [0]*len(contracts)
-        new_multipliers[i] = 1
-        a = create_expression_from_contracts_multipliers(contracts, new_multipliers)
-        df = get_live_synthetic(
-            expression = a,
-            start = start,
-            offset  = offset,
-            ohlcv  = "c",
-            isBackAdjusted = isBackAdjusted,
-            interval = "1d",
-            roll_method = roll_method,
-            max_lookahead = max_lookahead,
-            mode = mode,
-            itr_months = itr_months
-        )
-        df = df.drop(columns=["roll_date", "days_to_roll"])
-        df = df.rename(columns={"close": contracts[i]})
-        df_list.append(df)
- 
-    df = get_live_synthetic(
+    res_df = get_live_synthetic(
         expression = expression,
         start = start,
         offset  = offset,
@@ -66,9 +39,8 @@ def get_live_synthetic_verbose(
         roll_method = roll_method,
         max_lookahead = max_lookahead,
         mode = mode,
-        itr_months = itr_months
+        itr_months = itr_months,
+        verbose = True,
     )
 
-    df_list.append(df)
-    res_df = pd.concat(df_list, axis=1)
-    return res_df
\ No newline at end of file
+    return res_df
@@ -0,0 +1,324 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from gscbt.utils import API
+from gscbt.metrics import METRICS
+from gscbt.http_client import get_http_client
+
+from .live_config import get_live_config
+
+
+class TickStore:
+    # latest tick per symbol in flat arrays
+    #   slot of a symbol never change, arrays grow by doubling
+    #   ts is utc epoch ns, 0 when symbol has no tick yet
+    #   seen is time.time_ns() of last set, age of tick as received
+
+    def __init__(self, capacity : int = 1024):
+        self._slots : dict[str, int] = {}
+        self._ts = np.zeros(capacity, dtype=np.int64)
+        self._seen = np.zeros(capacity, dtype=np.int64)
+        self._price = np.full(capacity, np.nan, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    def _slot_locked(self, symbol : str) -> int:
+        slot = self._slots.get(symbol)
+        if slot is not None:
+            return slot
+
+        slot = len(self._slots)
+        if slot == len(self._ts):
+            self._ts = np.concatenate([self._ts, np.zeros(slot, dtype=np.int64)])
+            self._seen = np.concatenate([self._seen, np.zeros(slot, dtype=np.int64)])
+            self._price = np.concatenate([self._price, np.full(slot, np.nan)])
+
+        self._slots[symbol] = slot
+        return slot
+
+    def set(self, symbol : str, ts : int, price : float):
+        with self._lock:
+            slot = self._slot_locked(symbol)
+            # out of order response of older poll is ignored
+            if ts >= self._ts[slot]:
+                self._ts[slot] = ts
+                self._price[slot] = price
+            self._seen[slot] = time.time_ns()
+
+    def get(
+        self,
+        symbol : str,
+        max_age : float | None = None,
+    ) -> tuple[pd.Timestamp, float] | None:
+        # max_age : seconds since symbol was last received, older is None
+        with self._lock:
+            slot = self._slots.get(symbol)
+            if slot is None or self._ts[slot] == 0:
+                return None
+            if max_age is not None and time.time_ns() - self._seen[slot] > max_age * 1e9:
+                return None
+            ts = int(self._ts[slot])
+            price = float(self._price[slot])
+
+        return pd.Timestamp(ts, unit="ns", tz="UTC"), price
+
+    def __contains__(self, symbol : str) -> bool:
+        return self.get(symbol) is not None
+
+    def snapshot(self) -> pd.DataFrame:
+        # symbol -> timestamp, price
+        with self._lock:
+            symbols = list(self._slots.keys())
+            ts = self._ts[:len(symbols)].copy()
+            price = self._price[:len(symbols)].copy()
+
+        df = pd.DataFrame({
+            "timestamp" : pd.to_datetime(ts, unit="ns", utc=True),
+            "price" : price,
+        }, index=pd.Index(symbols, name="symbol"))
+        return df[ts != 0]
+
+
+class TickSubscriber:
+    # one background loop polling latest tick of every symbol each interval
+    # symbols        : None for every active contract of live config
+    # bulk_url       : latest tick of many symbols in one request,
+    #                  GET ?symbols=a,b -> [{"symbol", "timestamp", "price"}]
+    #                  None (or failed request) polls symbol by symbol
+    # stale_intervals: tick not received for this many intervals is stale,
+    #                  builds fetch it directly
+
+    def __init__(
+        self,
+        symbols : list[str] | None = None,
+        interval : float = 1.0,
+        store : TickStore | None = None,
+        url : str | None = None,
+        max_workers : int = 8,
+        timeout : float = 2,
+        bulk_url : str | None = None,
+        stale_intervals : int = 5,
+    ):
+        self.symbols = symbols
+        self.interval = interval
+        self.store = store if store is not None else tick_store
+        self.url = url if url is not None else API.GET_LATEST_TICK
+        self.bulk_url = bulk_url
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.max_tick_age : float = stale_intervals * interval
+
+        self._stop = threading.Event()
+        self._thread : threading.Thread | None = None
+        # created on first poll, shut down by stop()
+        self._pool : ThreadPoolExecutor | None = None
+
+    def _symbols(self) -> list[str]:
+        if self.symbols is not None:
+            return self.symbols
+        return list(get_live_config().contracts.keys())
+
+    def _poll_symbol(self, symbol : str) -> bool:
+        try:
+            res = get_http_client().get(
+                self.url,
+                params = {"symbol" : symbol},
+                timeout = self.timeout,
+            )
+            if res.status_code != 200:
+                return False
+
+            tick = json.loads(res.content)
+            ts = pd.to_datetime(tick["timestamp"], utc=True)
+            self.store.set(symbol, ts.value, float(tick["price"]))
+        except Exception:
+            return False
+
+        return True
+
+    def _poll_bulk(self, symbols : list[str]) -> int | None:
+        # return number of symbols updated, None when request failed
+        try:
+            res = get_http_client().get(
+                self.bulk_url,
+                params = {"symbols" : ",".join(symbols)},
+                timeout = self.timeout,
+            )
+            if res.status_code != 200:
+                return None
+            ticks = json.loads(res.content)
+        except Exception:
+            return None
+
+        updated = 0
+        wanted = set(symbols)
+        for tick in ticks:
+            try:
+                if tick["symbol"] not in wanted:
+                    continue
+                ts = pd.to_datetime(tick["timestamp"], utc=True)
+                self.store.set(tick["symbol"], ts.value, float(tick["price"]))
+                updated += 1
+            except Exception:
+                continue
+        return updated
+
+    def poll_once(self) -> int:
+        # return number of symbols updated
+        symbols = self._symbols()
+
+        updated = None
+        if self.bulk_url is not None and len(symbols) != 0:
+            updated = self._poll_bulk(symbols)
+            if updated is None:
+                METRICS.incr("live_tick.bulk_errors")
+
+        if updated is None:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = "gscbt-tick-poll")
+            updated = sum(self._pool.map(self._poll_symbol, symbols))
+
+        METRICS.incr("live_tick.polls")
+        METRICS.incr("live_tick.errors", len(symbols) - updated)
+        return updated
+
+    def _run(self):
+        while not self._stop.is_set():
+            st = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception:
+                METRICS.incr("live_tick.errors")
+            self._stop.wait(max(0, self.interval - (time.monotonic() - st)))
+
+    def start(self) -> "TickSubscriber":
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="gscbt-tick", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+class TickStandInServer:
+    # local stand-in for the latest tick service, for tests and offline work
+    #   GET /latest?symbol=<symbol> -> {"timestamp", "price"}, 404 if unknown
+    #   GET /latest_many?symbols=<a,b> -> [{"symbol", "timestamp", "price"}]
+    #       of known symbols
+
+    def __init__(self, host : str = "127.0.0.1", port : int = 0):
+        self.ticks : dict[str, tuple[str, float]] = {}
+        self.requests : int = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                symbol = query.get("symbol", [""])[0]
+
+                if url.path == "/latest_many":
+                    body = json.dumps([
+                        {"symbol" : symbol, "timestamp" : stand_in.ticks[symbol][0], "price" : stand_in.ticks[symbol][1]}
+                        for symbol in query.get("symbols", [""])[0].split(",")
+                        if symbol in stand_in.ticks
+                    ]).encode()
+                elif url.path != "/latest" or symbol not in stand_in.ticks:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                else:
+                    timestamp, price = stand_in.ticks[symbol]
+                    body = json.dumps({"timestamp" : timestamp, "price" : price}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread : threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/latest"
+
+    @property
+    def bulk_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/latest_many"
+
+    def set_tick(self, symbol : str, timestamp : str, price : float):
+        self.ticks[symbol] = (timestamp, price)
+
+    def start(self) -> "TickStandInServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+tick_store = TickStore()
+subscriber : TickSubscriber | None = None
+_subscriber_lock = threading.Lock()
+
+def start_tick_subscriber(
+    symbols : list[str] | None = None,
+    interval : float = 1.0,
+    url : str | None = None,
+    bulk_url : str | None = None,
+) -> TickSubscriber:
+    # isTickNEod builds read ticks of running subscriber instead of polling
+    global subscriber
+
+    with _subscriber_lock:
+        if subscriber is not None:
+            subscriber.stop()
+        subscriber = TickSubscriber(symbols, interval, url = url, bulk_url = bulk_url).start()
+        return subscriber
+
+def stop_tick_subscriber():
+    global subscriber
+
+    with _subscriber_lock:
+        if subscriber is not None:
+            subscriber.stop()
+            subscriber = None
+
+def is_tick_subscribed() -> bool:
+    return subscriber is not None and subscriber.is_running()
+
+def tick_max_age() -> float | None:
+    # age after which stored tick of running subscriber is stale
+    current = subscriber
+    if current is None or not current.is_running():
+        return None
+    return current.max_tick_age
@@ -0,0 +1,307 @@
+import re
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from gscbt.utils import PATH, Dotdict
+
+from .contract_expiry import get_expiry_table
+
+# bump when the row layout below changes, persisted calendars with
+# other version get rebuilt from the cache manifest
+ROLL_CALENDAR_VERSION = 1
+ROLL_OFFSETS = [0, 5, 10, 15, 20, 30]
+
+_calendars : dict = {}
+_calendars_lock = threading.Lock()
+
+
+def _roll_date_column(offset : int) -> str:
+    return f"roll_date_{offset}"
+
+def _read_bar_range(path : Path) -> tuple[pd.Timestamp, pd.Timestamp]:
+    # first and last bar of a cached outright
+    # parquet row group statistics are used so the data itself is not loaded
+    pf = pq.ParquetFile(path)
+    meta = pf.metadata
+    col_idx = pf.schema_arrow.get_field_index("timeutc")
+
+    if meta.num_rows == 0 or col_idx == -1:
+        return None, None
+
+    first = None
+    last = None
+    for rg in range(meta.num_row_groups):
+        stats = meta.row_group(rg).column(col_idx).statistics
+        if stats is None or not stats.has_min_max:
+            first = None
+            break
+
+        first = stats.min if first is None else min(first, stats.min)
+        last = stats.max if last is None else max(last, stats.max)
+
+    # fallback : file written without statistics, read only time column
+    if first is None:
+        min_max = pc.min_max(pf.read(columns=["timeutc"]).column(0))
+        first = min_max["min"].as_py()
+        last = min_max["max"].as_py()
+
+    return pd.to_datetime(first, utc=True), pd.to_datetime(last, utc=True)
+
+
+class RollCalendar:
+    # contract -> row with
+    #   contract, month_code, year, last_trade_date, first_bar, last_bar,
+    #   roll_date_<offset> for every offset in ROLL_OFFSETS
+    # built from cached outright parquet files (the cache manifest) so
+    # roll schedules don't require loading outright data
+
+    def __init__(
+        self,
+        ticker : Dotdict,
+        interval : str = "1d",
+    ):
+        self.ticker = ticker
+        self.interval = interval
+        self.version : int = ROLL_CALENDAR_VERSION
+        self.rows : dict[str, dict] = {}
+        # contract -> (file size, file mtime_ns) used to detect stale rows
+        self.manifest : dict[str, tuple[int, int]] = {}
+        # rows added since last save, written by flush()
+        self.isDirty : bool = False
+        self._lock = threading.Lock()
+        # one writer of calendar file at a time
+        self._save_lock = threading.Lock()
+        self._contract_re = re.compile(
+            rf"^{re.escape(ticker.symbol)}([FGHJKMNQUVXZ])(\d{{2}})$"
+        )
+
+    @staticmethod
+    def get(ticker : Dotdict, interval : str = "1d") -> "RollCalendar":
+        key = (ticker.exchange, ticker.symbol, ticker.type, interval)
+
+        with _calendars_lock:
+            calendar = _calendars.get(key)
+            if calendar is None:
+                calendar = RollCalendar(ticker, interval)
+                calendar.load()
+                calendar.refresh()
+                _calendars[key] = calendar
+
+        return calendar
+
+    @property
+    def cache_dir(self) -> Path:
+        return (
+            PATH.CACHE / self.ticker.exchange / self.ticker.symbol
+            / self.ticker.type / self.interval
+        )
+
+    @property
+    def path(self) -> Path:
+        return (
+            PATH.ROLL_CALENDAR / self.ticker.exchange
+            / f"{self.ticker.symbol}_{self.ticker.type}_{self.interval}.parquet"
+        )
+
+    def scan_manifest(self) -> dict[str, tuple[int, int]]:
+        manifest = {}
+        if not self.cache_dir.exists():
+            return manifest
+
+        for file in self.cache_dir.glob("*.parquet"):
+            if self._contract_re.match(file.stem) is None:
+                continue
+
+            stat = file.stat()
+            manifest[file.stem] = (stat.st_size, stat.st_mtime_ns)
+
+        return manifest
+
+    def _create_row(self, contract : str) -> dict | None:
+        path = self.cache_dir / f"{contract}.parquet"
+        first_bar, last_bar = _read_bar_range(path)
+        if last_bar is None:
+            return None
+
+        match = self._contract_re.match(contract)
+        row = {
+            "contract" : contract,
+            "month_code" : match.group(1),
+            "year" : match.group(2),
+            # same proxy as the data pipeline, last bar of expired contract
+            "last_trade_date" : last_bar,
+            "first_bar" : first_bar,
+            "last_bar" : last_bar,
+        }
+        for offset in ROLL_OFFSETS:
+            row[_roll_date_column(offset)] = last_bar - pd.offsets.Day(offset)
+
+        return row
+
+    def refresh(self) -> bool:
+        # re-read only contracts whose cached file is new or changed
+        # return True when calendar changed
+        manifest = self.scan_manifest()
+        isChanged = False
+
+        with self._lock:
+            for contract in list(self.rows.keys()):
+                if contract not in manifest:
+                    del self.rows[contract]
+                    self.manifest.pop(contract, None)
+                    isChanged = True
+
+            for contract, file_stat in manifest.items():
+                if self.manifest.get(contract) == file_stat and contract in self.rows:
+                    continue
+
+                row = self._create_row(contract)
+                if row is None:
+                    self.rows.pop(contract, None)
+                else:
+                    self.rows[contract] = row
+                self.manifest[contract] = file_stat
+                isChanged = True
+
+        if isChanged:
+            self.save()
+
+        return isChanged
+
+    def add(self, contract : str) -> dict | None:
+        # called after a single outright got cached, only in memory until
+        # flush() so a chain of adds writes the calendar once
+        path = self.cache_dir / f"{contract}.parquet"
+        if not path.exists():
+            return None
+
+        row = self._create_row(contract)
+        stat = path.stat()
+
+        with self._lock:
+            self.manifest[contract] = (stat.st_size, stat.st_mtime_ns)
+            if row is not None:
+                self.rows[contract] = row
+            self.isDirty = True
+
+        return row
+
+    def flush(self):
+        # save once after a run of add()
+        if self.isDirty:
+            self.save()
+
+    def lookup(self, contract : str) -> dict | None:
+        return self.rows.get(contract)
+
+    def last_bar(self, contract : str) -> pd.Timestamp | None:
+        row = self.rows.get(contract)
+        if row is None:
+            return None
+        return row["last_bar"]
+
+    def last_trade_date(self, contract : str) -> pd.Timestamp | None:
+        # prefer exchange expiry from local expiry table when known
+        expiry = get_expiry_table().lookup(contract)
+        if expiry is not None:
+            return expiry
+
+        row = self.rows.get(contract)
+        if row is None:
+            return None
+        return row["last_trade_date"]
+
+    def roll_date(self, contract : str, offset : int) -> pd.Timestamp | None:
+        row = self.rows.get(contract)
+        if row is None:
+            return None
+
+        col = _roll_date_column(offset)
+        if col in row:
+            return row[col]
+        return row["last_bar"] - pd.offsets.Day(offset)
+
+    def to_df(self) -> pd.DataFrame:
+        with self._lock:
+            rows = list(self.rows.values())
+            manifest = dict(self.manifest)
+
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return df
+
+        df["file_size"] = df["contract"].map(lambda c: manifest[c][0])
+        df["file_mtime_ns"] = df["contract"].map(lambda c: manifest[c][1])
+        df.sort_values("last_bar", inplace=True)
+        df.set_index(["contract"], inplace=True)
+        return df
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                self.isDirty = False
+
+            df = self.to_df()
+            if df.empty:
+                return
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+            table = pa.Table.from_pandas(df)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                b"roll_calendar_version" : str(self.version).encode(),
+                b"built_at" : datetime.now(timezone.utc).isoformat().encode(),
+            })
+
+            # unique temp file, a crashed writer never clobbers another one
+            with tempfile.NamedTemporaryFile(
+                dir=self.path.parent, prefix=self.path.stem, suffix=".tmp", delete=False
+            ) as file:
+                tmp_path = Path(file.name)
+            try:
+                pq.write_table(table, tmp_path)
+                tmp_path.replace(self.path)
+            except:
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+
+        try:
+            table = pq.read_table(self.path)
+        except Exception:
+            return False
+
+        metadata = table.schema.metadata or {}
+        version = metadata.get(b"roll_calendar_version", b"-1").decode()
+        if int(version) != ROLL_CALENDAR_VERSION:
+            return False
+
+        df = table.to_pandas()
+        rows = {}
+        manifest = {}
+        for contract, row in df.iterrows():
+            row = row.to_dict()
+            manifest[contract] = (int(row.pop("file_size")), int(row.pop("file_mtime_ns")))
+            row["contract"] = contract
+            rows[contract] = row
+
+        with self._lock:
+            self.rows = rows
+            self.manifest = manifest
+
+        return True
+
+
+def get_roll_calendar(ticker : Dotdict, interval : str = "1d") -> RollCalendar:
+    return RollCalendar.get(ticker, interval)
@@ -19,8 +19,11 @@ def offset_roll(
     interval : str,
     isBackAdjusted : bool,
     max_lookahead : int,
-    mode : str =  "normal"
+    mode : str =  "normal",
+    leg_columns : list[str] = [],
 ) -> pd.DataFrame:
+    # leg_columns : per leg series carried next to close, rolled on the
+    #   same dates and back-adjusted with their own diff at that date
     
     if len(synthetic_df_list) != len(synthetic_roll_list):
         raise ValueError(f"[-] Length of df_list and roll_list don't match")
@@ -42,6 +45,9 @@ def offset_roll(
 
         if isBackAdjusted:
             diff = None
+            # bars of res_df and itr_synthetic the diff is taken at
+            d1_date = None
+            d2_date = None
 
             if mode == "normal":
                 for _ in range(max_lookahead+1):
@@ -51,18 +57,27 @@ def offset_roll(
 
                         if not pd.isna(d1) and not pd.isna(d2):
                             diff = d2 - d1
+                            d1_date = roll_date
+                            d2_date = roll_date
                             break
 
                     roll_date += interval_offset
             elif mode == "force":
-                d1 = res_df["close"].dropna().loc[:roll_date].iloc[-1]
-                d2 = itr_synthetic[itr_synthetic.index >= roll_date]["close"].dropna().iloc[0]
+                d1_series = res_df["close"].dropna().loc[:roll_date]
+                d2_series = itr_synthetic[itr_synthetic.index >= roll_date]["close"].dropna()
+                d1 = d1_series.iloc[-1]
+                d2 = d2_series.iloc[0]
                 if not pd.isna(d1) and not pd.isna(d2):
                     diff = d2 - d1
+                    d1_date = d1_series.index[-1]
+                    d2_date = d2_series.index[0]
 
             if diff == None:
                 raise Exception("[-] Fail to backadjust in given max_lookahead.")
             
+            for col in leg_columns:
+                res_df[col] += itr_synthetic[col].loc[d2_date] - res_df[col].loc[d1_date]
+
             res_df = df_apply_operation_to_given_columns(
                 df= res_df,
                 value= diff,
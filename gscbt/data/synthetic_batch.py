@@ -0,0 +1,245 @@
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from gscbt.ticker import Ticker
+from gscbt.expression_utils import (
+    get_full_year,
+    move_contract_to_given_prev_valid_month,
+)
+
+from .outright import get_outright
+from .roll_calendar import RollCalendar
+from .synthetic_builder import SyntheticBuilder
+from .synthetic_builder_wrappers import (
+    load_toml_config,
+    legs_from_toml_config_common_spec,
+)
+
+
+class OutrightMemo:
+    # drop-in for get_outright shared by every build of a batch
+    # each (symbol, contract, ohlcv, interval) is loaded once
+
+    def __init__(self, loader = get_outright):
+        self.loader = loader
+        self.loads : int = 0
+        self.hits : int = 0
+        self._results : dict = {}
+        self._key_locks : dict = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key : tuple) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def __call__(
+        self,
+        ticker,
+        contract : str,
+        ohlcv : str,
+        interval : str = "1d",
+    ) -> tuple[pd.DataFrame, bool]:
+        key = (ticker.symbol, contract, ohlcv, interval)
+
+        with self._key_lock(key):
+            isLoaded = key in self._results
+            if not isLoaded:
+                try:
+                    self._results[key] = (self.loader(ticker, contract, ohlcv, interval), None)
+                except Exception as e:
+                    self._results[key] = (None, e)
+
+        with self._lock:
+            if isLoaded:
+                self.hits += 1
+            else:
+                self.loads += 1
+
+        res, err = self._results[key]
+        if err is not None:
+            raise err
+
+        # builds modify their frames in place
+        df, ok = res
+        return df.copy(), ok
+
+
+def leg_contract_chain(leg : dict) -> list[tuple[str, str]]:
+    # (contract, rt_contract) pairs walked by SyntheticLeg.create
+    chain = []
+
+    contract = leg["contract"]
+    rt_contract = leg["rt_contract"]
+    src_year = get_full_year(int(leg["start_rt_contract"][-2:]))
+    src_month = leg["start_rt_contract"][-3]
+
+    while True:
+        year = get_full_year(int(rt_contract[-2:]))
+        month = contract[-3]
+
+        if(year < src_year or (month < src_month and year == src_year)):
+            break
+
+        chain.append((contract, rt_contract))
+
+        contract = move_contract_to_given_prev_valid_month(
+            contract,
+            leg["contract_roll_months"],
+        )
+        rt_contract = move_contract_to_given_prev_valid_month(
+            rt_contract,
+            leg["rt_contract_roll_months"],
+        )
+
+    return chain
+
+
+class SyntheticBatch:
+    # many common spec TOML synthetics built with one shared load plan
+
+    def __init__(
+        self,
+        specs : dict[str, dict],
+    ):
+        self.specs = specs
+        self.results : dict[str, pd.DataFrame] = {}
+
+    @staticmethod
+    def from_toml(source : str | Path) -> "SyntheticBatch":
+        # source : directory of toml files or one toml file
+        # a file with [[synthetics]] tables holds many specs
+        source = Path(source)
+
+        files = [source]
+        if source.is_dir():
+            files = sorted(source.glob("*.toml"))
+
+        specs = {}
+        for file in files:
+            config = load_toml_config(str(file))
+
+            sub_configs = [(config.get("name", file.stem), config)]
+            if "synthetics" in config:
+                # top level keys (interval, data_type, dates, ...) are a
+                # shared header, every [[synthetics]] table may override them
+                header = {key : value for key, value in config.items() if key not in ("synthetics", "name")}
+                sub_configs = [
+                    (sub.get("name", f"{file.stem}_{itr}"), header | sub)
+                    for itr, sub in enumerate(config["synthetics"])
+                ]
+
+            for name, sub in sub_configs:
+                if name in specs:
+                    raise ValueError(f"[-] SyntheticBatch duplicate synthetic name {name} in {file}")
+                specs[name] = sub
+
+        return SyntheticBatch(specs)
+
+    def plan(self) -> list[list[tuple]]:
+        # unique chains of outright loads (ticker, contract, ohlcv, interval)
+        # newest to oldest, same order as SyntheticLeg walks them
+        chains = {}
+
+        for config in self.specs.values():
+            interval = config.get("interval")
+
+            for leg in config.get("legs", []):
+                ticker = Ticker.SYMBOLS[leg["rt_contract"][:-3]]
+                rt_calendar = RollCalendar.get(ticker, interval)
+
+                chain = []
+                for contract, rt_contract in leg_contract_chain(leg):
+                    chain.append((ticker, contract, "c", interval))
+                    if rt_calendar.last_bar(rt_contract) is None:
+                        chain.append((ticker, rt_contract, "c", interval))
+
+                key = tuple((item[0].symbol, *item[1:]) for item in chain)
+                chains[key] = chain
+
+        return list(chains.values())
+
+    def _preload(self, memo : OutrightMemo, chain : list[tuple]):
+        for ticker, contract, ohlcv, interval in chain:
+            try:
+                _, ok = memo(ticker, contract, ohlcv, interval)
+            except Exception:
+                ok = False
+
+            # older contracts of chain won't be used by the build
+            if not ok:
+                break
+
+            # registered before builds start, so builds find roll trigger
+            # expiries in calendar and never write it
+            RollCalendar.get(ticker, interval).add(contract)
+
+    def _build(self, name : str, memo : OutrightMemo) -> pd.DataFrame:
+        legs = legs_from_toml_config_common_spec(self.specs[name])
+        sb = SyntheticBuilder(legs, outright_loader = memo)
+        return sb.get()
+
+    def run(
+        self,
+        output_dir : str | Path | None = None,
+        max_workers : int = 8,
+        loader = get_outright,
+    ) -> pd.DataFrame:
+        # return per spec report, frames are in self.results and written
+        # as <name>.parquet into output_dir when given
+        memo = OutrightMemo(loader)
+
+        st = time.perf_counter()
+        chains = self.plan()
+        with ThreadPoolExecutor(max_workers = max_workers) as pool:
+            list(pool.map(lambda chain: self._preload(memo, chain), chains))
+
+        # one calendar write for whole preload
+        for ticker, interval in set((item[0], item[3]) for chain in chains for item in chain):
+            RollCalendar.get(ticker, interval).flush()
+        load_time = time.perf_counter() - st
+
+        if output_dir is not None:
+            output_dir = Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+        def build(name):
+            row = {"name" : name, "status" : "ok", "rows" : 0, "build_s" : 0.0, "path" : None, "error" : None}
+
+            st = time.perf_counter()
+            try:
+                df = self._build(name, memo)
+                self.results[name] = df
+                row["rows"] = len(df)
+
+                if output_dir is not None:
+                    path = output_dir / f"{name}.parquet"
+                    df.to_parquet(path)
+                    row["path"] = str(path)
+            except Exception as e:
+                row["status"] = "failed"
+                row["error"] = f"{type(e).__name__}: {e}"
+
+            row["build_s"] = time.perf_counter() - st
+            return row
+
+        with ThreadPoolExecutor(max_workers = max_workers) as pool:
+            report = pd.DataFrame(list(pool.map(build, self.specs.keys())))
+
+        report.set_index(["name"], inplace=True)
+        report.attrs["load_s"] = load_time
+        report.attrs["outright_loads"] = memo.loads
+        report.attrs["outright_hits"] = memo.hits
+        return report
+
+
+def synthetic_batch_from_toml(
+    source : str | Path,
+    output_dir : str | Path | None = None,
+    max_workers : int = 8,
+) -> pd.DataFrame:
+    batch = SyntheticBatch.from_toml(source)
+    return batch.run(output_dir = output_dir, max_workers = max_workers)
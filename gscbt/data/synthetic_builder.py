@@ -1,6 +1,7 @@
 import pandas as pd
 
 from .contract_spec import ContractSpec
+from .outright import get_outright
 from .synthetic_leg import SyntheticLeg
 from .utils import df2df_apply_operation_to_given_columns
 
@@ -32,8 +33,10 @@ class SyntheticBuilder:
     def __init__(
         self,
         legs : list,
+        outright_loader = get_outright,
     ):
         self.legs = legs
+        self.outright_loader = outright_loader
         self._df : pd.DataFrame = pd.DataFrame()
 
     def get(self) -> pd.DataFrame:
@@ -60,6 +63,7 @@ class SyntheticBuilder:
                 interval = leg["interval"],
                 ohlcv = "c",
                 extra_columns = [],
+                outright_loader = self.outright_loader,
             )
             curr_leg.create()
             leg_list.append(curr_leg.get())
@@ -1,10 +1,8 @@
 from datetime import datetime
-import json
 import tomllib
 import io
 
 import pandas as pd
-import requests
 
 from gscbt.ticker import get_instrument_contract_months
 from gscbt.expression_utils import (
@@ -26,25 +24,10 @@ from .contract_spec_dict import (
     VALUATIONTYPEDICT,
     ROLLMETHODDICT,
 )
-
-def get_contract_expiry(contract : str) -> pd.Timestamp:
-    response = requests.get(
-        "http://192.168.0.25:8080/api/v1/data/contract_dates_bulk",
-        params={
-            "symbols" : contract,
-        },
-    )
-
-    if response.status_code == 200:
-        res = json.loads(response.content)
-        date_str = res[0]["last_date"]
-        if date_str != "":
-            try:
-                return pd.to_datetime(date_str)
-            except:
-                pass
-
-    raise ValueError(f"contract {contract} can't find expiry for it")
+from .contract_expiry import (
+    get_contract_expiry,
+    get_contract_expiries,
+)
 
 
 def sbw_get_contractwise(
@@ -64,10 +47,12 @@ def sbw_get_contractwise(
     contracts, multipliers = extract_contracts_multipliers(expression)
     contracts = move_contracts_to_given_year_from_min(contracts, end_year)
 
+    contract_expiries = get_contract_expiries(contracts)
+
     min_contract = None
     min_expiry = None
     for contract in contracts:
-        contract_expiry = get_contract_expiry(contract)
+        contract_expiry = contract_expiries[contract]
         
         if min_contract == None or min_expiry > contract_expiry:
             min_contract = contract
@@ -148,10 +133,12 @@ def sbw_get_spreadwise(
     # for cropping first df
     contracts = move_contracts_to_prev_valid_month(contracts)
 
+    contract_expiries = get_contract_expiries(contracts)
+
     min_contract = None
     min_expiry = None
     for contract in contracts:
-        contract_expiry = get_contract_expiry(contract)
+        contract_expiry = contract_expiries[contract]
         
         if min_contract == None or min_expiry > contract_expiry:
             min_contract = contract
@@ -221,38 +208,43 @@ def sbw_get_spreadwise(
     return df1[df1["ideal_roll_date"] != approx_start_date]
 
 
-def sbw_synthetic_from_toml_stream_common_spec(
-        file : str | io.BytesIO,
-    ) -> pd.DataFrame:
-
-    config = None
+def load_toml_config(file : str | io.BytesIO) -> dict:
     if isinstance(file, str):
         with open(file, "rb") as f:
-            config = tomllib.load(f)
+            return tomllib.load(f)
     elif isinstance(file, io.BytesIO):
-        config = tomllib.load(file)
-    else:
-        raise ValueError(f"file should be file_path or io.BytesIO")
+        return tomllib.load(file)
 
-    contract_spec = ContractSpec(
-        data_type = DATATYPEDICT[config.get("data_type")],
-        valuation_type = VALUATIONTYPEDICT[config.get("valuation_type")],
-        roll_method = ROLLMETHODDICT[config.get("roll_method")]
-    )
+    raise ValueError(f"file should be file_path or io.BytesIO")
+
+def legs_from_toml_config_common_spec(config : dict) -> list[dict]:
     interval = config.get("interval")
 
     legs = []
     for leg in config.get("legs", []):
-        temp_contract_spec = contract_spec
-        temp_contract_spec.roll_params = RollParams(
-            offset = leg.get("offset"),
-            max_lookahead = leg.get("max_lookahead"),
+        # every leg get its own spec, roll params differ per leg
+        leg = dict(leg)
+        leg["contract_spec"] = ContractSpec(
+            data_type = DATATYPEDICT[config.get("data_type")],
+            valuation_type = VALUATIONTYPEDICT[config.get("valuation_type")],
+            roll_method = ROLLMETHODDICT[config.get("roll_method")],
+            roll_params = RollParams(
+                offset = leg.get("offset"),
+                max_lookahead = leg.get("max_lookahead"),
+            ),
         )
-
-        leg["contract_spec"] = temp_contract_spec
         leg["interval"] = interval
         legs.append(leg)
 
+    return legs
+
+def sbw_synthetic_from_toml_stream_common_spec(
+        file : str | io.BytesIO,
+    ) -> pd.DataFrame:
+
+    config = load_toml_config(file)
+    legs = legs_from_toml_config_common_spec(config)
+
     sb = SyntheticBuilder(legs)
     df1 = sb.get()
 
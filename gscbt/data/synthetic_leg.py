@@ -9,6 +9,7 @@ from gscbt.utils import Interval
 
 from .outright import get_outright
 from .roll_method import roll_offset
+from .roll_calendar import RollCalendar
 from .utils import (
     df_apply_operation_to_given_columns,
     drop_ohlcv,
@@ -32,7 +33,8 @@ class SyntheticLeg:
         start_rt_contract : str,
         ohlcv : str = "c",
         interval : str = "1d",
-        extra_columns : list[str] = []
+        extra_columns : list[str] = [],
+        outright_loader = get_outright,
     ):
         self.contract = contract
         self.contract_roll_months = contract_roll_months
@@ -44,6 +46,8 @@ class SyntheticLeg:
         self.ohlcv = ohlcv
         self.interval = interval
         self.extra_columns = extra_columns
+        # same signature as get_outright, batch builds pass a shared memo
+        self.outright_loader = outright_loader
         self._df : pd.DataFrame = pd.DataFrame()
 
     def get(self) -> pd.DataFrame:
@@ -63,8 +67,12 @@ class SyntheticLeg:
         contract = self.contract
         rt_contract = self.rt_contract
 
+        # roll trigger expiry come from roll calendar, rt outright is only
+        # loaded when it is not cached yet
+        rt_calendar = RollCalendar.get(rt_contract_ticker, self.interval)
+
         contract_df_list = []
-        rt_contract_df_list = []
+        rt_expiry_date_list = []
 
         contract_df = None
         rt_contract_df = None
@@ -79,8 +87,9 @@ class SyntheticLeg:
             if(year < src_year or (month<src_month and year == src_year)):
                 break
 
+            isRtLoaded = False
             try:
-                contract_df, ok = get_outright(
+                contract_df, ok = self.outright_loader(
                     contract_ticker,
                     contract,
                     self.ohlcv,
@@ -90,19 +99,27 @@ class SyntheticLeg:
                 if not ok:
                     break
 
-                rt_contract_df, ok = get_outright(
-                    rt_contract_ticker,
-                    rt_contract,
-                    "c",
-                    self.interval,
-                )
+                rt_expiry_date = rt_calendar.last_bar(rt_contract)
+                if rt_expiry_date is None:
+                    rt_contract_df, ok = self.outright_loader(
+                        rt_contract_ticker,
+                        rt_contract,
+                        "c",
+                        self.interval,
+                    )
 
-                if not ok:
-                    break
+                    if not ok:
+                        break
+
+                    rt_expiry_date = rt_contract_df.index[-1]
+                    isRtLoaded = True
             
             except:
                 break
 
+            if isRtLoaded:
+                rt_calendar.add(rt_contract)
+
             if "sym" in self.extra_columns:
                 contract_df["sym"] = contract
             
@@ -110,7 +127,7 @@ class SyntheticLeg:
                 contract_df["contract_expiry_date"] = contract_df.index[-1]
 
             contract_df_list.append(contract_df)
-            rt_contract_df_list.append(rt_contract_df)
+            rt_expiry_date_list.append(rt_expiry_date)
             
             contract = move_contract_to_given_prev_valid_month(
                 contract,
@@ -122,22 +139,20 @@ class SyntheticLeg:
                 self.rt_contract_roll_months,
             )
 
-        if len(contract_df_list) != len(rt_contract_df_list):
+        rt_calendar.flush()
+
+        if len(contract_df_list) != len(rt_expiry_date_list):
             raise Exception(
                 f"length of contract data and roll trigger data don't match \
                 try again by setting the data start point to a closer one. "
             )
 
         contract_df_list = contract_df_list[::-1]
-        rt_contract_df_list = rt_contract_df_list[::-1]
+        rt_expiry_date_list = rt_expiry_date_list[::-1]
 
 
         if self.contract_spec.roll_method == RollMethod.OFFSET:    
 
-            rt_expiry_date_list = []
-            for rt_contract_df in rt_contract_df_list:
-                rt_expiry_date_list.append(rt_contract_df.index[-1])
-
             interval_in_sec = Interval.str_to_second(self.interval)
             interval_offset = pd.Timedelta(seconds=interval_in_sec)
 
@@ -0,0 +1,167 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from gscbt.metrics import METRICS
+
+# zstd is only advertised when urllib3 is able to decode it
+try:
+    import zstandard
+    ACCEPT_ENCODING = "zstd, gzip, deflate"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class HttpClient:
+    # pooled keep-alive sessions, one per host, shared by all threads
+    # per host counters are reported to gscbt.metrics as
+    #   http.<host>.requests, .errors, .latency_s, .bytes, .wire_bytes
+
+    def __init__(
+        self,
+        connect_timeout : float = 5,
+        read_timeout : float = 30,
+        retries : int = 3,
+        backoff_factor : float = 0.3,
+        pool_maxsize : int = 16,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+
+        self._sessions : dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self) -> requests.Session:
+        retry = Retry(
+            total = self.retries,
+            connect = self.retries,
+            read = self.retries,
+            backoff_factor = self.backoff_factor,
+            status_forcelist = (502, 503, 504),
+            allowed_methods = ["GET"],
+            raise_on_status = False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections = 1,
+            pool_maxsize = self.pool_maxsize,
+            max_retries = retry,
+        )
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "Accept-Encoding" : ACCEPT_ENCODING,
+            "Connection" : "keep-alive",
+        })
+        return session
+
+    def session(self, url : str) -> tuple[str, requests.Session]:
+        host = urlsplit(url).netloc
+
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._create_session()
+                self._sessions[host] = session
+
+        return host, session
+
+    def request(
+        self,
+        method : str,
+        url : str,
+        params : dict = None,
+        data : bytes = None,
+        headers : dict = None,
+        timeout : float | None = None,
+        allow_redirects : bool = False,
+    ) -> requests.Response:
+        # response content is read before return so latency covers transfer
+        host, session = self.session(url)
+
+        if timeout is None:
+            timeout = self.read_timeout
+
+        st = time.perf_counter()
+        try:
+            res = session.request(
+                method,
+                url,
+                params = params,
+                data = data,
+                headers = headers,
+                timeout = (self.connect_timeout, timeout),
+                allow_redirects = allow_redirects,
+            )
+            content = res.content
+        except Exception:
+            METRICS.incr(f"http.{host}.errors")
+            raise
+        finally:
+            METRICS.incr(f"http.{host}.latency_s", time.perf_counter() - st)
+            METRICS.incr(f"http.{host}.requests")
+
+        METRICS.incr(f"http.{host}.bytes", len(content))
+        wire_bytes = res.headers.get("Content-Length")
+        if wire_bytes is not None and wire_bytes.isdigit():
+            METRICS.incr(f"http.{host}.wire_bytes", int(wire_bytes))
+
+        return res
+
+    def get(
+        self,
+        url : str,
+        params : dict = None,
+        headers : dict = None,
+        timeout : float | None = None,
+        allow_redirects : bool = False,
+    ) -> requests.Response:
+        return self.request("GET", url, params, None, headers, timeout, allow_redirects)
+
+    def post(
+        self,
+        url : str,
+        data : bytes = None,
+        headers : dict = None,
+        timeout : float | None = None,
+    ) -> requests.Response:
+        # not retried, see _create_session
+        return self.request("POST", url, None, data, headers, timeout)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+CLIENT = HttpClient()
+
+def configure_http_client(**kwargs) -> HttpClient:
+    # replace shared client, kwargs are HttpClient arguments
+    global CLIENT
+
+    old_client = CLIENT
+    CLIENT = HttpClient(**kwargs)
+    old_client.close()
+    return CLIENT
+
+def get_http_client() -> HttpClient:
+    return CLIENT
+
+def get_http_stats() -> dict[str, dict[str, float]]:
+    # host -> {requests, errors, latency_s, bytes, wire_bytes}
+    stats = {}
+    for name, value in METRICS.snapshot("http.").items():
+        host, counter = name.removeprefix("http.").rsplit(".", 1)
+        stats.setdefault(host, {})[counter] = value
+
+    return stats
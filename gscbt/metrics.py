@@ -0,0 +1,38 @@
+import threading
+from collections import defaultdict
+
+class Metrics:
+    # thread safe named counters for library instrumentation
+    # names are dotted, e.g. "live_cache.hits", "http.<host>.bytes"
+
+    def __init__(self):
+        self._counters : dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def incr(self, name : str, value : float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name : str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self, prefix : str = "") -> dict[str, float]:
+        with self._lock:
+            return {
+                name : value
+                for name, value in self._counters.items()
+                if name.startswith(prefix)
+            }
+
+    def reset(self, prefix : str = ""):
+        with self._lock:
+            for name in list(self._counters.keys()):
+                if name.startswith(prefix):
+                    del self._counters[name]
+
+
+METRICS = Metrics()
+
+def get_metrics(prefix : str = "") -> dict[str, float]:
+    return METRICS.snapshot(prefix)
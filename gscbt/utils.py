@@ -3,14 +3,18 @@ from pathlib import Path
 from io import BytesIO
 import os
 
-import requests
 import pandas as pd
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import load_dotenv, dotenv_values, set_key
 
+from gscbt.http_client import get_http_client
+
 class DEFAULT:
     START_YEAR = 1950
     START_DATE = "1950-01-01"
+    LIVE_BULK_CHUNK_SIZE = 50
 
 class PATH:
     LOCAL_STORAGE = Path.home() / ".gscbt"
@@ -18,6 +22,10 @@ class PATH:
     PACKAGE_DIR = Path(__file__).parent
     LOCAL_DATA = PACKAGE_DIR / "config"
     CACHE = LOCAL_STORAGE / "cache"
+    ROLL_CALENDAR = LOCAL_STORAGE / "roll_calendar"
+    CONTRACT_EXPIRY = LOCAL_STORAGE / "contract_expiry.parquet"
+    LIVE_HISTORY = LOCAL_STORAGE / "live_history"
+    LIVE_CONFIG = LOCAL_STORAGE / "live_config.json"
     IQFEED_EXCEL = LOCAL_STORAGE / "iqfeed_data.xlsx"
     IQFEED_EXCEL_LOCAL = LOCAL_DATA / "iqfeed_data.xlsx"
 
@@ -61,6 +69,10 @@ class API:
     GET_MARKET_DATA = f"http://{SERVER_IP_PORT}/api/v1/data/ohlcv"
     QUANT_APIS = f"http://{SERVER_IP_PORT}/api/v1/quant/data/ohlcv"
     DIRECT_IQFEED_APIS = f"http://{LOCAL_WIN_DIRECT_IQFEED_IP_PORT}/api/v1/data_parquet/iqfeed"
+    GET_CONTRACT_DATES_BULK = "http://192.168.0.25:8080/api/v1/data/contract_dates_bulk"
+    GET_LIVE_CONFIG = "http://192.168.0.155:24502"
+    GET_LATEST_TICK = "http://192.168.0.155:24503/latest"
+    LIVE_DAEMON = "http://127.0.0.1:24510"
 
 
 class Interval:
@@ -167,10 +179,9 @@ def download_file(
         timeout: int = 30, 
         allow_redirect: bool = False
     ) -> int:
-    response = requests.get(
+    response = get_http_client().get(
         url,
         params=params,
-        stream=True,
         timeout=timeout,
         allow_redirects=allow_redirect,
     )
@@ -201,21 +212,109 @@ def req_wrapper(
     timeout : int = 30,
 ) -> tuple[int, bytes]:
 
-    res = requests.get(
+    res = get_http_client().get(
         url,
         params = params,
-        stream = True,
         timeout = timeout,
         allow_redirects = False,
     )
 
     return res.status_code, res.content
 
+class ContentType:
+    ARROW_STREAM = "application/vnd.apache.arrow.stream"
+    PARQUET = "application/vnd.apache.parquet"
+    JSON = "application/json"
+
+    # servers without columnar support ignore it and answer json
+    ACCEPT_COLUMNAR = f"{ARROW_STREAM}, {PARQUET};q=0.9, {JSON};q=0.8"
+
+def req_wrapper_typed(
+    url : str,
+    params : dict = None,
+    timeout : int = 30,
+    accept : str = ContentType.ACCEPT_COLUMNAR,
+) -> tuple[int, bytes, str]:
+
+    res = get_http_client().get(
+        url,
+        params = params,
+        headers = {"Accept" : accept},
+        timeout = timeout,
+        allow_redirects = False,
+    )
+
+    content_type = res.headers.get("Content-Type", ContentType.JSON)
+    return res.status_code, res.content, content_type.split(";")[0].strip()
+
+def is_default_date_column(col : str) -> bool:
+    # same column names pd.read_json parse as dates by default
+    col = col.lower()
+    return (
+        col.endswith(("_at", "_time"))
+        or col.startswith("timestamp")
+        or col in ("modified", "date", "datetime")
+    )
+
+def parse_date_column(series : pd.Series) -> pd.Series:
+    # string or epoch number (unit guessed as pd.read_json does) to
+    # datetime, column that doesn't parse is kept as is
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    if pd.api.types.is_numeric_dtype(series):
+        # coarsest unit whose values fit in datetime64[ns]
+        max_abs = float(series.abs().max())
+        for unit, unit_ns in [("s", 10**9), ("ms", 10**6), ("us", 10**3), ("ns", 1)]:
+            if max_abs * unit_ns < 2**63:
+                return pd.to_datetime(series, unit=unit)
+        return series
+
+    try:
+        return pd.to_datetime(series)
+    except (TypeError, ValueError):
+        return series
+
 def bytes_to_df(
     content : bytes,
+    content_type : str | None = None,
+    columns : list[str] | None = None,
+    schema : dict | None = None,
 ) -> pd.DataFrame:
-    
-    return pd.read_json(BytesIO(content))
+    # columns : case-insensitive names to materialize, None for all
+    # schema : lowercase column name -> polars dtype cast after decode,
+    #          None keeps decoded dtype
+    # date columns (timestamp, *_at, ...) are parsed to datetime as
+    # pd.read_json did, unless schema casts them
+
+    if content_type == ContentType.ARROW_STREAM:
+        df = pl.from_arrow(pa.ipc.open_stream(content).read_all())
+    elif content_type == ContentType.PARQUET:
+        df = pl.from_arrow(pq.read_table(BytesIO(content)))
+    else:
+        try:
+            df = pl.read_json(BytesIO(content))
+        except Exception:
+            # payload polars can't handle (e.g. column oriented json)
+            df = pl.from_pandas(pd.read_json(BytesIO(content)))
+
+    if columns is not None:
+        wanted = set(col.lower() for col in columns)
+        df = df.select([col for col in df.columns if col.lower() in wanted])
+
+    if schema is not None:
+        df = df.with_columns([
+            pl.col(col).cast(schema[col.lower()], strict=False)
+            for col in df.columns
+            if schema.get(col.lower()) is not None
+        ])
+
+    df = df.to_pandas()
+    for col in df.columns:
+        if is_default_date_column(col) and (schema is None or col.lower() not in schema or schema[col.lower()] is None):
+            df[col] = parse_date_column(df[col])
+
+    return df
 
 if __name__ == "__main__":
     pass
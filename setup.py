@@ -20,6 +20,9 @@ setup(
         "pytz",
         "readerwriterlock"
     ],
+    extras_require={
+        "numba": ["numba"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
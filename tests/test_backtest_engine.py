@@ -0,0 +1,411 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.backtest import (
+    BacktestEngine,
+    LimitOrder,
+    MarketOrder,
+    OrderSide,
+    PositionAwareMarketOrder,
+)
+from gscbt.backtest.order_book import LimitOrderBook
+
+
+def make_timeseries(periods = 3000, freq = "37min", tz = "US/Eastern", seed = 7):
+    rng = np.random.default_rng(seed)
+    # spans both DST switches of 2024
+    index = pd.date_range("2024-03-01", periods=periods, freq=freq, tz=tz, name="timestamp")
+    close = 100 + rng.normal(0, 0.5, periods).cumsum()
+    return pd.DataFrame({"close" : close}, index=index)
+
+
+def make_orders(timeseries, count = 400, seed = 11):
+    rng = np.random.default_rng(seed)
+    index = timeseries.index
+
+    # some before first bar, some after last bar, many sharing a bar
+    ts = index[rng.integers(0, len(index), count)]
+    ts = ts + pd.to_timedelta(rng.integers(-20, 20, count), unit="min")
+    ts = ts.append(pd.DatetimeIndex([index[0] - pd.Timedelta(days=1), index[-1] + pd.Timedelta(days=1)]))
+
+    lot = rng.integers(-3, 4, len(ts))
+    lot[lot == 0] = 1
+    return ts, lot
+
+
+def create_engine(timeseries, use_kernel = False):
+    return BacktestEngine(
+        timeseries = timeseries,
+        common_settlement_time = "16:00:00",
+        trade_cost = 1.25,
+        slippage = 0.5,
+        use_kernel = use_kernel,
+    )
+
+
+@pytest.mark.parametrize("tz", ["US/Eastern", "UTC"])
+def test_calculate_vectorized_matches_loop(tz):
+    timeseries = make_timeseries(tz = tz)
+    order_ts, order_lot = make_orders(timeseries)
+
+    loop = create_engine(timeseries)
+    for ts, lot in zip(order_ts, order_lot):
+        side = OrderSide.buy if lot > 0 else OrderSide.sell
+        loop.place_order(MarketOrder(ts, side, abs(int(lot))))
+    loop.complete()
+
+    vectorized = create_engine(timeseries)
+    vectorized.calculate_vectorized(order_ts, order_lot)
+
+    pd.testing.assert_frame_equal(vectorized.get_pd_data(), loop.get_pd_data(), check_exact=True)
+    assert vectorized.next_settle == loop.next_settle
+    assert len(vectorized.pendding_market_orders) == len(loop.pendding_market_orders) == 1
+
+
+def test_calculate_vectorized_flat_periods():
+    # long flat gaps leave next_settle stale, first bar of next position settle
+    timeseries = make_timeseries(periods = 2000, freq = "1h")
+    index = timeseries.index
+    orders = [(index[5], 2), (index[30], -2), (index[400], -1), (index[401], -1), (index[900], 2), (index[1500], 1)]
+
+    loop = create_engine(timeseries)
+    vectorized = create_engine(timeseries)
+    for ts, lot in orders:
+        side = OrderSide.buy if lot > 0 else OrderSide.sell
+        loop.place_order(MarketOrder(ts, side, abs(lot)))
+        vectorized.place_order(MarketOrder(ts, side, abs(lot)))
+
+    loop.complete()
+    vectorized.calculate_vectorized()
+
+    pd.testing.assert_frame_equal(vectorized.get_pd_data(), loop.get_pd_data(), check_exact=True)
+
+
+def place_mixed_orders(engine, timeseries, seed = 3):
+    # market and limit orders placed while engine is advanced in steps
+    rng = np.random.default_rng(seed)
+    index = timeseries.index
+    close = timeseries["close"].to_numpy()
+
+    for step in range(1, len(index), 97):
+        for _ in range(rng.integers(0, 4)):
+            bar = min(len(index) - 1, step + int(rng.integers(-5, 60)))
+            side = OrderSide.buy if rng.random() < 0.5 else OrderSide.sell
+            lot = int(rng.integers(1, 4))
+            if rng.random() < 0.5:
+                engine.place_order(MarketOrder(index[bar], side, lot))
+            else:
+                price = close[bar] + rng.normal(0, 1)
+                engine.place_order(LimitOrder(index[bar], side, lot, price))
+        engine.get_pos(index[step])
+
+    engine.complete()
+
+
+@pytest.mark.parametrize("exec_mode", list(BacktestEngine.LimitOrderExecMode))
+def test_calculate_kernel_matches_loop(exec_mode):
+    timeseries = make_timeseries(periods = 1500)
+
+    loop = create_engine(timeseries)
+    loop.limit_order_exec_mode = exec_mode
+    place_mixed_orders(loop, timeseries)
+
+    # without numba kernel runs as plain python, same state machine
+    kernel = create_engine(timeseries)
+    kernel.use_kernel = True
+    kernel.KERNEL_MIN_BARS = 1 # steps of place_mixed_orders run kernel too
+    kernel.limit_order_exec_mode = exec_mode
+    place_mixed_orders(kernel, timeseries)
+
+    pd.testing.assert_frame_equal(kernel.get_pd_data(), loop.get_pd_data(), check_exact=True)
+    assert kernel.next_settle == loop.next_settle
+    assert len(kernel.pendding_limit_orders) == len(loop.pendding_limit_orders)
+
+
+def test_limit_order_book_fill():
+    index = pd.date_range("2024-01-02", periods = 3, freq = "h", tz = "UTC")
+    book = LimitOrderBook()
+    book.add(0, LimitOrder(index[0], OrderSide.buy, 1, 100.0))
+    book.add(1, LimitOrder(index[0], OrderSide.sell, 1, 101.0))
+    book.add(2, LimitOrder(index[0], OrderSide.buy, 2, 99.0))
+    book.add(3, LimitOrder(index[0], OrderSide.sell, 2, 103.0))
+    book.add(4, LimitOrder(index[0], OrderSide.buy, 3, 102.0))
+
+    # buy fills at price >= low, sell at price <= high, both inclusive
+    filled = book.fill(100.0, 101.0)
+    assert [seq for seq, _ in filled] == [0, 1, 4]
+    assert len(book) == 2
+
+    filled = book.fill(98.0, 104.0)
+    assert [seq for seq, _ in filled] == [2, 3]
+    assert len(book) == 0
+
+
+def test_pending_orders_placement_order():
+    timeseries = make_timeseries(periods = 50)
+    index = timeseries.index
+    engine = create_engine(timeseries)
+
+    orders = [
+        MarketOrder(index[30], OrderSide.buy, 1),
+        MarketOrder(index[10], OrderSide.sell, 2),
+        MarketOrder(index[20], OrderSide.buy, 3),
+        LimitOrder(index[40], OrderSide.buy, 1, -1.0),
+        LimitOrder(index[5], OrderSide.sell, 1, 1e9),
+    ]
+    for order in orders:
+        engine.place_order(order)
+    assert engine.pendding_market_orders == orders[:3]
+    assert engine.pendding_limit_orders == orders[3:]
+
+    engine.get_pos(index[15])
+    assert engine.pendding_market_orders == [orders[0], orders[2]]
+    # sell at 1e9 is active in book, buy at -1 still waiting its timestamp
+    assert engine.pendding_limit_orders == orders[3:]
+
+
+def test_calculate_kernel_keeps_future_orders_queued():
+    timeseries = make_timeseries(periods = 50)
+    index = timeseries.index
+    engine = create_engine(timeseries, use_kernel = True)
+    engine.KERNEL_MIN_BARS = 1
+
+    orders = [
+        MarketOrder(index[30], OrderSide.buy, 1),
+        MarketOrder(index[10], OrderSide.sell, 2),
+        LimitOrder(index[40], OrderSide.buy, 1, -1.0),
+        LimitOrder(index[5], OrderSide.sell, 1, 1e9),
+    ]
+    for order in orders:
+        engine.place_order(order)
+
+    engine.get_pos(index[15])
+    pending = engine.pending
+    # only due orders are run by kernel, unfilled limit is active in book
+    assert [order for _, order in pending.market_queue.items()] == [orders[0]]
+    assert [order for _, order in pending.limit_queue.items()] == [orders[2]]
+    assert [order for _, order in pending.limit_book.items()] == [orders[3]]
+    assert engine.get_pos(index[15]) == -2
+
+
+def test_limit_order_rejects_nan_price():
+    timeseries = make_timeseries(periods = 20)
+    engine = create_engine(timeseries)
+    with pytest.raises(ValueError):
+        engine.place_order(LimitOrder(timeseries.index[3], OrderSide.buy, 1, np.nan))
+    with pytest.raises(ValueError):
+        LimitOrderBook().add(0, LimitOrder(timeseries.index[3], OrderSide.buy, 1, np.nan))
+    assert len(engine.pendding_limit_orders) == 0
+
+
+def test_place_orders_matches_place_order():
+    timeseries = make_timeseries(periods = 800)
+    index = timeseries.index
+    close = timeseries["close"].to_numpy()
+    rng = np.random.default_rng(5)
+
+    bar = rng.integers(1, len(index), 300)
+    orders = pd.DataFrame({
+        "timestamp" : index[bar],
+        "side" : np.where(rng.random(300) < 0.5, "buy", "sell"),
+        "lot" : rng.integers(1, 4, 300),
+        "price" : np.where(rng.random(300) < 0.5, np.nan, close[bar] + rng.normal(0, 1, 300)),
+    })
+
+    single = create_engine(timeseries)
+    for row in orders.itertuples():
+        side = OrderSide.buy if row.side == "buy" else OrderSide.sell
+        if np.isnan(row.price):
+            single.place_order(MarketOrder(row.timestamp, side, row.lot))
+        else:
+            single.place_order(LimitOrder(row.timestamp, side, row.lot, row.price))
+
+    bulk = create_engine(timeseries)
+    bulk.place_orders(orders)
+
+    single.complete()
+    bulk.complete()
+    pd.testing.assert_frame_equal(bulk.get_pd_data(), single.get_pd_data(), check_exact=True)
+
+
+def test_place_orders_position_matches_wrapper():
+    timeseries = make_timeseries(periods = 800)
+    index = timeseries.index
+    rng = np.random.default_rng(9)
+
+    bar = np.sort(rng.choice(np.arange(1, len(index)), 200, replace=False))
+    position = rng.integers(-3, 4, 200)
+
+    wrapper = create_engine(timeseries)
+    for itr in range(len(bar)):
+        wrapper.place_order_position_aware_wrapper(
+            PositionAwareMarketOrder(index[bar[itr]], int(position[itr]))
+        )
+    wrapper.complete()
+
+    bulk = create_engine(timeseries)
+    bulk.place_orders(timestamp = index[bar], position = position)
+    bulk.complete()
+
+    pd.testing.assert_frame_equal(bulk.get_pd_data(), wrapper.get_pd_data(), check_exact=True)
+
+
+def test_place_orders_position_last_target_of_bar():
+    timeseries = make_timeseries(periods = 50)
+    index = timeseries.index
+    engine = create_engine(timeseries)
+    engine.place_order(MarketOrder(index[2], OrderSide.buy, 2))
+
+    # both targets are due on bar 10, only latest one counts
+    engine.place_orders(
+        timestamp = [index[10], index[9] + pd.Timedelta(minutes=1), index[20]],
+        position = [5, 1, 5],
+    )
+    assert [order.lot for order in engine.pendding_market_orders] == [2, 3]
+
+    engine.complete()
+    assert engine.get_pos(index[-1]) == 5
+
+
+def test_place_orders_position_with_future_pending():
+    timeseries = make_timeseries(periods = 80)
+    index = timeseries.index
+    engine = create_engine(timeseries)
+    engine.place_order(MarketOrder(index[50], OrderSide.buy, 2))
+    engine.place_order(MarketOrder(index[30], OrderSide.sell, 1))
+
+    # targets only see pending orders due by their bar
+    engine.place_orders(timestamp = index[[10, 40, 60]], position = [1, 1, 4])
+    engine.complete()
+
+    pos = engine.get_pd_data()["pos"]
+    assert pos.iloc[10] == 1
+    assert pos.iloc[40] == 1
+    assert pos.iloc[50] == 3
+    assert pos.iloc[60] == 4
+
+    with pytest.raises(ValueError):
+        engine.place_orders(timestamp = index[[70]], position = [1.5])
+    with pytest.raises(ValueError):
+        engine.place_orders(timestamp = index[[70]], position = [np.nan])
+
+
+def test_typed_state_and_views():
+    timeseries = make_timeseries(periods = 300)
+    timeseries["volume"] = np.arange(len(timeseries))
+    engine = create_engine(timeseries)
+    engine.place_order(MarketOrder(timeseries.index[10], OrderSide.buy, 2))
+    engine.complete()
+
+    df = engine.get_pd_data()
+    assert list(df.columns) == ["close", "volume"] + list(BacktestEngine.STATE_DTYPES.keys())
+    assert df["pos"].dtype == np.int64
+    assert df["m2m"].dtype == np.float64
+    assert df["volume"].dtype == timeseries["volume"].dtype
+    assert np.shares_memory(df["m2m"].to_numpy(), engine.Nstate["m2m"])
+
+    with pytest.raises(ValueError):
+        engine.Ninput["close"][0] = 0.0
+
+    table = engine.to_arrow()
+    assert table.column_names == ["timestamp"] + list(df.columns)
+    np.testing.assert_array_equal(table["pos"].to_numpy(), engine.Nstate["pos"])
+    assert table["timestamp"].type.tz == "US/Eastern"
+
+    # Ndata keep old 2d layout
+    assert engine.Ndata.shape == (len(timeseries), len(engine.colToIdx))
+    np.testing.assert_array_equal(engine.Ndata[:, engine.colToIdx["pos"]], engine.Nstate["pos"])
+
+
+def test_place_order_rejects_fractional_lot():
+    timeseries = make_timeseries(periods = 20)
+    engine = create_engine(timeseries)
+    with pytest.raises(ValueError):
+        engine.place_order(MarketOrder(timeseries.index[3], OrderSide.buy, 1.5))
+    with pytest.raises(ValueError):
+        engine.place_orders(timestamp = timeseries.index[3:5], lot = [1, 0.5])
+
+
+@pytest.mark.parametrize("tz", ["US/Eastern", None])
+def test_precomputed_settlement_boundaries(tz):
+    # same boundaries calculate used to build per bar with Timestamp.combine
+    timeseries = make_timeseries(periods = 400, freq = "53min")
+    if tz is None:
+        timeseries = timeseries.tz_localize(None)
+    engine = create_engine(timeseries)
+    settle_on = pd.Timestamp("1970-01-01 16:00:00").time()
+
+    for itr, timestamp in enumerate(engine.Ntimestamp):
+        same = pd.Timestamp.combine(timestamp.date(), settle_on).tz_localize(timestamp.tz)
+        nxt = pd.Timestamp.combine((timestamp + pd.Timedelta(days=1)).date(), settle_on).tz_localize(timestamp.tz)
+        assert engine.settle_same_ns[itr] == same.as_unit("ns").value
+        assert engine.settle_next_ns[itr] == nxt.as_unit("ns").value
+
+    assert engine.Nsession.dtype == np.int64
+    assert np.all(np.diff(engine.Nsession) >= 0)
+    assert engine.next_settle is None
+    engine.complete()
+    assert engine.next_settle.tz == engine.Nindex.tz
+
+
+def test_kernel_stepwise_uses_loop(monkeypatch):
+    # per bar get_m2m with many future orders, short steps must not
+    # encode every pending order for the kernel
+    from gscbt.backtest import backtest_engine
+    from .test_streaming import random_orders
+
+    timeseries = make_timeseries(periods = 3000)
+    orders = random_orders(timeseries, count = 1500)
+
+    calls = []
+    kernel_fn = backtest_engine.calculate_kernel
+    def counting_kernel(*args):
+        calls.append(args[1] - args[0])
+        return kernel_fn(*args)
+    monkeypatch.setattr(backtest_engine, "calculate_kernel", counting_kernel)
+
+    loop = create_engine(timeseries)
+    stepped = create_engine(timeseries, use_kernel = True)
+    for engine in [loop, stepped]:
+        for order in orders:
+            engine.place_order(order)
+        for timestamp in timeseries.index[:1000]:
+            engine.get_m2m(timestamp)
+        engine.complete()
+
+    pd.testing.assert_frame_equal(stepped.get_pd_data(), loop.get_pd_data(), check_exact=True)
+    if stepped.use_kernel:
+        # only complete() span is run by kernel
+        assert calls == [len(timeseries) - 1000]
+
+
+@pytest.mark.parametrize("exec_mode", list(BacktestEngine.LimitOrderExecMode))
+def test_calculate_kernel_many_resting_limit_orders(exec_mode):
+    timeseries = make_timeseries(periods = 3000)
+    index = timeseries.index
+    close = timeseries["close"].to_numpy()
+    rng = np.random.default_rng(21)
+
+    # most orders rest far from price, some fill, some share a price
+    count = 4000
+    bar = rng.integers(0, len(index), count)
+    isBuy = rng.random(count) < 0.5
+    distance = np.where(rng.random(count) < 0.8, rng.uniform(5, 50, count), rng.uniform(0, 2, count))
+    price = np.round(np.where(isBuy, close[bar] - distance, close[bar] + distance), 1)
+    orders = [
+        LimitOrder(index[b], OrderSide.buy if buy else OrderSide.sell, int(lot), float(p))
+        for b, buy, lot, p in zip(bar, isBuy, rng.integers(1, 4, count), price)
+    ]
+
+    engines = [create_engine(timeseries), create_engine(timeseries, use_kernel = True)]
+    for engine in engines:
+        engine.limit_order_exec_mode = exec_mode
+        for order in orders:
+            engine.place_order(order)
+        engine.get_pos(index[1500])
+        engine.complete()
+
+    loop, kernel = engines
+    pd.testing.assert_frame_equal(kernel.get_pd_data(), loop.get_pd_data(), check_exact=True)
+    assert kernel.pendding_limit_orders == loop.pendding_limit_orders
@@ -0,0 +1,90 @@
+import json
+
+import pandas as pd
+import pytest
+
+from gscbt.data import contract_expiry
+from gscbt.data.contract_expiry import ContractExpiryTable
+
+
+@pytest.fixture
+def requests_log(monkeypatch):
+    log = []
+    expiries = {
+        "CLF20" : "2019-12-19",
+        "CLG20" : "2020-01-21",
+        "CLZ99" : "2099-11-19",
+    }
+
+    def fake_req_wrapper(url, params = None, timeout = 30):
+        symbols = params["symbols"].split(",")
+        log.append(symbols)
+        res = [
+            {"symbol" : sym, "last_date" : expiries.get(sym, "")}
+            for sym in symbols
+        ]
+        return 200, json.dumps(res).encode()
+
+    monkeypatch.setattr(contract_expiry, "req_wrapper", fake_req_wrapper)
+    return log
+
+
+def test_ContractExpiryTable_bulk_and_cached(tmp_path, requests_log):
+    table = ContractExpiryTable(tmp_path / "expiry.parquet")
+
+    res = table.resolve(["CLF20", "CLG20", "CLZ99", "CLH20"])
+    assert requests_log == [["CLF20", "CLG20", "CLZ99", "CLH20"]]
+    assert res["CLF20"] == pd.Timestamp("2019-12-19")
+    assert "CLH20" not in res
+
+    # expired and fetched-today contracts are not re-fetched
+    table.resolve(["CLF20", "CLG20", "CLZ99"])
+    assert len(requests_log) == 1
+
+    # persisted table, expired contract never re-fetched
+    table = ContractExpiryTable(tmp_path / "expiry.parquet")
+    table.fetched_on["CLZ99"] = pd.Timestamp("2000-01-01")
+    table.resolve(["CLF20", "CLG20", "CLZ99"])
+    assert requests_log[-1] == ["CLZ99"]
+
+
+def test_get_contract_expiry_missing(tmp_path, monkeypatch, requests_log):
+    monkeypatch.setattr(
+        contract_expiry,
+        "_expiry_table",
+        ContractExpiryTable(tmp_path / "expiry.parquet"),
+    )
+
+    assert contract_expiry.get_contract_expiry("CLF20") == pd.Timestamp("2019-12-19")
+    with pytest.raises(ValueError):
+        contract_expiry.get_contract_expiries(["CLF20", "CLH20"])
+
+
+def test_fetch_contract_expiries_skips_rows_without_symbol(monkeypatch):
+    def fake_req_wrapper(url, params = None, timeout = 30):
+        # first row dropped by server, second row has no symbol echo
+        res = [
+            {"last_date" : "2020-01-21"},
+            {"symbol" : "CLZ99", "last_date" : "2099-11-19"},
+        ]
+        return 200, json.dumps(res).encode()
+
+    monkeypatch.setattr(contract_expiry, "req_wrapper", fake_req_wrapper)
+
+    res = contract_expiry.fetch_contract_expiries(["CLF20", "CLG20", "CLZ99"])
+    assert res == {"CLZ99" : pd.Timestamp("2099-11-19")}
+
+
+def test_fetch_contract_expiries_without_symbol_echo(monkeypatch):
+    def fake_req_wrapper(url, params = None, timeout = 30):
+        # one row per requested symbol, in request order
+        res = [{"last_date" : "2019-12-19"}, {"last_date" : "2020-01-21"}]
+        return 200, json.dumps(res[:len(params["symbols"].split(","))]).encode()
+
+    monkeypatch.setattr(contract_expiry, "req_wrapper", fake_req_wrapper)
+
+    assert contract_expiry.fetch_contract_expiries(["CLF20"]) == {"CLF20" : pd.Timestamp("2019-12-19")}
+    assert contract_expiry.fetch_contract_expiries(["CLF20", "CLG20"]) == {
+        "CLF20" : pd.Timestamp("2019-12-19"),
+        "CLG20" : pd.Timestamp("2020-01-21"),
+    }
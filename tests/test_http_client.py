@@ -0,0 +1,51 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from gscbt.http_client import HttpClient, get_http_stats
+
+
+class GzipHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'[{"price": 1.5}]'
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GzipHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_HttpClient_pooled_gzip(server_url):
+    client = HttpClient(retries = 0)
+
+    host, session = client.session(server_url + "/a")
+    assert client.session(server_url + "/b")[1] is session
+
+    for _ in range(3):
+        res = client.get(server_url + "/latest", params={"symbol" : "CLF25"})
+        assert res.status_code == 200
+        assert res.content == b'[{"price": 1.5}]'
+
+    stats = get_http_stats()[host]
+    assert stats["requests"] >= 3
+    assert stats["bytes"] >= 3 * len(b'[{"price": 1.5}]')
+    assert stats["wire_bytes"] > 0
+    client.close()
@@ -0,0 +1,61 @@
+import json
+
+import pandas as pd
+
+from gscbt.data import live_config
+from gscbt.data.live_config import LiveConfigStore
+
+CONFIG = {
+    "productContract" : [
+        {
+            "symbol" : "CL",
+            "contractMonths" : "FGHJKMNQUVXZ",
+            "currencyMultiplier" : 1000,
+            "contracts" : [
+                {"contractCode" : "F25", "expiry" : "2024-12-19"},
+                {"contractCode" : "G25", "expiry" : "2025-01-21"},
+            ],
+        },
+    ],
+}
+
+
+class FakeResponse:
+    def __init__(self, status_code, content = b"", headers = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params = None, headers = None, timeout = None):
+        self.calls.append(headers)
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(200, json.dumps(CONFIG).encode(), {"ETag" : '"v1"'})
+
+
+def test_LiveConfigStore_ttl_etag_and_disk(tmp_path, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(live_config, "get_http_client", lambda: client)
+    path = tmp_path / "live_config.json"
+
+    store = LiveConfigStore(url = "http://config", ttl = 300, path = path)
+    store.get()
+    store.get()
+
+    assert len(client.calls) == 1
+    assert store.contract_months["CL"] == "FGHJKMNQUVXZ"
+    assert store.currency_multiplier["CL"] == 1000
+    assert store.expiry["CLF25"] == pd.Timestamp("2024-12-19")
+    assert store.legacy["CLG25"]["expiry"] == "2025-01-21"
+
+    # cold start reuses disk copy and only revalidates
+    store = LiveConfigStore(url = "http://config", ttl = 0, path = path)
+    store.get()
+
+    assert client.calls[-1] == {"If-None-Match" : '"v1"'}
+    assert "CLG25" in store.contracts
@@ -0,0 +1,53 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from gscbt.metrics import METRICS
+from gscbt.data import live_daemon
+from gscbt.data.live_daemon import LiveDaemon, LiveDaemonClient
+
+
+def fake_live_synthetic(expression, start, offset, **kwargs):
+    index = pd.date_range("2024-01-01", periods=3, freq="1D", tz="UTC", name="timestamp")
+    roll_date = pd.Timestamp("2024-01-10", tz="UTC")
+    df = pd.DataFrame({"close" : [1.0, 2.0, offset], "roll_date" : roll_date}, index=index)
+    df["days_to_roll"] = df.roll_date - df.index
+    return df
+
+
+def test_LiveDaemon_builds_once(monkeypatch):
+    builds = []
+    def fake(**kwargs):
+        builds.append(kwargs)
+        return fake_live_synthetic(**kwargs)
+
+    monkeypatch.setattr(live_daemon, "get_live_synthetic", fake)
+    METRICS.reset("live_cache.")
+    METRICS.reset("live_daemon_cache.")
+    daemon = LiveDaemon(port = 0).start()
+    try:
+        client = LiveDaemonClient(daemon.url)
+        kwargs = dict(expression = "CLF25-CLG25", start = "2024-01-01", offset = 5, max_lookahead = 5)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.get_live_synthetic(**kwargs)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(builds) == 1 and len(results) == 4
+        # built synthetics are not counted as live data cache traffic
+        assert METRICS.snapshot("live_cache.") == {}
+        assert daemon.results.stats()["misses"] == 1
+        for df in results:
+            pd.testing.assert_frame_equal(df, fake_live_synthetic(**kwargs), check_freq=False)
+
+        with pytest.raises(ValueError, match="TypeError"):
+            client.get_live_synthetic(expression = "CLF25")
+    finally:
+        daemon.stop()
@@ -0,0 +1,289 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytz
+
+from gscbt.metrics import METRICS
+from gscbt.data.live_data import (
+    LiveDataCache,
+    project_ohlcv,
+)
+
+
+def make_df():
+    index = pd.date_range("2024-01-01", periods=3, freq="1D", name="timestamp")
+    return pd.DataFrame({
+        "open" : [1.0, 2.0, 3.0],
+        "high" : [1.0, 2.0, 3.0],
+        "low" : [1.0, 2.0, 3.0],
+        "close" : [1.0, 2.0, 3.0],
+        "volume" : [10, 20, 30],
+    }, index=index)
+
+
+def test_LiveDataCache_single_flight():
+    METRICS.reset("live_cache.")
+    cache = LiveDataCache()
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        time.sleep(0.2)
+        return True, make_df()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("CLF25", fetch)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["CLF25"]
+    assert all(ok for ok, _ in results)
+    assert cache.stats()["coalesced"] == 7
+
+    ok, _ = cache.get_or_fetch("CLF25", fetch)
+    assert ok and calls == ["CLF25"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_LiveDataCache_per_symbol_expiry_and_lru():
+    cache = LiveDataCache(max_size = 2)
+    past = datetime.now(pytz.timezone("Asia/Kolkata")) - timedelta(minutes=1)
+
+    cache.put("CLF25", make_df(), expiry=past)
+    cache.put("CLG25", make_df())
+    assert "CLF25" not in cache
+    assert "CLG25" in cache
+
+    cache.put("CLH25", make_df())
+    cache.get("CLG25")
+    cache.put("CLJ25", make_df())
+    assert "CLG25" in cache
+    assert "CLH25" not in cache
+    assert len(cache) == 2
+
+
+def test_LiveDataCache_failed_fetch_not_cached():
+    cache = LiveDataCache()
+    ok, df = cache.get_or_fetch("CLF25", lambda symbol: (False, pd.DataFrame()))
+    assert not ok and df.empty
+    assert "CLF25" not in cache
+
+
+def test_LiveDataCache_failed_fetch_ttl(monkeypatch):
+    from types import SimpleNamespace
+    from gscbt.data import live_data
+
+    METRICS.reset("live_cache.")
+    cache = LiveDataCache(miss_ttl = 60)
+    calls = []
+    def fetch(symbol):
+        calls.append(symbol)
+        return False, pd.DataFrame()
+    def fetch_many(symbols):
+        calls.extend(symbols)
+        return {}
+
+    assert not cache.get_or_fetch("CLF25", fetch)[0]
+    assert not cache.get_or_fetch("CLF25", fetch)[0]
+    result = cache.get_or_fetch_many(["CLF25", "CLG25"], fetch_many)
+    assert not result["CLF25"][0] and not result["CLG25"][0]
+    assert not cache.get_or_fetch_many(["CLG25"], fetch_many)["CLG25"][0]
+    # each failed symbol requested once within ttl
+    assert calls == ["CLF25", "CLG25"]
+    assert cache.stats()["failed_hits"] == 3
+
+    now = time.monotonic()
+    monkeypatch.setattr(live_data, "time", SimpleNamespace(monotonic = lambda: now + 61))
+    cache.get_or_fetch("CLF25", fetch)
+    assert calls == ["CLF25", "CLG25", "CLF25"]
+
+    cache.invalidate()
+    assert cache.stats()["failed"] == 0
+
+
+def test_project_ohlcv():
+    df = make_df()
+    assert list(project_ohlcv(df, "c").columns) == ["close"]
+    assert list(project_ohlcv(df, "ohlcv").columns) == ["open", "high", "low", "close", "volume"]
+    assert list(project_ohlcv(df, "cv").columns) == ["close", "volume"]
+
+
+def test_fetch_live_data_incremental(tmp_path, monkeypatch):
+    from gscbt.data import live_data
+    from gscbt.data.live_history import LiveHistoryStore
+
+    monkeypatch.setattr(live_data, "history", LiveHistoryStore(tmp_path))
+    requests_log = []
+    responses = [
+        b'[{"Sym":"CLF25","TimeStamp":"2024-01-01","Open":1,"High":1,"Low":1,"Close":1,"Volume":1,"Open_Int":0},'
+        b'{"Sym":"CLF25","TimeStamp":"2024-01-02","Open":2,"High":2,"Low":2,"Close":2,"Volume":1,"Open_Int":0}]',
+        b'[{"Sym":"CLF25","TimeStamp":"2024-01-02","Open":2,"High":2,"Low":2,"Close":2.5,"Volume":1,"Open_Int":0},'
+        b'{"Sym":"CLF25","TimeStamp":"2024-01-03","Open":3,"High":3,"Low":3,"Close":3,"Volume":1,"Open_Int":0}]',
+    ]
+
+    def fake_req_wrapper(url, params = None, timeout = 30, accept = None):
+        requests_log.append(params["from"])
+        return 200, responses[len(requests_log) - 1], "application/json"
+
+    monkeypatch.setattr(live_data, "req_wrapper_typed", fake_req_wrapper)
+
+    ok, df = live_data.fetch_live_data("CLF25")
+    assert ok and list(df["close"]) == [1, 2]
+
+    ok, df = live_data.fetch_live_data("CLF25")
+    assert ok and list(df["close"]) == [1, 2.5, 3]
+    assert requests_log == ["1950-01-01", "2023-12-28"]
+
+
+def test_fetch_live_data_bulk(tmp_path, monkeypatch):
+    from gscbt.data import live_data
+    from gscbt.data.live_history import LiveHistoryStore
+
+    monkeypatch.setattr(live_data, "history", LiveHistoryStore(tmp_path))
+    rows = {
+        "CLF25" : '{"Sym":"CLF25","TimeStamp":"2024-01-01","Open":1,"High":1,"Low":1,"Close":1,"Volume":1,"Open_Int":0}',
+        "CLG25" : '{"Sym":"CLG25","TimeStamp":"2024-01-01","Open":2,"High":2,"Low":2,"Close":2,"Volume":1,"Open_Int":0}',
+    }
+    requests_log = []
+
+    def fake_req_wrapper(url, params = None, timeout = 30, accept = None):
+        symbols = params["symbols"].split(",")
+        requests_log.append(symbols)
+        content = "[" + ",".join(rows[sym] for sym in symbols if sym in rows) + "]"
+        return 200, content.encode(), "application/json"
+
+    monkeypatch.setattr(live_data, "req_wrapper_typed", fake_req_wrapper)
+
+    res = live_data.fetch_live_data_bulk(["CLF25", "CLG25", "CLH25"])
+    assert requests_log == [["CLF25", "CLG25", "CLH25"]]
+    assert list(res["CLF25"][1]["close"]) == [1]
+    assert list(res["CLG25"][1]["close"]) == [2]
+    assert "sym" not in res["CLG25"][1].columns
+    assert not res["CLH25"][0]
+
+    requests_log.clear()
+    live_data.fetch_live_data_bulk(["CLF25", "CLG25", "CLH25"], chunk_size = 1)
+    # stored and new symbols are requested from different start dates
+    assert requests_log == [["CLF25"], ["CLG25"], ["CLH25"]]
+
+
+def test_fetch_live_data_appends_parts(tmp_path, monkeypatch):
+    from gscbt.data import live_data, live_history
+    from gscbt.data.live_history import LiveHistoryStore
+
+    store = LiveHistoryStore(tmp_path)
+    monkeypatch.setattr(live_data, "history", store)
+    responses = [
+        b'[{"Sym":"CLF25","TimeStamp":"2024-01-01","Close":1},{"Sym":"CLF25","TimeStamp":"2024-01-02","Close":2}]',
+        b'[{"Sym":"CLF25","TimeStamp":"2024-01-01","Close":1},{"Sym":"CLF25","TimeStamp":"2024-01-02","Close":2.5},'
+        b'{"Sym":"CLF25","TimeStamp":"2024-01-03","Close":3}]',
+        b'[{"Sym":"CLF25","TimeStamp":"2024-01-03","Close":3}]',
+        b'[{"Sym":"CLF25","TimeStamp":"2024-01-04","Close":4}]',
+    ]
+    calls = []
+
+    def fake_req_wrapper(url, params = None, timeout = 30, accept = None):
+        calls.append(params)
+        return 200, responses[len(calls) - 1], "application/json"
+
+    monkeypatch.setattr(live_data, "req_wrapper_typed", fake_req_wrapper)
+
+    live_data.fetch_live_data("CLF25")
+    first = store.parts("CLF25")[0].read_bytes()
+    live_data.fetch_live_data("CLF25")
+
+    # only corrected and new bars are appended, first part untouched
+    parts = store.parts("CLF25")
+    assert len(parts) == 2 and parts[0].read_bytes() == first
+    assert list(pd.read_parquet(parts[1])["close"]) == [2.5, 3]
+
+    # nothing new, nothing written
+    live_data.fetch_live_data("CLF25")
+    assert len(store.parts("CLF25")) == 2
+
+    monkeypatch.setattr(live_history, "MAX_PARTS", 2)
+    ok, df = live_data.fetch_live_data("CLF25")
+    assert len(store.parts("CLF25")) == 1
+    assert list(df["close"]) == [1, 2.5, 3, 4]
+    pd.testing.assert_frame_equal(store.load("CLF25"), df)
+
+
+def test_fetch_live_data_failure_is_stale(tmp_path, monkeypatch):
+    from gscbt.data import live_data
+    from gscbt.data.live_history import LiveHistoryStore
+
+    store = LiveHistoryStore(tmp_path)
+    store.save("CLF25", make_df())
+    monkeypatch.setattr(live_data, "history", store)
+    monkeypatch.setattr(live_data, "req_wrapper_typed", lambda *args, **kwargs: (503, b"", None))
+
+    ok, df = live_data.fetch_live_data("CLF25")
+    assert ok and live_data.is_stale(df)
+    assert live_data.is_stale(project_ohlcv(df, "c"))
+    assert not live_data.is_stale(store.load("CLF25"))
+
+    cache = LiveDataCache()
+    ok, df = cache.get_or_fetch("CLF25", live_data.fetch_live_data)
+    assert ok and live_data.is_stale(df)
+    assert "CLF25" not in cache
+
+
+def test_fetch_live_data_bulk_rereads_and_flags_stale(tmp_path, monkeypatch):
+    from gscbt.data import live_data
+    from gscbt.data.live_history import LiveHistoryStore
+
+    store = LiveHistoryStore(tmp_path)
+    store.save("CLF25", make_df())
+    store.save("CLG25", make_df())
+    monkeypatch.setattr(live_data, "history", store)
+
+    def fake_req_wrapper(url, params = None, timeout = 30, accept = None):
+        if params["symbols"] == "CLG25":
+            return 503, b"", None
+        # concurrent single fetch wrote history while request was in flight
+        store.merge("CLF25", store.load("CLF25"), pd.DataFrame({"close" : [9.0]}, index=pd.DatetimeIndex(["2024-01-09"], name="timestamp")))
+        return 200, b'[{"Sym":"CLF25","TimeStamp":"2024-01-04","Close":4}]', "application/json"
+
+    monkeypatch.setattr(live_data, "req_wrapper_typed", fake_req_wrapper)
+
+    res = live_data.fetch_live_data_bulk(["CLF25", "CLG25"], chunk_size = 1)
+
+    ok, df = res["CLF25"]
+    assert ok and not live_data.is_stale(df)
+    assert list(df["close"].iloc[-2:]) == [4, 9]
+    pd.testing.assert_frame_equal(store.load("CLF25"), df)
+
+    ok, df = res["CLG25"]
+    assert ok and live_data.is_stale(df)
+
+
+def test_decode_market_df_timestamp_formats():
+    from gscbt.data.live_data import decode_market_df
+
+    epoch = b'[{"Sym":"CLF25","TimeStamp":1704067200000,"Close":1},{"Sym":"CLF25","TimeStamp":1704153600000,"Close":2}]'
+    text = b'[{"Sym":"CLF25","TimeStamp":"2024-01-01","Close":1},{"Sym":"CLF25","TimeStamp":"2024-01-02","Close":2}]'
+
+    expected = pd.DatetimeIndex(["2024-01-01", "2024-01-02"])
+    for content in [epoch, text]:
+        df = decode_market_df(content, "application/json")
+        assert list(df.index) == list(expected)
+        assert list(df["close"]) == [1, 2]
+
+
+def test_LiveDataCache_metrics_prefix():
+    METRICS.reset("live_cache.")
+    METRICS.reset("other_cache.")
+    cache = LiveDataCache(metrics_prefix = "other_cache")
+
+    cache.get_or_fetch("CLF25", lambda symbol: (True, make_df()))
+    cache.get("CLF25")
+
+    assert METRICS.snapshot("live_cache.") == {}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
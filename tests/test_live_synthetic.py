@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.utils import MonthMap
+from gscbt.expression_utils import (
+    get_full_year,
+    create_expression_from_contracts_multipliers,
+)
+from gscbt.data import live_synthetic, live_stack
+from gscbt.data.live_config import LiveConfigStore
+from gscbt.data.live_data import LiveDataCache
+from gscbt.data.live_stack import get_live_seasonal_stacks
+from gscbt.data.live_synthetic import get_live_synthetic, get_live_synthetic_stack
+from gscbt.data.live_synthetic_verbose import get_live_synthetic_verbose
+
+
+def fake_live_data(symbol):
+    year = get_full_year(int(symbol[-2:]))
+    month = MonthMap.month(symbol[-3])
+    expiry = pd.Timestamp(year=year, month=month, day=20) - pd.DateOffset(months=1)
+    index = pd.date_range(expiry - pd.Timedelta(days=400), expiry, freq="1D", name="timestamp")
+
+    rng = np.random.default_rng(year * 100 + month)
+    close = 50.0 + month + rng.normal(0, 1, len(index)).cumsum()
+    close[rng.integers(0, len(index), 10)] = np.nan
+    return True, pd.DataFrame({"close" : close}, index=index)
+
+
+@pytest.fixture
+def fake_live(monkeypatch):
+    config = LiveConfigStore(url = "http://config")
+    config.currency_multiplier = {"CL" : 1000}
+    monkeypatch.setattr(live_synthetic, "get_live_config", lambda: config)
+    monkeypatch.setattr(live_stack, "get_live_config", lambda: config)
+    monkeypatch.setattr(live_stack, "stack_cache", LiveDataCache(metrics_prefix="live_stack_cache"))
+
+    calls = []
+    def fake_bulk(symbols, ohlcv):
+        calls.append(list(symbols))
+        return {symbol : fake_live_data(symbol) for symbol in symbols}
+
+    monkeypatch.setattr(live_synthetic, "get_live_data_bulk", fake_bulk)
+    return calls
+
+
+@pytest.mark.parametrize("mode", ["normal", "force"])
+def test_get_live_synthetic_verbose_single_pass(fake_live, mode):
+    expression = "CLF26-2*CLG26"
+    kwargs = dict(start = "2023-01-01", offset = 5, max_lookahead = 5, mode = mode)
+
+    res_df = get_live_synthetic_verbose(expression, **kwargs)
+    assert len(fake_live) == 1
+    assert list(res_df.columns) == ["CLF26", "CLG26", "close", "roll_date", "days_to_roll"]
+
+    # same columns as one one-hot build per contract
+    contracts = ["CLF26", "CLG26"]
+    for itr, contract in enumerate(contracts):
+        one_hot = create_expression_from_contracts_multipliers(
+            contracts, [int(itr == i) for i in range(len(contracts))],
+        )
+        df = get_live_synthetic(one_hot, **kwargs)
+        pd.testing.assert_series_equal(res_df[contract], df["close"], check_names=False)
+
+    df = get_live_synthetic(expression, **kwargs)
+    pd.testing.assert_frame_equal(res_df[["close", "roll_date", "days_to_roll"]], df)
+
+
+def test_get_live_seasonal_stacks(fake_live):
+    expressions = ["CLF26-CLG26", "CLF26"]
+    stacks = get_live_seasonal_stacks(expressions, 2020, align = "calendar_day")
+    assert len(fake_live) == 1
+
+    stack = stacks["CLF26-CLG26"]
+    frames = get_live_synthetic_stack("CLF26-CLG26", 2020)
+    assert list(stack.years) == [int(df.columns[0]) for df in frames]
+
+    for year, df in zip(stack.years, frames):
+        series = df[str(year)].dropna()
+        days = (series.index - pd.Timestamp(year=year, month=1, day=1)).days
+        row = stack.row(year)
+        np.testing.assert_array_equal(row[np.searchsorted(stack.days, days)], series.to_numpy())
+        assert np.isnan(row).sum() == len(stack.days) - len(series)
+
+    with pytest.raises(KeyError):
+        stack.row(stack.years[0] - 1)
+    with pytest.raises(KeyError):
+        stack.row(stack.years[-1] + 1)
+
+    # cached until market expiry
+    get_live_seasonal_stacks(expressions, 2020, align = "calendar_day")
+    assert len(fake_live) == 2
+
+    stack = get_live_seasonal_stacks(["CLF26"], 2020, align = "days_to_expiry")["CLF26"]
+    assert stack.days[-1] == 0
+    assert stack.window(-10, 0).shape == (len(stack.years), 11)
+
+
+def test_prefetch_live_chain_stops_at_missing_batch(fake_live, monkeypatch):
+    def fake_bulk(symbols, ohlcv):
+        fake_live.append(list(symbols))
+        # contracts before 2018 don't exist on market data api
+        return {
+            symbol : fake_live_data(symbol) if get_full_year(int(symbol[-2:])) >= 2018 else (False, pd.DataFrame())
+            for symbol in symbols
+        }
+    monkeypatch.setattr(live_synthetic, "get_live_data_bulk", fake_bulk)
+
+    # open ended start plans back to 1949
+    chain = live_synthetic.plan_contractwise_chain(["CLF26", "CLG26"], 1949, 2026)
+    prefetched = live_synthetic.prefetch_live_chain(chain, "c", live_synthetic.get_live_config())
+
+    assert len(fake_live) == 2
+    assert len(prefetched) == 2 * 2 * live_synthetic.PREFETCH_STEPS
+    assert not prefetched["CLF17"][0] and prefetched["CLF18"][0]
@@ -0,0 +1,122 @@
+import pandas as pd
+import pytest
+
+from gscbt.data import live_data, live_tick
+from gscbt.data.live_data import LiveDataCache, get_tick_n_eod_combine_data
+from gscbt.data.live_tick import TickStore, TickSubscriber, TickStandInServer
+
+
+@pytest.fixture
+def server():
+    server = TickStandInServer().start()
+    server.set_tick("CLF25", "2024-01-03T14:30:00Z", 72.5)
+    server.set_tick("CLG25", "2024-01-03T14:30:01Z", 73.0)
+    yield server
+    server.stop()
+
+
+def test_TickSubscriber_poll_once(server):
+    store = TickStore(capacity = 1)
+    subscriber = TickSubscriber(["CLF25", "CLG25", "CLH25"], store = store, url = server.url)
+
+    assert subscriber.poll_once() == 2
+    assert store.get("CLF25") == (pd.Timestamp("2024-01-03T14:30:00Z"), 72.5)
+    assert "CLH25" not in store
+    assert sorted(store.snapshot().index) == ["CLF25", "CLG25"]
+
+    # older tick never overwrite newer one
+    store.set("CLF25", pd.Timestamp("2024-01-02T00:00:00Z").value, 1.0)
+    assert store.get("CLF25")[1] == 72.5
+
+
+def test_get_tick_n_eod_combine_data_reads_store(server, monkeypatch):
+    index = pd.date_range("2024-01-01", periods=2, freq="1D", tz="UTC", name="timestamp")
+    fetches = []
+
+    def fake_fetch(symbol):
+        fetches.append(symbol)
+        return True, pd.DataFrame({"close" : [70.0, 71.0]}, index=index)
+
+    def no_request(*args, **kwargs):
+        raise AssertionError("request on build path")
+
+    monkeypatch.setattr(live_data, "cache", LiveDataCache())
+    monkeypatch.setattr(live_data, "fetch_live_data", fake_fetch)
+    monkeypatch.setattr(live_data, "req_wrapper", no_request)
+    monkeypatch.setattr(live_tick, "tick_store", TickStore())
+    monkeypatch.setattr(live_data, "tick_store", live_tick.tick_store)
+
+    subscriber = live_tick.start_tick_subscriber(["CLF25"], interval = 0.05, url = server.url)
+    try:
+        subscriber.poll_once()
+        for _ in range(3):
+            ok, df = get_tick_n_eod_combine_data("CLF25")
+    finally:
+        live_tick.stop_tick_subscriber()
+
+    assert ok and fetches == ["CLF25"]
+    assert list(df["close"]) == [70.0, 71.0, 72.5]
+    assert df.index[-1] == pd.Timestamp("2024-01-03", tz="UTC")
+
+
+def test_TickSubscriber_stop_releases_pool_threads(server):
+    import threading
+
+    def poll_threads():
+        return [thread for thread in threading.enumerate() if thread.name.startswith("gscbt-tick-poll")]
+
+    before = len(poll_threads())
+    for _ in range(3):
+        subscriber = live_tick.start_tick_subscriber(["CLF25", "CLG25"], interval = 0.01, url = server.url)
+        subscriber.poll_once()
+    live_tick.stop_tick_subscriber()
+
+    assert len(poll_threads()) == before
+
+
+def test_TickSubscriber_bulk_poll(server):
+    store = TickStore()
+    subscriber = TickSubscriber(["CLF25", "CLG25", "CLH25"], store = store, url = server.url, bulk_url = server.bulk_url)
+
+    requests = server.requests
+    assert subscriber.poll_once() == 2
+    assert server.requests == requests + 1
+    assert store.get("CLG25") == (pd.Timestamp("2024-01-03T14:30:01Z"), 73.0)
+
+    # service without bulk endpoint, polled symbol by symbol
+    subscriber.bulk_url = server.url + "_missing"
+    assert subscriber.poll_once() == 2
+    subscriber.stop()
+
+
+def test_get_tick_n_eod_combine_data_stale_tick(server, monkeypatch):
+    import time
+
+    index = pd.date_range("2024-01-01", periods=2, freq="1D", tz="UTC", name="timestamp")
+    fetches = []
+
+    def fake_fetch(symbol):
+        fetches.append(symbol)
+        return True, pd.DataFrame({"close" : [70.0, 71.0]}, index=index)
+
+    def fake_tick(url, params = None, timeout = 30):
+        return 200, b'{"timestamp" : "2024-01-03T15:00:00Z", "price" : 80.0}'
+
+    monkeypatch.setattr(live_data, "cache", LiveDataCache())
+    monkeypatch.setattr(live_data, "fetch_live_data", fake_fetch)
+    monkeypatch.setattr(live_data, "req_wrapper", fake_tick)
+    monkeypatch.setattr(live_tick, "tick_store", TickStore())
+    monkeypatch.setattr(live_data, "tick_store", live_tick.tick_store)
+
+    # CLF25 tick stored once, subscriber never refreshes it
+    live_tick.tick_store.set("CLF25", pd.Timestamp("2024-01-03T14:30:00Z").value, 72.5)
+    subscriber = live_tick.start_tick_subscriber(["CLG25"], interval = 0.02, url = server.url)
+    try:
+        time.sleep(subscriber.max_tick_age * 2)
+        ok, df = get_tick_n_eod_combine_data("CLF25")
+    finally:
+        live_tick.stop_tick_subscriber()
+
+    # stale tick is not served, direct fetch instead
+    assert ok and fetches == ["CLF25"]
+    assert list(df["close"]) == [70.0, 71.0, 80.0]
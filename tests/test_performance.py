@@ -0,0 +1,167 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.backtest import MarketOrder, OrderSide, SweepData
+from gscbt.backtest.performance import (
+    RunningMetrics,
+    session_key,
+    summarize_state,
+)
+from gscbt.backtest.sweep import summarize_positions
+
+from .test_backtest_engine import make_timeseries, create_engine
+from .test_streaming import random_orders, split, create_streaming
+from .test_sweep import crossover, PARAMS
+
+
+def expected_summary(df, settle_same_ns, settle_next_ns):
+    # same metrics from full frame with pandas
+    net = df["m2m"] - df["cost"] - df["slippage"]
+    equity = net.cumsum()
+    peak = equity.cummax().clip(lower = 0.0)
+
+    ts_ns = df.index.as_unit("ns").asi8
+    session_end = pd.Series(np.where(ts_ns < settle_same_ns, settle_same_ns, settle_next_ns))
+    key = session_end.shift(1).fillna(session_end.iloc[0]).to_numpy()
+    daily = net.groupby(key, sort = False).sum().to_numpy()[:-1]
+    active = daily[daily != 0.0]
+
+    return {
+        "bars" : len(df),
+        "pnl" : df["m2m"].sum(),
+        "net" : net.sum(),
+        "trades" : int((df["exec"] != 0).sum()),
+        "final_pos" : int(df["pos"].iloc[-1]),
+        "peak_equity" : peak.iloc[-1],
+        "max_drawdown" : (peak - equity).max(),
+        "sessions" : len(daily),
+        "sharpe" : daily.mean() / daily.std(ddof = 1) * math.sqrt(252),
+        "hit_rate" : (active > 0.0).mean(),
+    }
+
+
+def assert_summary(summary, expected):
+    for key, value in expected.items():
+        assert summary[key] == pytest.approx(value), key
+
+
+@pytest.mark.parametrize("use_kernel", [False, True])
+def test_engine_summary_matches_frame(use_kernel):
+    timeseries = make_timeseries(periods = 2000)
+    engine = create_engine(timeseries, use_kernel = use_kernel)
+    for order in random_orders(timeseries):
+        engine.place_order(order)
+    engine.complete()
+
+    summary = engine.get_summary()
+    settle_same_ns, settle_next_ns = engine.settlement_boundaries()
+    assert_summary(summary, expected_summary(engine.get_pd_data(), settle_same_ns, settle_next_ns))
+    assert summary["sessions"] > 10
+
+    state = summarize_state(engine.Nstate, engine.Ntimestamp_ns, settle_same_ns, settle_next_ns)
+    assert state == pytest.approx(summary, nan_ok = True)
+
+
+def test_engine_summary_is_incremental():
+    timeseries = make_timeseries(periods = 1500)
+    orders = random_orders(timeseries, count = 200)
+
+    once = create_engine(timeseries)
+    stepped = create_engine(timeseries)
+    for order in orders:
+        once.place_order(order)
+        stepped.place_order(order)
+    once.complete()
+
+    for timestamp in timeseries.index[::97]:
+        stepped.calculate(timestamp)
+        stepped.get_summary()
+    stepped.complete()
+
+    assert stepped.get_summary() == pytest.approx(once.get_summary(), nan_ok = True)
+
+
+def test_streaming_summary_matches_engine():
+    timeseries = make_timeseries(periods = 2000)
+    orders = random_orders(timeseries)
+
+    engine = create_engine(timeseries)
+    streaming = create_streaming(sink = None)
+    for order in orders:
+        engine.place_order(order)
+        streaming.place_order(order)
+    engine.complete()
+
+    totals = streaming.run(split(timeseries, [333, 1, 700, 500]))
+
+    summary = streaming.get_summary()
+    assert summary == pytest.approx(engine.get_summary(), nan_ok = True)
+    for key, value in totals.items():
+        assert summary[key] == pytest.approx(value)
+
+
+def test_sweep_session_metrics_match_running_metrics():
+    data = SweepData.from_timeseries(make_timeseries(periods = 2000), "16:00:00")
+    position = np.vstack([crossover(data, params) for params in PARAMS])
+
+    summary = summarize_positions(data.close, position, 1.25, 0.5, data.session_key())
+
+    # marked to close bar pnl as state columns
+    for itr in range(len(PARAMS)):
+        pos = position[itr].copy()
+        pos[0] = 0.0
+        exec_ = np.diff(pos, prepend = 0.0)
+        m2m = np.zeros(len(pos))
+        m2m[1:] = pos[:-1] * np.diff(data.close)
+
+        metrics = RunningMetrics()
+        metrics.update(
+            {
+                "exec" : exec_,
+                "pos" : pos,
+                "m2m" : m2m,
+                "cost" : np.abs(exec_) * 1.25,
+                "slippage" : np.abs(exec_) * 0.5,
+            },
+            session_key(data.timestamp_ns, data.settle_same_ns, data.settle_next_ns),
+        )
+        expected = metrics.summary()
+
+        assert summary["peak_equity_m2c"][itr] == pytest.approx(expected["peak_equity"])
+        assert summary["max_drawdown_m2c"][itr] == pytest.approx(expected["max_drawdown"])
+        assert summary["pnl_m2c"][itr] == pytest.approx(expected["pnl"])
+        assert summary["net_m2c"][itr] == pytest.approx(expected["net"])
+        for key in ["sessions", "daily_mean", "sharpe", "hit_rate"]:
+            assert summary[key][itr] == pytest.approx(expected[key], nan_ok = True), key
+
+
+@pytest.mark.parametrize("seed", [2, 17, 37])
+def test_sweep_totals_match_engine_with_flat_gaps(seed):
+    timeseries = make_timeseries(periods = 2000, seed = seed)
+    data = SweepData.from_timeseries(timeseries, "16:00:00")
+
+    # flat over several sessions between trading stretches, flat at the end
+    rng = np.random.default_rng(seed)
+    position = rng.integers(-2, 3, len(timeseries)).astype(np.float64)
+    for start in rng.integers(0, len(timeseries) - 300, 5):
+        position[start:start + 200] = 0.0
+    position[0] = position[-1] = 0.0
+
+    summary = summarize_positions(data.close, position, 1.25, 0.5, data.session_key())
+
+    engine = create_engine(timeseries)
+    lot = np.diff(position, prepend = 0.0)
+    for bar in np.flatnonzero(lot):
+        side = OrderSide.buy if lot[bar] > 0 else OrderSide.sell
+        engine.place_order(MarketOrder(timeseries.index[bar], side, int(abs(lot[bar]))))
+    engine.complete()
+    expected = engine.get_summary()
+
+    # booked and marked totals agree once flat, session split may not
+    assert summary["pnl_m2c"][0] == pytest.approx(expected["pnl"])
+    assert summary["net_m2c"][0] == pytest.approx(expected["net"])
+    assert summary["trades"][0] == expected["trades"]
+    assert summary["sessions"][0] == expected["sessions"]
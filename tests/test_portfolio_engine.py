@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.backtest import (
+    BacktestEngine,
+    MarketOrder,
+    OrderSide,
+    PortfolioBacktestEngine,
+)
+
+from .test_backtest_engine import make_timeseries, make_orders
+
+
+INSTRUMENTS = ["1*CLF25-1*CLG25", "1*NGF25-1*NGG25", "1*HOF25-1*HOG25"]
+SETTLEMENT_TIME = {
+    INSTRUMENTS[0] : "14:30:00",
+    INSTRUMENTS[1] : "14:30:00",
+    INSTRUMENTS[2] : "16:00:00",
+}
+TRADE_COST = dict(zip(INSTRUMENTS, [1.25, 2.0, 0.75]))
+SLIPPAGE = dict(zip(INSTRUMENTS, [0.5, 0.25, 1.0]))
+
+
+def make_close(periods = 2000):
+    return pd.concat([
+        make_timeseries(periods = periods, seed = seed)["close"].rename(inst)
+        for seed, inst in enumerate(INSTRUMENTS)
+    ], axis=1)
+
+
+def single_engine(close, inst):
+    return BacktestEngine(
+        timeseries = close[[inst]].rename(columns={inst : "close"}),
+        common_settlement_time = SETTLEMENT_TIME[inst],
+        trade_cost = TRADE_COST[inst],
+        slippage = SLIPPAGE[inst],
+        use_kernel = False,
+    )
+
+
+def test_portfolio_matches_single_engines():
+    close = make_close()
+    portfolio = PortfolioBacktestEngine(close, SETTLEMENT_TIME, TRADE_COST, SLIPPAGE)
+
+    expected = {}
+    for seed, inst in enumerate(INSTRUMENTS):
+        ts, lot = make_orders(close, count = 300, seed = seed)
+        portfolio.place_orders(timestamp = ts, instrument = [inst] * len(ts), lot = lot)
+
+        engine = single_engine(close, inst)
+        for order_ts, order_lot in zip(ts, lot):
+            side = OrderSide.buy if order_lot > 0 else OrderSide.sell
+            engine.place_order(MarketOrder(order_ts, side, abs(int(order_lot))))
+        engine.complete()
+        expected[inst] = engine.get_pd_data()
+
+    portfolio.complete()
+    for inst in INSTRUMENTS:
+        df = portfolio.get_pd_data(inst)
+        df.index = df.index.as_unit(expected[inst].index.unit)
+        pd.testing.assert_frame_equal(df, expected[inst], check_exact=True, check_freq=False)
+
+    total = portfolio.get_portfolio_data()
+    for col in ["m2m", "cost", "slippage", "m2m_cNs_cont"]:
+        np.testing.assert_allclose(
+            total[col].to_numpy(),
+            sum(expected[inst][col].to_numpy() for inst in INSTRUMENTS),
+        )
+    # one order after last bar per instrument
+    assert portfolio.pendding_order_count == len(INSTRUMENTS)
+
+
+def test_place_positions_and_from_expressions():
+    close = make_close(periods = 500)
+    portfolio = PortfolioBacktestEngine.from_expressions(close, "16:00:00")
+    assert portfolio.trade_cost[0] == pytest.approx(2.14)
+
+    rng = np.random.default_rng(1)
+    position = pd.DataFrame(
+        rng.integers(-2, 3, (len(close), len(INSTRUMENTS))),
+        index = close.index,
+        columns = INSTRUMENTS,
+    ).iloc[::10]
+    position.iloc[0, 1] = np.nan
+    portfolio.place_positions(position)
+
+    pos = portfolio.get_state("pos")
+    bar = close.index.get_indexer(position.index[1:])
+    expected = position.iloc[1:].ffill().fillna(0)
+    np.testing.assert_array_equal(pos.to_numpy()[bar], expected.to_numpy())
+
+
+def test_portfolio_rejects_nan_close():
+    close = make_close(periods = 50)
+    close.iloc[3, 1] = np.nan
+    with pytest.raises(ValueError):
+        PortfolioBacktestEngine(close, "16:00:00", 1.0, 1.0)
+
+
+def test_place_positions_with_future_orders():
+    close = make_close(periods = 80)
+    index = close.index
+    portfolio = PortfolioBacktestEngine(close, SETTLEMENT_TIME, TRADE_COST, SLIPPAGE)
+    inst = INSTRUMENTS[0]
+    portfolio.place_order(inst, MarketOrder(index[50], OrderSide.buy, 2))
+    portfolio.place_order(inst, MarketOrder(index[30], OrderSide.sell, 1))
+
+    # targets only see placed orders due by their bar
+    position = pd.DataFrame({inst : [1, 1, 4], INSTRUMENTS[1] : [np.nan, 2, np.nan]}, index = index[[10, 40, 60]])
+    portfolio.place_positions(position)
+
+    pos = portfolio.get_state("pos")
+    assert pos[inst].iloc[[10, 40, 50, 60]].tolist() == [1, 1, 3, 4]
+    assert pos[INSTRUMENTS[1]].iloc[[10, 40, 60]].tolist() == [0, 2, 2]
+
+
+def test_portfolio_rejects_fractional_lot():
+    close = make_close(periods = 50)
+    portfolio = PortfolioBacktestEngine(close, "16:00:00", 1.0, 1.0)
+    with pytest.raises(ValueError):
+        portfolio.place_order(INSTRUMENTS[0], MarketOrder(close.index[3], OrderSide.buy, 1.5))
+    with pytest.raises(ValueError):
+        portfolio.place_orders(timestamp = close.index[3:5], instrument = INSTRUMENTS[:2], lot = [1, 0.5])
+    with pytest.raises(ValueError):
+        portfolio.place_positions(pd.DataFrame({INSTRUMENTS[0] : [1.5]}, index = close.index[[3]]))
+    assert len(portfolio.orders) == 0
+
+
+def test_place_after_read_reruns():
+    close = make_close(periods = 80)
+    index = close.index
+    portfolio = PortfolioBacktestEngine(close, SETTLEMENT_TIME, TRADE_COST, SLIPPAGE)
+    inst = INSTRUMENTS[0]
+
+    portfolio.place_order(inst, MarketOrder(index[10], OrderSide.buy, 2))
+    assert portfolio.get_state("pos")[inst].iloc[20] == 2
+    total = portfolio.get_portfolio_data()
+
+    # orders placed after a read are part of next read
+    portfolio.place_orders(timestamp = index[[30]], instrument = [inst], lot = [-1])
+    assert portfolio.get_state("pos")[inst].iloc[[20, 40]].tolist() == [2, 1]
+    portfolio.place_positions(pd.DataFrame({INSTRUMENTS[1] : [3]}, index = index[[50]]))
+    assert portfolio.get_pd_data(INSTRUMENTS[1])["pos"].iloc[60] == 3
+    assert portfolio.get_portfolio_data()["cost"].sum() > total["cost"].sum()
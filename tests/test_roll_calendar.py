@@ -0,0 +1,119 @@
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from gscbt.utils import PATH, Dotdict
+from gscbt.data import roll_calendar
+from gscbt.data.roll_calendar import RollCalendar
+
+TEST_DATA = Path(__file__).parent / "test_data" / "data_pipeline"
+
+TICKER = Dotdict({
+    "exchange" : "NYMEX",
+    "symbol" : "CL",
+    "type" : "futures",
+})
+
+
+def write_outright(cache_dir : Path, contract : str, df : pd.DataFrame):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(cache_dir / f"{contract}.parquet", index=False)
+
+
+@pytest.fixture
+def outright_df():
+    df = pd.read_csv(TEST_DATA / "CLF23_1d.csv")
+    df = df.rename(columns={"Timestamp" : "timeutc", "Close" : "close"})
+    df["timeutc"] = pd.to_datetime(df["timeutc"], utc=True)
+    return df[["timeutc", "close"]]
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(PATH, "CACHE", tmp_path / "cache")
+    monkeypatch.setattr(PATH, "ROLL_CALENDAR", tmp_path / "roll_calendar")
+    monkeypatch.setattr(roll_calendar, "_calendars", {})
+    return tmp_path / "cache" / "NYMEX" / "CL" / "futures" / "1d"
+
+
+def test_RollCalendar_build(cache_dir, outright_df):
+    write_outright(cache_dir, "CLF23", outright_df)
+    write_outright(cache_dir, "CLG23", outright_df.iloc[:-10])
+    # continuous files are not part of roll calendar
+    write_outright(cache_dir, "CLc1", outright_df)
+
+    calendar = RollCalendar.get(TICKER)
+
+    assert set(calendar.rows.keys()) == {"CLF23", "CLG23"}
+    assert calendar.last_bar("CLF23") == outright_df["timeutc"].iloc[-1]
+    assert calendar.last_bar("CLG23") == outright_df["timeutc"].iloc[-11]
+    assert calendar.lookup("CLF23")["first_bar"] == outright_df["timeutc"].iloc[0]
+    assert calendar.roll_date("CLF23", 10) == (
+        outright_df["timeutc"].iloc[-1] - pd.offsets.Day(10)
+    )
+    assert calendar.roll_date("CLF23", 7) == (
+        outright_df["timeutc"].iloc[-1] - pd.offsets.Day(7)
+    )
+    assert calendar.last_bar("CLH23") is None
+    assert calendar.path.exists()
+
+
+def test_RollCalendar_persisted_and_refresh(cache_dir, outright_df):
+    write_outright(cache_dir, "CLF23", outright_df)
+    RollCalendar.get(TICKER)
+
+    calendar = RollCalendar(TICKER)
+    assert calendar.load()
+    assert calendar.last_bar("CLF23") == outright_df["timeutc"].iloc[-1]
+    assert not calendar.refresh()
+
+    write_outright(cache_dir, "CLF23", outright_df.iloc[:-5])
+    write_outright(cache_dir, "CLG23", outright_df)
+    assert calendar.refresh()
+    assert calendar.last_bar("CLF23") == outright_df["timeutc"].iloc[-6]
+    assert calendar.last_bar("CLG23") == outright_df["timeutc"].iloc[-1]
+
+
+def test_RollCalendar_add_flush(cache_dir, outright_df):
+    write_outright(cache_dir, "CLF23", outright_df)
+    calendar = RollCalendar.get(TICKER)
+    mtime = calendar.path.stat().st_mtime_ns
+
+    write_outright(cache_dir, "CLG23", outright_df)
+    write_outright(cache_dir, "CLH23", outright_df)
+    calendar.add("CLG23")
+    calendar.add("CLH23")
+    # adds stay in memory until flush
+    assert calendar.last_bar("CLH23") == outright_df["timeutc"].iloc[-1]
+    assert calendar.path.stat().st_mtime_ns == mtime
+
+    calendar.flush()
+    saved = RollCalendar(TICKER)
+    assert saved.load()
+    assert set(saved.rows.keys()) == {"CLF23", "CLG23", "CLH23"}
+    assert not calendar.isDirty
+
+
+def test_RollCalendar_concurrent_save(cache_dir, outright_df):
+    write_outright(cache_dir, "CLF23", outright_df)
+    calendar = RollCalendar.get(TICKER)
+
+    errors = []
+    def save():
+        try:
+            for _ in range(10):
+                calendar.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert list(calendar.path.parent.glob("*.tmp")) == []
+    assert RollCalendar(TICKER).load()
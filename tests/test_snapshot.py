@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.backtest import BacktestEngine
+
+from .test_backtest_engine import make_timeseries, create_engine
+from .test_streaming import random_orders
+
+
+@pytest.mark.parametrize("use_kernel", [False, True])
+def test_resume_matches_full_run(tmp_path, use_kernel):
+    timeseries = make_timeseries(periods = 2000)
+    orders = random_orders(timeseries)
+
+    full = create_engine(timeseries, use_kernel = use_kernel)
+    for order in orders:
+        full.place_order(order)
+    full.complete()
+
+    # daily update, history grows and run continues from last snapshot
+    path = str(tmp_path / "engine")
+    engine = create_engine(timeseries.iloc[:700], use_kernel = use_kernel)
+    for order in orders:
+        engine.place_order(order)
+    engine.complete()
+
+    for stop in [701, 1300, 2000]:
+        path = engine.save_snapshot(path)
+        engine = BacktestEngine.resume(path, timeseries.iloc[:stop], use_kernel = use_kernel)
+        engine.complete()
+
+    expected = full.get_pd_data().iloc[1299:]
+    pd.testing.assert_frame_equal(engine.get_pd_data(), expected)
+
+    assert engine.next_settle == full.next_settle
+    assert len(engine.pending) == len(full.pending)
+    assert engine.get_summary() == pytest.approx(full.get_summary(), nan_ok = True)
+
+
+def test_resume_keeps_pending_orders(tmp_path):
+    timeseries = make_timeseries(periods = 500)
+    orders = random_orders(timeseries, count = 100)
+
+    engine = create_engine(timeseries.iloc[:200])
+    for order in orders:
+        engine.place_order(order)
+    engine.calculate(timeseries.index[150])
+
+    resumed = BacktestEngine.resume(engine.save_snapshot(str(tmp_path / "engine")), timeseries)
+
+    assert resumed.pending.seq == engine.pending.seq
+    assert resumed.bar_offset == 150
+    for name, values in engine.pending.to_arrays().items():
+        np.testing.assert_array_equal(resumed.pending.to_arrays()[name], values)
+
+
+def test_resume_rejects_other_timeseries(tmp_path):
+    timeseries = make_timeseries(periods = 500)
+    engine = create_engine(timeseries.iloc[:200])
+    engine.complete()
+    path = engine.save_snapshot(str(tmp_path / "engine"))
+
+    with pytest.raises(ValueError):
+        BacktestEngine.resume(path, timeseries.iloc[200:])
+
+    revised = timeseries.copy()
+    revised.iloc[199, revised.columns.get_loc("close")] += 1.0
+    with pytest.raises(ValueError):
+        BacktestEngine.resume(path, revised)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.backtest import (
+    LimitOrder,
+    MarketOrder,
+    OrderSide,
+    StreamingBacktestEngine,
+    FrameSink,
+    ParquetSink,
+    SummarySink,
+)
+
+from .test_backtest_engine import make_timeseries, create_engine
+
+
+def random_orders(timeseries, count = 400, seed = 5):
+    rng = np.random.default_rng(seed)
+    index = timeseries.index
+    close = timeseries["close"].to_numpy()
+
+    orders = []
+    for _ in range(count):
+        bar = int(rng.integers(0, len(index)))
+        side = OrderSide.buy if rng.random() < 0.5 else OrderSide.sell
+        lot = int(rng.integers(1, 4))
+        if rng.random() < 0.5:
+            orders.append(MarketOrder(index[bar], side, lot))
+        else:
+            orders.append(LimitOrder(index[bar], side, lot, close[bar] + rng.normal(0, 1)))
+    return orders
+
+
+def split(timeseries, sizes):
+    start = 0
+    for size in sizes:
+        yield timeseries.iloc[start:start+size]
+        start += size
+    yield timeseries.iloc[start:]
+
+
+def create_streaming(sink, use_kernel = False):
+    return StreamingBacktestEngine(
+        common_settlement_time = "16:00:00",
+        trade_cost = 1.25,
+        slippage = 0.5,
+        use_kernel = use_kernel,
+        sink = sink,
+    )
+
+
+@pytest.mark.parametrize("use_kernel", [False, True])
+def test_streaming_matches_engine(use_kernel):
+    timeseries = make_timeseries(periods = 2000)
+    orders = random_orders(timeseries)
+
+    engine = create_engine(timeseries)
+    for order in orders:
+        engine.place_order(order)
+    engine.complete()
+    expected = engine.get_pd_data()
+
+    streaming = create_streaming(FrameSink(), use_kernel)
+    for order in orders:
+        streaming.place_order(order)
+    df = streaming.run(split(timeseries, [1, 1, 37, 500, 3, 700]))
+
+    pd.testing.assert_frame_equal(df, expected, check_exact=True, check_freq=False)
+    assert streaming.next_settle == engine.next_settle
+    assert len(streaming.pending) == len(engine.pending)
+
+
+def test_streaming_on_chunk_and_summary():
+    timeseries = make_timeseries(periods = 1500)
+    orders = random_orders(timeseries, seed = 8)
+
+    engine = create_engine(timeseries)
+    for order in orders:
+        engine.place_order(order)
+    engine.complete()
+    expected = engine.get_pd_data()
+
+    # orders placed chunk by chunk, only what is known by that chunk
+    def on_chunk(streaming, chunk):
+        for order in orders:
+            if chunk.index[0] <= order.timestamp <= chunk.index[-1]:
+                streaming.place_order(order)
+
+    first = [order for order in orders if order.timestamp < timeseries.index[0]]
+    streaming = create_streaming(SummarySink())
+    for order in first:
+        streaming.place_order(order)
+    summary = streaming.run(split(timeseries, [200] * 7), on_chunk)
+
+    assert summary["bars"] == len(timeseries)
+    assert summary["pnl"] == pytest.approx(expected["m2m"].sum())
+    assert summary["cost"] == pytest.approx(expected["cost"].sum())
+    assert summary["trades"] == np.count_nonzero(expected["exec"])
+    assert summary["final_pos"] == expected["pos"].iloc[-1]
+
+
+def test_streaming_parquet_sink(tmp_path):
+    timeseries = make_timeseries(periods = 600)
+    orders = random_orders(timeseries, count = 50)
+
+    streaming = create_streaming(ParquetSink(str(tmp_path / "run.parquet")))
+    for order in orders:
+        streaming.place_order(order)
+    path = streaming.run(split(timeseries, [100, 250]))
+
+    df = pd.read_parquet(path)
+    assert len(df) == len(timeseries)
+    assert df["pos"].dtype == np.int64
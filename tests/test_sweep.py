@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.backtest import (
+    MarketOrder,
+    OrderSide,
+    SweepData,
+    run_sweep,
+    run_sweep_batched,
+)
+
+from .test_backtest_engine import make_timeseries, create_engine
+
+
+def moving_average(close, window):
+    csum = np.cumsum(np.insert(close, 0, 0.0))
+    avg = np.full(len(close), np.nan)
+    avg[window-1:] = (csum[window:] - csum[:-window]) / window
+    return avg
+
+
+def crossover(data, params):
+    # long above slow average, short below, flat before it exists
+    avg = moving_average(data.close, params["slow"])
+    position = np.sign(data.close - avg) * params["size"]
+    position[np.isnan(avg)] = 0
+    position[-1] = 0
+    return position
+
+
+def crossover_batched(data, params_list):
+    return np.vstack([crossover(data, params) for params in params_list])
+
+
+PARAMS = [{"slow" : slow, "size" : size} for slow in (5, 20, 60) for size in (1, 3)]
+
+
+@pytest.fixture(scope="module")
+def timeseries():
+    return make_timeseries(periods = 2000)
+
+
+def test_run_sweep_pool_matches_inline(timeseries):
+    data = SweepData.from_timeseries(timeseries, "16:00:00")
+
+    inline = run_sweep(data, crossover, PARAMS, 1.25, 0.5, processes = 1)
+    pool = run_sweep(data, crossover, PARAMS, 1.25, 0.5, processes = 2, chunksize = 2)
+
+    pd.testing.assert_frame_equal(pool, inline)
+    assert list(inline.columns[:2]) == ["slow", "size"]
+    assert len(inline) == len(PARAMS)
+
+
+def test_run_sweep_batched_matches_pool(timeseries):
+    data = SweepData.from_timeseries(timeseries, "16:00:00")
+
+    inline = run_sweep(data, crossover, PARAMS, 1.25, 0.5, processes = 1)
+    batched = run_sweep_batched(data, crossover_batched, PARAMS, 1.25, 0.5, batch_size = 4)
+
+    pd.testing.assert_frame_equal(batched, inline, check_dtype = False)
+
+
+def test_run_sweep_full_series_matches_engine(timeseries):
+    data = SweepData.from_timeseries(timeseries, "16:00:00")
+    params = {"slow" : 20, "size" : 2}
+
+    summary, series = run_sweep(data, crossover, [params], 1.25, 0.5, processes = 1, full_series = True)
+
+    engine = create_engine(timeseries)
+    position = crossover(data, params)
+    lot = np.diff(position, prepend = 0.0)
+    for bar in np.flatnonzero(lot):
+        side = OrderSide.buy if lot[bar] > 0 else OrderSide.sell
+        engine.place_order(MarketOrder(timeseries.index[bar], side, int(abs(lot[bar]))))
+    engine.complete()
+
+    expected = engine.get_pd_data()
+    expected.index = expected.index.as_unit("ns")
+    pd.testing.assert_frame_equal(series[0], expected, check_freq = False)
+
+    # flat at the end, marked pnl is what engine booked
+    row = summary.iloc[0]
+    assert row["pnl_m2c"] == pytest.approx(expected["m2m"].sum())
+    assert row["cost"] == pytest.approx(expected["cost"].sum())
+    assert row["trades"] == np.count_nonzero(expected["exec"])
+
+
+def test_sweep_data_shared_roundtrip(timeseries):
+    data = SweepData.from_timeseries(timeseries, "16:00:00")
+    shared = data.to_shared()
+    try:
+        attached = SweepData.attach(shared.spec())
+        np.testing.assert_array_equal(attached.close, data.close)
+        np.testing.assert_array_equal(attached.settle_next_ns, data.settle_next_ns)
+        assert attached.index.equals(timeseries.index)
+        assert not attached.close.flags.writeable
+        attached.release()
+    finally:
+        shared.unlink()
@@ -0,0 +1,166 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.ticker import Ticker
+from gscbt.utils import PATH, MonthMap
+from gscbt.expression_utils import get_full_year
+from gscbt.data import roll_calendar
+from gscbt.data.roll_calendar import RollCalendar
+from gscbt.data.synthetic_batch import SyntheticBatch
+from gscbt.data.synthetic_builder import SyntheticBuilder
+from gscbt.data.synthetic_builder_wrappers import (
+    load_toml_config,
+    legs_from_toml_config_common_spec,
+)
+
+TOML = b"""
+[[synthetics]]
+name = "cl_outright"
+data_type = "forward"
+valuation_type = "de"
+roll_method = "offset"
+interval = "1d"
+
+[[synthetics.legs]]
+contract = "CLF23"
+contract_roll_months = "FGHJKMNQUVXZ"
+rt_contract = "CLF23"
+rt_contract_roll_months = "FGHJKMNQUVXZ"
+start_rt_contract = "CLF22"
+multiplier = 1
+offset = 5
+max_lookahead = 2
+
+[[synthetics]]
+name = "cl_calendar"
+data_type = "forward"
+valuation_type = "de"
+roll_method = "offset"
+interval = "1d"
+
+[[synthetics.legs]]
+contract = "CLF23"
+contract_roll_months = "FGHJKMNQUVXZ"
+rt_contract = "CLF23"
+rt_contract_roll_months = "FGHJKMNQUVXZ"
+start_rt_contract = "CLF22"
+multiplier = 1
+offset = 5
+max_lookahead = 2
+
+[[synthetics.legs]]
+contract = "CLG23"
+contract_roll_months = "FGHJKMNQUVXZ"
+rt_contract = "CLF23"
+rt_contract_roll_months = "FGHJKMNQUVXZ"
+start_rt_contract = "CLF22"
+multiplier = -1
+offset = 10
+max_lookahead = 2
+"""
+
+
+class FakeLoader:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, ticker, contract, ohlcv, interval = "1d"):
+        self.calls.append((contract, ohlcv))
+
+        year = get_full_year(int(contract[-2:]))
+        month = MonthMap.month(contract[-3])
+        expiry = pd.Timestamp(year=year, month=month, day=20, tz="UTC") - pd.DateOffset(months=1)
+        index = pd.date_range(expiry - pd.Timedelta(days=400), expiry, freq="1D", name="timestamp")
+
+        df = pd.DataFrame({"close" : 50.0 + month + np.linspace(0, 1, len(index))}, index=index)
+        return df, True
+
+
+@pytest.fixture
+def toml_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(PATH, "CACHE", tmp_path / "cache")
+    monkeypatch.setattr(PATH, "ROLL_CALENDAR", tmp_path / "roll_calendar")
+    monkeypatch.setattr(roll_calendar, "_calendars", {})
+
+    path = tmp_path / "batch.toml"
+    path.write_bytes(TOML)
+    return path
+
+
+def test_SyntheticBatch_shared_loads(toml_path, tmp_path):
+    loader = FakeLoader()
+    batch = SyntheticBatch.from_toml(toml_path)
+    report = batch.run(output_dir = tmp_path / "out", max_workers = 4, loader = loader)
+
+    assert list(report.index) == ["cl_outright", "cl_calendar"]
+    assert (report["status"] == "ok").all()
+
+    # each outright loaded once across both specs
+    assert len(loader.calls) == len(set(loader.calls))
+    assert report.attrs["outright_hits"] > 0
+
+    for name in report.index:
+        saved = pd.read_parquet(tmp_path / "out" / f"{name}.parquet")
+        pd.testing.assert_frame_equal(saved, batch.results[name], check_freq=False)
+
+    config = load_toml_config(str(toml_path))["synthetics"][1]
+    legs = legs_from_toml_config_common_spec(config)
+    expected = SyntheticBuilder(legs, outright_loader = FakeLoader()).get()
+    pd.testing.assert_frame_equal(batch.results["cl_calendar"], expected)
+
+
+class CachingLoader(FakeLoader):
+    # also writes the outright cache file like get_outright
+    def __call__(self, ticker, contract, ohlcv, interval = "1d"):
+        df, ok = super().__call__(ticker, contract, ohlcv, interval)
+        cache_dir = RollCalendar(ticker, interval).cache_dir
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        df.rename_axis("timeutc").reset_index().to_parquet(cache_dir / f"{contract}.parquet")
+        return df, ok
+
+
+def test_SyntheticBatch_registers_rt_contracts_before_builds(toml_path, tmp_path, monkeypatch):
+    saves = []
+    save = RollCalendar.save
+    monkeypatch.setattr(RollCalendar, "save", lambda self: saves.append(threading.current_thread()) or save(self))
+
+    batch = SyntheticBatch.from_toml(toml_path)
+    report = batch.run(max_workers = 4, loader = CachingLoader())
+    assert (report["status"] == "ok").all()
+
+    # one write after preload, builds find every rt contract in calendar
+    assert saves == [threading.main_thread()]
+    calendar = RollCalendar.get(Ticker.SYMBOLS["CL"], "1d")
+    assert calendar.last_bar("CLF22") is not None and calendar.last_bar("CLF23") is not None
+
+
+def test_legs_from_toml_config_per_leg_roll_params(toml_path):
+    config = load_toml_config(str(toml_path))["synthetics"][1]
+    legs = legs_from_toml_config_common_spec(config)
+
+    assert legs[0]["contract_spec"].roll_params.offset == 5
+    assert legs[1]["contract_spec"].roll_params.offset == 10
+
+
+def test_SyntheticBatch_shared_header(tmp_path):
+    path = tmp_path / "header.toml"
+    path.write_bytes(b"""
+interval = "1h"
+data_type = "forward"
+
+[[synthetics]]
+name = "a"
+
+[[synthetics]]
+name = "b"
+interval = "1d"
+""")
+    batch = SyntheticBatch.from_toml(path)
+
+    assert batch.specs["a"]["interval"] == "1h"
+    assert batch.specs["a"]["data_type"] == "forward"
+    assert batch.specs["b"]["interval"] == "1d"
+    assert "synthetics" not in batch.specs["a"]
@@ -1,8 +1,16 @@
+from io import BytesIO
+
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
 from gscbt.utils import (
     Interval,
     MonthMap,
+    ContentType,
+    bytes_to_df,
 )
 
 
@@ -83,4 +91,64 @@ def test_exception_MonthMap_min(month_1, month_2, res):
 ])
 def test_exception_MonthMap_min(month_1, month_2, e_type):
     with pytest.raises(e_type):
-        MonthMap.min(month_1, month_2)
\ No newline at end of file
+        MonthMap.min(month_1, month_2)
+
+
+### bytes_to_df
+
+JSON_PAYLOAD = (
+    b'[{"Sym":"CLF25","TimeStamp":"2024-01-01","Close":1,"Volume":10,"Open_Int":0},'
+    b'{"Sym":"CLF25","TimeStamp":"2024-01-02","Close":2.5,"Volume":20,"Open_Int":0}]'
+)
+
+def columnar_payload(content_type):
+    table = pl.read_json(BytesIO(JSON_PAYLOAD)).to_arrow()
+    sink = BytesIO()
+    if content_type == ContentType.ARROW_STREAM:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+    return sink.getvalue()
+
+@pytest.mark.parametrize("content_type", [
+    None, ContentType.ARROW_STREAM, ContentType.PARQUET,
+])
+def test_bytes_to_df(content_type):
+    content = JSON_PAYLOAD
+    if content_type is not None:
+        content = columnar_payload(content_type)
+
+    df = bytes_to_df(
+        content,
+        content_type = content_type,
+        columns = ["timestamp", "close"],
+        schema = {"close" : pl.Float64},
+    )
+
+    assert list(df.columns) == ["TimeStamp", "Close"]
+    assert df["Close"].dtype == "float64"
+    assert list(df["Close"]) == [1.0, 2.5]
+
+def test_bytes_to_df_matches_pandas():
+    df = bytes_to_df(JSON_PAYLOAD)
+    expected = pd.read_json(BytesIO(JSON_PAYLOAD))
+    assert list(df.columns) == list(expected.columns)
+    assert list(df["Close"]) == list(expected["Close"])
+
+@pytest.mark.parametrize("content_type", [
+    None, ContentType.ARROW_STREAM, ContentType.PARQUET,
+])
+def test_bytes_to_df_parses_timestamp(content_type):
+    content = JSON_PAYLOAD
+    if content_type is not None:
+        content = columnar_payload(content_type)
+
+    # same datetime column as pd.read_json
+    df = bytes_to_df(content, content_type = content_type)
+    expected = pd.read_json(BytesIO(JSON_PAYLOAD))
+    assert pd.api.types.is_datetime64_any_dtype(df["TimeStamp"])
+    assert list(df["TimeStamp"]) == list(expected["TimeStamp"])
+
+    df = bytes_to_df(b'[{"timestamp":1704067200000,"close":1}]')
+    assert df["timestamp"].iloc[0] == pd.Timestamp("2024-01-01")
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gscbt.backtest import (
+    SweepData,
+    run_sweep,
+    run_walk_forward,
+    walk_forward_windows,
+)
+
+from .test_backtest_engine import make_timeseries
+from .test_sweep import crossover, PARAMS
+
+
+@pytest.fixture(scope="module")
+def data():
+    return SweepData.from_timeseries(make_timeseries(periods = 3000), "16:00:00")
+
+
+def test_walk_forward_windows():
+    assert walk_forward_windows(10, 4, 3) == [(0, 4, 4, 7), (3, 7, 7, 10)]
+    assert walk_forward_windows(11, 4, 3, anchored = True) == [(0, 4, 4, 7), (0, 7, 7, 10), (0, 10, 10, 11)]
+    assert walk_forward_windows(12, 4, 2, step = 3) == [(0, 4, 4, 6), (3, 7, 7, 9), (6, 10, 10, 12)]
+
+    with pytest.raises(ValueError):
+        walk_forward_windows(10, 4, 3, step = 2)
+
+
+def test_walk_forward_pool_matches_inline(data):
+    inline, inline_oos = run_walk_forward(data, crossover, PARAMS, 1.25, 0.5, train = 800, test = 400, processes = 1)
+    pool, pool_oos = run_walk_forward(data, crossover, PARAMS, 1.25, 0.5, train = 800, test = 400, processes = 2)
+
+    timing = ["is_s", "oos_s", "worker_peak_rss_mb"]
+    pd.testing.assert_frame_equal(pool.drop(columns = timing), inline.drop(columns = timing))
+    pd.testing.assert_frame_equal(pool_oos, inline_oos)
+
+    assert len(inline) == 6
+    assert inline.attrs["processes"] == 1 and pool.attrs["processes"] == 2
+    assert (inline[timing[:2]] > 0).all().all()
+
+
+def test_walk_forward_selects_in_sample_best_and_stitches(data):
+    report, oos = run_walk_forward(data, crossover, PARAMS, 1.25, 0.5, train = 1000, test = 500, processes = 1)
+
+    for _, row in report.iterrows():
+        summary = run_sweep(data.slice(row["is_start"], row["is_stop"]), crossover, PARAMS, 1.25, 0.5, processes = 1)
+        best = summary.loc[summary["net_m2c"].idxmax()]
+        assert (row["slow"], row["size"]) == (best["slow"], best["size"])
+        assert row["is_net_m2c"] == pytest.approx(best["net_m2c"])
+
+    # out-of-sample bars once each, in order, flat at end of every window
+    np.testing.assert_array_equal(oos.index.as_unit("ns").asi8, data.timestamp_ns[1000:])
+    assert (oos.groupby("window")["pos"].last() == 0).all()
+
+    assert oos["equity"].iloc[-1] == pytest.approx(report["oos_net"].sum())
+    assert oos.attrs["summary"]["net"] == pytest.approx(report["oos_net"].sum())
+
+
+def test_walk_forward_minimizes_cost_columns(data):
+    kwargs = dict(train = 1000, test = 1000, processes = 1)
+    report, _ = run_walk_forward(data, crossover, PARAMS, 1.25, 0.5, select = "max_drawdown_m2c", **kwargs)
+    worst, _ = run_walk_forward(data, crossover, PARAMS, 1.25, 0.5, select = "max_drawdown_m2c", minimize = False, **kwargs)
+
+    for (_, row), (_, worst_row) in zip(report.iterrows(), worst.iterrows()):
+        summary = run_sweep(data.slice(row["is_start"], row["is_stop"]), crossover, PARAMS, 1.25, 0.5, processes = 1)
+        assert row["is_max_drawdown_m2c"] == pytest.approx(summary["max_drawdown_m2c"].min())
+        assert worst_row["is_max_drawdown_m2c"] == pytest.approx(summary["max_drawdown_m2c"].max())